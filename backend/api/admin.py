@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import DocumentType, LostItem, FoundItem, Match, Notification
+from .models import (
+    DocumentType, LostItem, FoundItem, Match, Notification, OutboxEvent, ArchiveSegment, MatchingRule
+)
 
 @admin.register(DocumentType)
 class DocumentTypeAdmin(admin.ModelAdmin):
@@ -7,6 +9,12 @@ class DocumentTypeAdmin(admin.ModelAdmin):
     search_fields = ['name']
     ordering = ['name']
 
+@admin.register(MatchingRule)
+class MatchingRuleAdmin(admin.ModelAdmin):
+    list_display = ['document_type', 'threshold', 'top_k', 'first_name_weight', 'last_name_weight',
+                    'date_of_birth_weight', 'document_number_weight', 'updated_at']
+    readonly_fields = ['updated_at']
+
 @admin.register(LostItem)
 class LostItemAdmin(admin.ModelAdmin):
     list_display = ['first_name', 'last_name', 'document_type', 'lost_date', 'status', 'user', 'created_at']
@@ -36,4 +44,16 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ['notification_type', 'is_read', 'created_at']
     search_fields = ['user__username', 'title', 'message']
     date_hierarchy = 'created_at'
-    readonly_fields = ['created_at'] 
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'attempts', 'created_at']
+    list_filter = ['event_type', 'attempts']
+    readonly_fields = ['event_type', 'payload', 'attempts', 'last_error', 'created_at']
+
+@admin.register(ArchiveSegment)
+class ArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ['model_name', 'period_start', 'period_end', 'row_count', 'created_at']
+    list_filter = ['model_name']
+    readonly_fields = ['model_name', 'period_start', 'period_end', 'file', 'row_count', 'created_at']
@@ -0,0 +1,154 @@
+import gzip
+import io
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchiveSegment, Historique, Notification
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value):
+    return month_start(month_start(value) + timedelta(days=32))
+
+
+class ArchiveService:
+    """
+    Rétention des tables Historique et Notification : les lignes plus anciennes
+    que la durée de rétention sont exportées mois par mois dans des segments
+    JSON Lines compressés (gzip), puis supprimées de la table chaude.
+    Chaque segment est indexé par sa période dans ArchiveSegment, ce qui permet
+    aux requêtes bornées dans le temps de ne lire que les segments concernés.
+    """
+
+    MODELS = {
+        'historique': {
+            'model': Historique,
+            'fields': ['id', 'user_id', 'action', 'description',
+                       'related_object_id', 'related_object_type', 'created_at'],
+            'filters': {},
+        },
+        'notification': {
+            'model': Notification,
+            'fields': ['id', 'user_id', 'match_id', 'notification_type', 'title',
+                       'message', 'is_read', 'created_at'],
+            # Seules les notifications déjà lues sont archivées
+            'filters': {'is_read': True},
+        },
+    }
+
+    @staticmethod
+    def archive(model_name, older_than_days, batch_size=None, dry_run=False):
+        """
+        Archive les lignes antérieures au début du mois de la date limite.
+        Retourne la liste des segments créés (ou prévus en dry_run) sous forme
+        de tuples (début de période, nombre de lignes).
+        """
+        config = ArchiveService.MODELS[model_name]
+        batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        # On n'archive que des mois complets : un mois archivé ne reçoit plus de lignes
+        cutoff = month_start(timezone.now() - timedelta(days=older_than_days))
+        queryset = config['model'].objects.filter(created_at__lt=cutoff, **config['filters'])
+
+        oldest = queryset.order_by('created_at').values_list('created_at', flat=True).first()
+        results = []
+        period_start = month_start(oldest) if oldest else cutoff
+        while period_start < cutoff:
+            period_end = next_month(period_start)
+            month_qs = queryset.filter(created_at__gte=period_start, created_at__lt=period_end)
+            if dry_run:
+                count = month_qs.count()
+            else:
+                count = ArchiveService._archive_period(model_name, month_qs, period_start, period_end, batch_size)
+            if count:
+                results.append((period_start, count))
+            period_start = period_end
+        return results
+
+    @staticmethod
+    def _archive_period(model_name, queryset, period_start, period_end, batch_size):
+        config = ArchiveService.MODELS[model_name]
+        archived = 0
+        # Un segment par lot : la suppression porte sur les seuls identifiants exportés
+        while True:
+            rows = list(queryset.order_by('id').values(*config['fields'])[:batch_size])
+            if not rows:
+                break
+            segment = ArchiveService._write_segment(model_name, rows, period_start, period_end)
+            try:
+                with transaction.atomic():
+                    segment.save()
+                    config['model'].objects.filter(id__in=[row['id'] for row in rows]).delete()
+            except Exception:
+                segment.file.delete(save=False)
+                raise
+            archived += len(rows)
+            logger.info(f"Archived {len(rows)} {model_name} rows for {period_start:%Y-%m}")
+            if len(rows) < batch_size:
+                break
+        return archived
+
+    @staticmethod
+    def _write_segment(model_name, rows, period_start, period_end):
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+            for row in rows:
+                # isoformat() conserve les microsecondes, contrairement à DjangoJSONEncoder
+                row = dict(row, created_at=row['created_at'].isoformat())
+                archive.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+        segment = ArchiveSegment(
+            model_name=model_name,
+            period_start=period_start,
+            period_end=period_end,
+            row_count=len(rows),
+        )
+        filename = f"{model_name}-{period_start:%Y-%m}-{rows[0]['id']}.jsonl.gz"
+        segment.file.save(filename, ContentFile(buffer.getvalue()), save=False)
+        return segment
+
+    @staticmethod
+    def segments_for(model_name, date_debut=None, date_fin=None):
+        """Segments dont la période chevauche [date_debut, date_fin]"""
+        segments = ArchiveSegment.objects.filter(model_name=model_name)
+        if date_debut:
+            segments = segments.filter(period_end__gt=date_debut)
+        if date_fin:
+            segments = segments.filter(period_start__lte=date_fin)
+        return segments
+
+    @staticmethod
+    def read_archived(model_name, date_debut=None, date_fin=None, **filters):
+        """
+        Lit les lignes archivées de la période, filtrées par égalité de champs
+        (ex. user_id=3). Retourne une liste de dictionnaires.
+        """
+        rows = []
+        for segment in ArchiveService.segments_for(model_name, date_debut, date_fin):
+            for row in ArchiveService.read_segment(segment):
+                row['created_at'] = parse_datetime(row['created_at'])
+                if date_debut and row['created_at'] < date_debut:
+                    continue
+                if date_fin and row['created_at'] > date_fin:
+                    continue
+                if all(row.get(field) == value for field, value in filters.items()):
+                    rows.append(row)
+        return rows
+
+    @staticmethod
+    def read_segment(segment):
+        with segment.file.open('rb') as f:
+            with gzip.GzipFile(fileobj=f) as archive:
+                for line in archive:
+                    if line.strip():
+                        yield json.loads(line)
@@ -0,0 +1,282 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """
+    Écriture différée de l'historique : les entrées sont mises en tampon et
+    insérées par bulk_create dès que AUDIT_BATCH_SIZE entrées sont en attente
+    ou toutes les AUDIT_FLUSH_INTERVAL secondes, depuis un thread d'arrière-plan.
+
+    Chaque entrée est d'abord ajoutée à un segment de spool JSONL sur disque,
+    nommé audit-<pid>-<uuid>.jsonl : un processus relancé avec le même pid ne
+    reprend jamais le segment d'un prédécesseur. Le segment n'est supprimé
+    qu'après l'insertion ; en mode 'celery', c'est la tâche qui le supprime une
+    fois le lot inséré (AUDIT_SPOOL_DIR doit alors être partagé avec les
+    workers). Au démarrage, les segments laissés par un processus
+    mort sont réclamés par un os.rename atomique (un seul processus peut les
+    rejouer) puis rejoués (livraison au moins une fois).
+
+    Un seul AuditWriter par processus et par répertoire de spool (voir
+    get_audit_writer) : les segments de son pid qu'il ne possède pas sont
+    considérés comme laissés par un processus précédent.
+    """
+
+    def __init__(self, spool_dir, batch_size=100, flush_interval=2.0, mode='buffered', auto_flush=True):
+        self.spool_dir = str(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.mode = mode
+        self.auto_flush = auto_flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._buffer = []
+        self._segment = None
+        self._pending_segments = []
+        # Segments ouverts, en attente de suppression ou en cours de rejeu par ce writer
+        self._owned = set()
+        self._thread = None
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    # ---------------- API ----------------
+    def write(self, user_id, action, description, related_object_id=None, related_object_type='', created_at=None):
+        entry = {
+            'user_id': user_id,
+            'action': action,
+            'description': description,
+            'related_object_id': related_object_id,
+            'related_object_type': related_object_type,
+            'created_at': (created_at or timezone.now()).isoformat(),
+        }
+        with self._lock:
+            self._spool(entry)
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if self.auto_flush:
+            self._ensure_thread()
+            if full:
+                self._wake.set()
+        return entry
+
+    def flush(self):
+        """Insère les entrées en attente, retourne le nombre écrit"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                entries, self._buffer = self._buffer, []
+                segment = self._close_segment()
+            with self._lock:
+                segments = [path for path in self._pending_segments + [segment] if path]
+            try:
+                written = self._persist(entries, segments)
+            except Exception as e:
+                logger.error(f"Audit flush failed, {len(entries)} entries kept for retry: {e}")
+                with self._lock:
+                    self._buffer = entries + self._buffer
+                    # Le segment fermé reste sur disque ; il sera supprimé au prochain succès
+                    self._pending_segments.append(segment)
+                return 0
+            with self._lock:
+                done, self._pending_segments = self._pending_segments + [segment], []
+            for path in done:
+                if written:
+                    self._remove(path)
+                # Sinon la tâche le supprimera ; en cas d'échec, recover() le rejouera
+                self._owned.discard(path)
+            return len(entries)
+
+    def recover(self):
+        """Rejoue les segments de spool laissés par des processus arrêtés"""
+        recovered = 0
+        paths = sorted(glob.glob(os.path.join(self.spool_dir, 'audit-*.jsonl')))
+        with self._lock:
+            owned = set(self._owned)
+        for path in paths:
+            pid = self._segment_pid(path)
+            if path in owned or (pid != os.getpid() and self._pid_alive(pid)):
+                continue
+            claimed = self._claim(path)
+            if claimed is None:
+                continue
+            entries = self.read_segment(claimed)
+            written = True
+            if entries:
+                written = self._persist(entries, [claimed])
+                recovered += len(entries)
+            if written:
+                self._remove(claimed)
+            self._owned.discard(claimed)
+        if recovered:
+            logger.info(f"Recovered {recovered} audit entries from spool")
+        return recovered
+
+    # ---------------- internes ----------------
+    def _spool(self, entry):
+        if self._segment is None:
+            path = self._segment_path()
+            self._owned.add(path)
+            self._segment = open(path, 'x', encoding='utf-8')
+        self._segment.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._segment.flush()
+        if settings.AUDIT_SPOOL_FSYNC:
+            os.fsync(self._segment.fileno())
+
+    def _segment_path(self):
+        return os.path.join(self.spool_dir, f'audit-{os.getpid()}-{uuid.uuid4().hex}.jsonl')
+
+    def _claim(self, path):
+        """
+        Renomme le segment sous le pid courant avant de le rejouer. os.rename est
+        atomique : si un autre processus l'a réclamé avant nous, le fichier source
+        n'existe plus et le segment est ignoré. Si ce processus meurt pendant le
+        rejeu, le segment renommé sera repris comme celui d'un processus mort.
+        """
+        claimed = self._segment_path()
+        with self._lock:
+            self._owned.add(claimed)
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            self._owned.discard(claimed)
+            return None
+        return claimed
+
+    def _close_segment(self):
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return None
+        segment.close()
+        return segment.name
+
+    def _persist(self, entries, segments=()):
+        """
+        Insère les entrées. Retourne False si elles ont été confiées à Celery : les
+        segments ne doivent alors pas être supprimés ici (la tâche s'en charge).
+        """
+        if self.mode == 'celery':
+            from .tasks import write_audit_entries
+            try:
+                write_audit_entries.apply_async((entries, list(segments)), retry=False)
+                return False
+            except Exception as e:
+                logger.warning(f"Unable to enqueue audit entries, writing in process: {e}")
+        write_entries(entries)
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"Audit spool recovery failed: {e}")
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Audit writer error: {e}")
+
+    @staticmethod
+    def read_segment(path):
+        entries = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    logger.warning(f"Skipping corrupt audit spool line in {path}")
+        return entries
+
+    @staticmethod
+    def _segment_pid(path):
+        try:
+            return int(os.path.basename(path).split('-')[1].split('.')[0])
+        except (IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def _pid_alive(pid):
+        if pid is None:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    def _remove(path):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def remove_segments(paths):
+    """Supprime les segments de spool dont les entrées ont été insérées"""
+    for path in paths:
+        AuditWriter._remove(path)
+
+
+def write_entries(entries):
+    """Insère un lot d'entrées sérialisées dans Historique"""
+    from .models import Historique, CustomUser
+    # Un utilisateur supprimé entre-temps bloquerait tout le lot (clé étrangère)
+    existing_users = set(CustomUser.objects.filter(
+        id__in={entry['user_id'] for entry in entries}
+    ).values_list('id', flat=True))
+    Historique.objects.bulk_create([
+        Historique(
+            user_id=entry['user_id'],
+            action=entry['action'],
+            description=entry['description'],
+            related_object_id=entry.get('related_object_id'),
+            related_object_type=entry.get('related_object_type', ''),
+            created_at=parse_datetime(entry['created_at']) if entry.get('created_at') else timezone.now(),
+        ) for entry in entries if entry['user_id'] in existing_users
+    ], batch_size=settings.AUDIT_BATCH_SIZE)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter(
+                    spool_dir=settings.AUDIT_SPOOL_DIR,
+                    batch_size=settings.AUDIT_BATCH_SIZE,
+                    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+                    mode=settings.AUDIT_WRITER_MODE,
+                )
+                atexit.register(_writer.flush)
+    return _writer
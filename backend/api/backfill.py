@@ -0,0 +1,259 @@
+"""
+Recalcul complet des correspondances (python manage.py rematch_all), par exemple après
+un changement de poids (MatchingRule) ou l'import d'un jeu de données historique.
+
+Les objets actifs d'un côté (trouvés par défaut) sont répartis en partitions
+(type de document, initiale de la clé phonétique du nom) traitées par un pool de
+processus. Chaque partition est lue par iterator(chunk_size) ; pour chaque lot, les
+correspondances en attente sont recalculées comme dans MatchingService.rematch :
+création des nouvelles (bulk_create), mise à jour des scores (bulk_update), retrait de
+celles sorties du top-k sans vérification en cours. Les correspondances déjà traitées
+(confirmées, remises...) ne sont jamais modifiées.
+
+Les partitions terminées sont enregistrées dans un fichier de reprise : une exécution
+interrompue reprend là où elle s'était arrêtée.
+"""
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Count
+from django.db.models.functions import Substr
+from django.utils import timezone
+
+from . import metrics
+from .models import FoundItem, LostItem, Match, Notification
+from .services import MatchingService, StatisticsService
+
+SIDES = {
+    'found': (FoundItem, MatchingService.FOUND_ACTIVE_STATUSES, 'found_item'),
+    'lost': (LostItem, MatchingService.LOST_ACTIVE_STATUSES, 'lost_item'),
+}
+
+
+def _init_worker(settings_module):
+    # Processus lancé par fork ou spawn : Django configuré, connexions héritées abandonnées
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def process_partition(side, document_type_id, initial, chunk_size, notify):
+    """Recalcule les correspondances d'une partition ; retourne les compteurs"""
+    model, statuses, _relation = SIDES[side]
+    queryset = model.objects.filter(document_type_id=document_type_id, status__in=statuses)
+    if initial:
+        queryset = queryset.filter(last_name_phonetic__startswith=initial)
+    else:
+        queryset = queryset.filter(last_name_phonetic='')
+    rule = MatchingService.rule_for(document_type_id)
+
+    stats = Counter()
+    chunk = []
+    for item in queryset.order_by('pk').iterator(chunk_size=chunk_size):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            stats.update(rematch_chunk(side, chunk, rule, notify))
+            chunk = []
+    if chunk:
+        stats.update(rematch_chunk(side, chunk, rule, notify))
+    return dict(stats)
+
+
+def rematch_chunk(side, items, rule, notify=True):
+    """Recalcule les correspondances en attente d'un lot d'objets du même type de document"""
+    _model, _statuses, relation = SIDES[side]
+    other = 'lost_item' if relation == 'found_item' else 'found_item'
+    stats = Counter(items=len(items))
+
+    ranked_by_item = {}
+    for item in items:
+        ranked, evaluated, _pruned = MatchingService.rank_candidates(item, MatchingService.candidates(item), rule)
+        ranked_by_item[item.pk] = ranked
+        stats['candidates'] += evaluated
+
+    existing = {}
+    matches = (
+        Match.objects.filter(**{f'{relation}__in': items})
+        .annotate(verification_count=Count('verification_requests'))
+    )
+    for match in matches:
+        existing[(getattr(match, f'{relation}_id'), getattr(match, f'{other}_id'))] = match
+
+    now = timezone.now()
+    new_matches, new_pairs, updated, retracted = [], [], [], []
+    for item in items:
+        wanted = set()
+        for rank, (confidence, candidate) in enumerate(ranked_by_item[item.pk], start=1):
+            wanted.add(candidate.pk)
+            match = existing.get((item.pk, candidate.pk))
+            criteria = {'method': 'ranked', 'rank': rank}
+            if match is None:
+                new_matches.append(Match(
+                    confidence_score=confidence, match_criteria=criteria,
+                    **{relation: item, other: candidate}
+                ))
+                new_pairs.append((item, candidate))
+            elif match.status == 'pending' and (
+                    match.confidence_score != confidence or match.match_criteria.get('rank') != rank):
+                match.confidence_score = confidence
+                match.match_criteria = {**match.match_criteria, **criteria, 'rescored_by': 'rematch_all'}
+                match.updated_at = now
+                updated.append(match)
+        for (item_pk, other_pk), match in existing.items():
+            if item_pk == item.pk and other_pk not in wanted and match.status == 'pending' \
+                    and match.verification_count == 0:
+                retracted.append(match.pk)
+
+    with transaction.atomic():
+        results = _create_matches(new_matches)
+        created = [match for match, was_created in results if was_created]
+        if updated:
+            Match.objects.bulk_update(updated, ['confidence_score', 'match_criteria', 'updated_at'])
+        if retracted:
+            Match.objects.filter(pk__in=retracted).delete()
+        if notify:
+            Notification.objects.bulk_create([
+                MatchingService.match_notification(item, candidate, match)
+                for (match, was_created), (item, candidate) in zip(results, new_pairs) if was_created
+            ])
+    if created or updated:
+        # bulk_create / bulk_update n'envoient pas post_save : statistiques invalidées ici
+        StatisticsService.invalidate()
+
+    item_type = SIDES[side][0].__name__
+    if created:
+        metrics.MATCHES_CREATED.inc(len(created), item_type=item_type)
+    if retracted:
+        metrics.MATCHES_RETRACTED.inc(len(retracted), item_type=item_type)
+    stats.update(created=len(created), updated=len(updated), retracted=len(retracted))
+    return stats
+
+
+def _create_matches(matches):
+    """
+    bulk_create ; en cas de conflit (matching concurrent), repli ligne par ligne.
+    Retourne [(correspondance, créée)] aligné sur `matches` : une correspondance déjà
+    créée par ailleurs est renvoyée avec False (pas de nouvelle notification).
+    """
+    if not matches:
+        return []
+    try:
+        with transaction.atomic():
+            return [(match, True) for match in Match.objects.bulk_create(matches)]
+    except IntegrityError:
+        return [
+            Match.objects.get_or_create(
+                lost_item_id=match.lost_item_id, found_item_id=match.found_item_id,
+                defaults={'confidence_score': match.confidence_score, 'match_criteria': match.match_criteria},
+            )
+            for match in matches
+        ]
+
+
+class RematchBackfill:
+    def __init__(self, side='found', workers=1, chunk_size=500, checkpoint=None,
+                 document_types=None, notify=True, restart=False, stdout=None):
+        self.side = side
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.document_types = document_types
+        self.notify = notify
+        self.restart = restart
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def partitions(self):
+        """[(type de document, initiale, nombre d'objets actifs)] par ordre de type et d'initiale"""
+        model, statuses, _relation = SIDES[self.side]
+        queryset = model.objects.filter(status__in=statuses)
+        if self.document_types:
+            queryset = queryset.filter(document_type_id__in=self.document_types)
+        rows = (
+            queryset.annotate(initial=Substr('last_name_phonetic', 1, 1))
+            .values('document_type_id', 'initial')
+            .annotate(total=Count('id'))
+            .order_by('document_type_id', 'initial')
+        )
+        return [(row['document_type_id'], row['initial'] or '', row['total']) for row in rows]
+
+    def load_checkpoint(self):
+        if self.checkpoint and not self.restart and os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('side') == self.side:
+                return state
+        return {'side': self.side, 'done': [], 'stats': {}}
+
+    def save_checkpoint(self, state):
+        if not self.checkpoint:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint)), exist_ok=True)
+        tmp_path = f'{self.checkpoint}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint)
+
+    def run(self):
+        state = self.load_checkpoint()
+        done = {tuple(key) for key in state['done']}
+        todo = [p for p in self.partitions() if (p[0], p[1]) not in done]
+        total_items = sum(count for _, _, count in todo)
+        self.log(f"{len(todo)} partition(s) à traiter ({len(done)} déjà faite(s)), {total_items} objet(s)")
+
+        workers = self.workers
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite sérialise les écritures : plusieurs processus ne feraient qu'attendre le verrou
+            self.log("SQLite : traitement dans un seul processus")
+            workers = 1
+
+        started = time.perf_counter()
+        progress = {'items': 0, 'partitions': 0}
+
+        def record(key, stats):
+            state['done'].append(list(key))
+            state['stats'] = dict(Counter(state['stats']) + Counter(stats))
+            self.save_checkpoint(state)
+            progress['items'] += stats.get('items', 0)
+            progress['partitions'] += 1
+            elapsed = time.perf_counter() - started
+            rate = progress['items'] / elapsed if elapsed else 0
+            eta = (total_items - progress['items']) / rate if rate else 0
+            self.log(
+                f"[{progress['partitions']}/{len(todo)}] type {key[0]} '{key[1]}' : "
+                f"{stats.get('items', 0)} objet(s), +{stats.get('created', 0)} "
+                f"~{stats.get('updated', 0)} -{stats.get('retracted', 0)} | "
+                f"{rate:.1f} objets/s, reste ~{eta:.0f} s"
+            )
+
+        def args(partition):
+            return self.side, partition[0], partition[1], self.chunk_size, self.notify
+
+        if workers > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'findmyid.settings'),),
+            ) as pool:
+                futures = {pool.submit(process_partition, *args(p)): (p[0], p[1]) for p in todo}
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+        else:
+            for partition in todo:
+                record((partition[0], partition[1]), process_partition(*args(partition)))
+
+        elapsed = time.perf_counter() - started
+        return {
+            **state['stats'],
+            'partitions': len(state['done']),
+            'seconds': round(elapsed, 2),
+            'items_per_second': round(progress['items'] / elapsed, 1) if elapsed else None,
+        }
@@ -0,0 +1,302 @@
+import math
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from .models import CustomUser, DocumentType, LostItem, FoundItem, Match
+from .lsh import LshIndex
+from .ngram import DocumentNumberIndex
+from .services import MatchingService
+
+FIRST_NAMES = [
+    'Mamadou', 'Moussa', 'Ousmane', 'Abdoulaye', 'Ibrahima', 'Cheikh', 'Modou', 'Aliou',
+    'Babacar', 'Serigne', 'Pape', 'Mouhamed', 'Amadou', 'Lamine', 'Fallou', 'Issa',
+    'Saliou', 'Malick', 'Omar', 'Souleymane', 'Aminata', 'Fatou', 'Awa', 'Khady',
+    'Mariama', 'Aissatou', 'Ndeye', 'Astou', 'Coumba', 'Rokhaya', 'Adja', 'Bineta',
+    'Dieynaba', 'Seynabou', 'Sokhna', 'Maimouna', 'Oumou', 'Penda', 'Yacine', 'Ramatoulaye',
+]
+
+LAST_NAMES = [
+    'Diop', 'Ndiaye', 'Fall', 'Sow', 'Ba', 'Diallo', 'Gueye', 'Faye', 'Sarr', 'Mbaye',
+    'Niang', 'Seck', 'Cisse', 'Sy', 'Kane', 'Thiam', 'Diouf', 'Camara', 'Ndour', 'Mbodj',
+    'Sene', 'Dieng', 'Toure', 'Wade', 'Sall', 'Ka', 'Lo', 'Diagne', 'Dia', 'Tall',
+    'Badji', 'Diatta', 'Sagna', 'Mane', 'Ndao', 'Gaye', 'Samb', 'Kebe', 'Thiaw', 'Mendy',
+]
+
+LOCATIONS = [
+    'Dakar Plateau', 'Médina', 'Parcelles Assainies', 'Pikine', 'Guédiawaye', 'Rufisque',
+    'Thiès', 'Saint-Louis', 'Kaolack', 'Ziguinchor', 'Touba', 'Mbour',
+]
+
+# Confusions symétriques de correct_ocr_errors (ocr/services.py), plus 0/O
+OCR_CONFUSIONS = {
+    '1': 'I', 'I': '1', '8': 'B', 'B': '8', '5': 'S', 'S': '5',
+    '2': 'Z', 'Z': '2', '6': 'G', 'G': '6', '4': 'A', 'A': '4',
+    '0': 'O', 'O': '0',
+}
+
+
+class SyntheticPopulation:
+    """
+    Générateur déterministe (graine fixe) de déclarations de perte et d'objets
+    trouvés. Un objet trouvé est soit une copie bruitée d'une déclaration
+    (vérité terrain connue), soit une identité sans déclaration associée.
+    """
+
+    def __init__(self, seed=42, noise=0.3):
+        self.rng = random.Random(seed)
+        self.noise = noise
+
+    def identity(self):
+        rng = self.rng
+        return {
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'date_of_birth': date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+            'document_number': self.document_number(),
+        }
+
+    def document_number(self):
+        # Format NIN sénégalais : 13 chiffres, commençant par 1 ou 2
+        rng = self.rng
+        return str(rng.choice((1, 2))) + ''.join(rng.choice('0123456789') for _ in range(12))
+
+    def noisy_copy(self, identity):
+        """Ce que l'OCR lit sur la pièce trouvée correspondant à l'identité déclarée"""
+        rng = self.rng
+        copy = dict(identity)
+        if rng.random() < self.noise:
+            copy['document_number'] = self.ocr_confusion(copy['document_number'])
+        if rng.random() < self.noise:
+            field = rng.choice(('first_name', 'last_name'))
+            copy[field] = self.typo(copy[field])
+        if rng.random() < self.noise / 3:
+            copy['first_name'], copy['last_name'] = copy['last_name'], copy['first_name']
+        if rng.random() < self.noise / 3:
+            # Champ illisible sur la photo
+            copy[rng.choice(('document_number', 'date_of_birth'))] = None
+        for field in ('first_name', 'last_name'):
+            copy[field] = copy[field].upper()
+        return copy
+
+    def ocr_confusion(self, value):
+        chars = list(value)
+        positions = [i for i, c in enumerate(chars) if c.upper() in OCR_CONFUSIONS]
+        for i in self.rng.sample(positions, min(len(positions), self.rng.randint(1, 2))):
+            chars[i] = OCR_CONFUSIONS[chars[i].upper()]
+        return ''.join(chars)
+
+    def typo(self, value):
+        rng = self.rng
+        if len(value) < 3:
+            return value
+        i = rng.randrange(1, len(value) - 1)
+        kind = rng.choice(('drop', 'double', 'swap'))
+        if kind == 'drop':
+            return value[:i] + value[i + 1:]
+        if kind == 'double':
+            return value[:i] + value[i] + value[i:]
+        return value[:i - 1] + value[i] + value[i - 1] + value[i + 1:]
+
+
+class MatchingBenchmark:
+    """
+    Charge une population synthétique puis mesure MatchingService.find_matches
+    sur un échantillon d'objets trouvés. Tout est exécuté dans une transaction
+    annulée à la fin : la base n'est pas modifiée.
+
+    Avec compare_exhaustive, les candidats retenus (blocage, n-grammes, LSH) sont
+    comparés au parcours exhaustif de toutes les déclarations du même type :
+    part des correspondances exhaustives retrouvées et temps de chaque méthode.
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, lost_count, found_ratio=0.5, overlap=0.8, queries=200,
+                 noise=0.3, seed=42, document_types=3, compare_exhaustive=False, stdout=None):
+        self.lost_count = lost_count
+        self.found_count = int(lost_count * found_ratio)
+        self.overlap = overlap
+        self.queries = queries
+        self.population = SyntheticPopulation(seed=seed, noise=noise)
+        self.document_types = document_types
+        self.compare_exhaustive = compare_exhaustive
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def run(self):
+        with transaction.atomic():
+            try:
+                load_seconds, query_plan = self.load()
+                report = self.measure(query_plan)
+                report['load_seconds'] = round(load_seconds, 2)
+                return report
+            finally:
+                transaction.set_rollback(True)
+
+    def load(self):
+        started = time.perf_counter()
+        rng = self.population.rng
+        users = [
+            CustomUser.objects.create_user(
+                username=f'bench-{i}', email=f'bench-{i}@bench.invalid', password=None
+            ) for i in range(10)
+        ]
+        doc_types = [
+            DocumentType.objects.get_or_create(name=f'Benchmark {i}')[0]
+            for i in range(self.document_types)
+        ]
+        query_probability = min(1.0, self.queries / max(self.found_count, 1))
+        derived_per_lost = self.found_count * self.overlap / max(self.lost_count, 1)
+        query_plan = []
+        found_batch, found_truth = [], []
+
+        def flush_found():
+            for item in found_batch:
+                item.refresh_phonetic_keys()
+            created = FoundItem.objects.bulk_create(found_batch)
+            DocumentNumberIndex.index_items(created, replace=False)
+            LshIndex.index_items(created, replace=False)
+            for item, truth in zip(created, found_truth):
+                if rng.random() < query_probability:
+                    query_plan.append((item, truth))
+            found_batch.clear()
+            found_truth.clear()
+
+        def add_found(identity, doc_type, truth):
+            found_batch.append(FoundItem(
+                user=rng.choice(users), document_type=doc_type, image='found_items/benchmark.jpg',
+                found_date=date.today(), found_location=rng.choice(LOCATIONS),
+                status='processed', first_name=identity['first_name'], last_name=identity['last_name'],
+                date_of_birth=identity['date_of_birth'], document_number=identity['document_number'] or ''
+            ))
+            found_truth.append(truth)
+            if len(found_batch) >= self.BATCH_SIZE:
+                flush_found()
+
+        remaining = self.lost_count
+        while remaining:
+            size = min(self.BATCH_SIZE, remaining)
+            remaining -= size
+            identities = [(self.population.identity(), rng.choice(doc_types)) for _ in range(size)]
+            lost_items = [
+                LostItem(
+                    user=rng.choice(users), document_type=doc_type,
+                    lost_date=date.today(), lost_location=rng.choice(LOCATIONS), **identity
+                ) for identity, doc_type in identities
+            ]
+            for lost_item in lost_items:
+                lost_item.refresh_phonetic_keys()
+            lost_items = LostItem.objects.bulk_create(lost_items)
+            DocumentNumberIndex.index_items(lost_items, replace=False)
+            LshIndex.index_items(lost_items, replace=False)
+            for lost_item, (identity, doc_type) in zip(lost_items, identities):
+                if rng.random() < derived_per_lost:
+                    add_found(self.population.noisy_copy(identity), doc_type, lost_item.id)
+            self.log(f"  {self.lost_count - remaining}/{self.lost_count} déclarations chargées")
+
+        # Objets trouvés sans déclaration correspondante
+        for _ in range(int(self.found_count * (1 - self.overlap))):
+            add_found(self.population.noisy_copy(self.population.identity()), rng.choice(doc_types), None)
+        if found_batch:
+            flush_found()
+        return time.perf_counter() - started, query_plan
+
+    def measure(self, query_plan):
+        latencies, query_counts = [], []
+        true_positives = predicted = expected = scored = 0
+        for found_item, truth in query_plan:
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                scored += MatchingService.find_matches(found_item)
+                latencies.append(time.perf_counter() - started)
+            query_counts.append(len(ctx.captured_queries))
+
+            matched = set(Match.objects.filter(found_item=found_item).values_list('lost_item_id', flat=True))
+            predicted += len(matched)
+            if truth is not None:
+                expected += 1
+                if truth in matched:
+                    true_positives += 1
+
+        total = sum(latencies)
+        report = {
+            'lost_items': self.lost_count,
+            'found_items': self.found_count,
+            'queries': len(latencies),
+            'matches_per_second': round(len(latencies) / total, 2) if total else None,
+            # Candidats réellement scorés par find_matches (après préfiltrage LSH / n-grammes)
+            'candidates_per_second': round(scored / total, 1) if total else None,
+            'avg_scored': round(scored / len(latencies), 1) if latencies else 0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'avg_queries': round(statistics.mean(query_counts), 1) if query_counts else 0,
+            'max_queries': max(query_counts, default=0),
+            'recall': round(true_positives / expected, 3) if expected else None,
+            'precision': round(true_positives / predicted, 3) if predicted else None,
+        }
+        if self.compare_exhaustive:
+            report.update(self.compare_candidates([found_item for found_item, _ in query_plan]))
+        return report
+
+    def compare_candidates(self, found_items):
+        """
+        Candidats de MatchingService.candidate_filter, et de l'index LSH seul (pour régler
+        MATCHING_LSH_BANDS / MATCHING_LSH_ROWS), contre le parcours exhaustif
+        """
+        candidate_times, exhaustive_times, candidate_counts = [], [], []
+        lsh_times, lsh_counts = [], []
+        retrieved = lsh_retrieved = expected = 0
+        for found_item in found_items:
+            active = LostItem.objects.filter(
+                document_type_id=found_item.document_type_id,
+                status__in=MatchingService.LOST_ACTIVE_STATUSES,
+            )
+            started = time.perf_counter()
+            candidates = set(
+                active.filter(MatchingService.candidate_filter(found_item)).values_list('id', flat=True)
+            )
+            candidate_times.append(time.perf_counter() - started)
+            candidate_counts.append(len(candidates))
+
+            started = time.perf_counter()
+            lsh_candidates = {lost_item.id for lost_item in LshIndex.search(active, found_item)}
+            lsh_times.append(time.perf_counter() - started)
+            lsh_counts.append(len(lsh_candidates))
+
+            rule = MatchingService.rule_for(found_item.document_type_id)
+            started = time.perf_counter()
+            exhaustive = {
+                lost_item.id for lost_item in active
+                if MatchingService.calculate_confidence(lost_item, found_item, rule=rule) > rule['threshold']
+            }
+            exhaustive_times.append(time.perf_counter() - started)
+            expected += len(exhaustive)
+            retrieved += len(exhaustive & candidates)
+            lsh_retrieved += len(exhaustive & lsh_candidates)
+
+        return {
+            'avg_candidates': round(statistics.mean(candidate_counts), 1) if candidate_counts else 0,
+            'candidate_recall': round(retrieved / expected, 3) if expected else None,
+            'candidate_p50_ms': round(percentile(candidate_times, 50) * 1000, 2),
+            'lsh_avg_candidates': round(statistics.mean(lsh_counts), 1) if lsh_counts else 0,
+            'lsh_candidate_recall': round(lsh_retrieved / expected, 3) if expected else None,
+            'lsh_p50_ms': round(percentile(lsh_times, 50) * 1000, 2),
+            'exhaustive_p50_ms': round(percentile(exhaustive_times, 50) * 1000, 2),
+        }
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (0 si la liste est vide)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,112 @@
+"""
+Images dérivées des objets trouvés : miniature et taille moyenne pour l'affichage
+(listes, correspondances, administration), version réduite sans perte pour l'OCR.
+
+L'image envoyée est décodée une seule fois (réduction au décodage pour les JPEG, voir
+Image.draft), les dérivés sont enregistrés à côté de l'original via le stockage du
+champ (found_items/<nom>_thumbnail.jpg, ...). L'OCR lit la version réduite, plus
+petite, au lieu de redécoder la photo d'origine. Elle reste en couleur : le classement
+du type de document (ocr/classifier.py) s'appuie sur la teinte et la saturation, et
+le prétraitement de l'OCR fait lui-même la conversion en niveaux de gris.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import FoundItem
+
+logger = logging.getLogger(__name__)
+
+# champ -> (suffixe, réglage de la taille maximale, mode, format, options d'enregistrement)
+DERIVATIVES = {
+    'image_thumbnail': ('thumbnail', 'IMAGE_THUMBNAIL_SIZE', 'RGB', 'JPEG', {'quality': 80, 'optimize': True}),
+    'image_medium': ('medium', 'IMAGE_MEDIUM_SIZE', 'RGB', 'JPEG', {'quality': 85, 'optimize': True}),
+    'image_ocr': ('ocr', 'IMAGE_OCR_SIZE', 'RGB', 'PNG', {}),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def load_image(image_file, max_side=None):
+    """
+    Image décodée et redressée (orientation EXIF), ou None si le fichier est illisible.
+    Avec max_side, un JPEG est décodé directement à une échelle réduite (au moins max_side).
+    """
+    try:
+        position = image_file.tell() if hasattr(image_file, 'tell') else None
+        with Image.open(image_file) as image:
+            if max_side:
+                image.draft('RGB', (max_side, max_side))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        if position is not None:
+            image_file.seek(position)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Image illisible : {e}")
+        return None
+    return image
+
+
+def render(image, size, mode, fmt, options):
+    derived = image.convert(mode)
+    derived.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    derived.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+class ImageDerivatives:
+    @staticmethod
+    def decode(image_file):
+        """Image chargée à la résolution utile au plus grand dérivé"""
+        return load_image(image_file, max(getattr(settings, spec[1]) for spec in DERIVATIVES.values()))
+
+    @staticmethod
+    def generate(item, image=None):
+        """
+        Crée (ou remplace) les dérivés d'un objet trouvé enregistré ; `image` évite de
+        relire le fichier quand l'envoi vient d'être décodé. Retourne les champs écrits.
+        """
+        if image is None:
+            if not item.image:
+                return []
+            with item.image.open('rb') as image_file:
+                image = ImageDerivatives.decode(image_file)
+            if image is None:
+                return []
+        stem = os.path.splitext(os.path.basename(item.image.name))[0]
+        written = {}
+        for field, (suffix, size_setting, mode, fmt, options) in DERIVATIVES.items():
+            current = getattr(item, field)
+            if current:
+                current.delete(save=False)
+            content = render(image, getattr(settings, size_setting), mode, fmt, options)
+            current.save(f'{stem}_{suffix}.{EXTENSIONS[fmt]}', ContentFile(content), save=False)
+            written[field] = current.name
+        # update() : pas de signal post_save, l'identité du document n'a pas changé
+        FoundItem.objects.filter(pk=item.pk).update(**written)
+        return list(written)
+
+    @staticmethod
+    def ocr_path(item):
+        """Fichier à donner à l'OCR : version réduite si elle existe, sinon l'original"""
+        return item.image_ocr.path if item.image_ocr else item.image.path
+
+    @staticmethod
+    def rebuild(batch_size=200, force=False, stdout=None):
+        """Génère les dérivés manquants (tous avec force) ; retourne le nombre d'objets traités"""
+        queryset = FoundItem.objects.exclude(image='')
+        if not force:
+            queryset = queryset.filter(image_ocr='')
+        count = 0
+        for item in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            try:
+                if ImageDerivatives.generate(item):
+                    count += 1
+            except (FileNotFoundError, OSError) as e:
+                if stdout:
+                    stdout.write(f"#{item.id} : {e}")
+        return count
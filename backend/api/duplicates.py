@@ -0,0 +1,133 @@
+"""
+Détection des images en double pour les objets trouvés (même pièce déclarée plusieurs
+fois ou image renvoyée).
+
+Chaque image reçoit un hash perceptuel dHash de 64 bits (gradient horizontal d'une
+miniature 9x8 en niveaux de gris) : une recompression, un redimensionnement ou une
+légère retouche ne changent que quelques bits. Deux images sont des doublons si la
+distance de Hamming entre leurs hash est au plus DUPLICATE_IMAGE_MAX_DISTANCE.
+
+Recherche par multi-index hashing : le hash est découpé en 4 segments de 16 bits
+stockés dans des colonnes indexées. Deux hash à distance <= 3 partagent au moins un
+segment identique (principe des tiroirs) : les candidats sont lus par égalité sur les
+index puis vérifiés en Python. Au-delà de 3, le rappel n'est plus garanti.
+"""
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image
+
+from .derivatives import ImageDerivatives
+from .models import FoundItem
+
+HASH_BITS = 64
+SEGMENTS = 4
+SEGMENT_BITS = HASH_BITS // SEGMENTS
+HASH_FIELDS = ('image_hash', *[f'image_hash_{i}' for i in range(SEGMENTS)])
+
+
+def image_dhash(image):
+    """Hash dHash 64 bits d'une image décodée (entier signé, comme une colonne BIGINT)"""
+    pixels = image.convert('L').resize((9, 8), Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def dhash(image_file):
+    """Hash dHash d'un fichier image, ou None s'il est illisible"""
+    image = ImageDerivatives.decode(image_file)
+    return None if image is None else image_dhash(image)
+
+
+def _unsigned(value):
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def hamming(a, b):
+    return bin(_unsigned(a) ^ _unsigned(b)).count('1')
+
+
+def segments(value):
+    unsigned = _unsigned(value)
+    mask = (1 << SEGMENT_BITS) - 1
+    return [(unsigned >> (SEGMENT_BITS * i)) & mask for i in range(SEGMENTS)]
+
+
+class ImageHashIndex:
+    @staticmethod
+    def hash_fields(source):
+        """Champs image_hash* à enregistrer pour une image décodée ou un fichier (vides si illisible)"""
+        value = image_dhash(source) if isinstance(source, Image.Image) else dhash(source)
+        values = [None] * len(HASH_FIELDS) if value is None else [value, *segments(value)]
+        return dict(zip(HASH_FIELDS, values))
+
+    @staticmethod
+    def find_duplicate(image_hash, exclude=None, max_distance=None, user=None):
+        """
+        Objet trouvé d'origine le plus proche (le plus ancien à distance égale) dont
+        l'image est à distance <= max_distance, ou None. Avec `user`, seuls ses objets
+        trouvés sont considérés.
+        """
+        if image_hash is None:
+            return None
+        if max_distance is None:
+            max_distance = settings.DUPLICATE_IMAGE_MAX_DISTANCE
+        query = Q()
+        for i, part in enumerate(segments(image_hash)):
+            query |= Q(**{f'image_hash_{i}': part})
+        # Une trouvaille seulement signalée (duplicate_of sans le statut) reste un original
+        candidates = FoundItem.objects.filter(query).exclude(status__in=['handed_over', 'duplicate'])
+        if exclude is not None:
+            candidates = candidates.exclude(pk=exclude)
+        if user is not None:
+            candidates = candidates.filter(user=user)
+        best = None
+        for pk, value in candidates.values_list('pk', 'image_hash'):
+            distance = hamming(image_hash, value)
+            if distance <= max_distance and (best is None or (distance, pk) < best):
+                best = (distance, pk)
+        return FoundItem.objects.get(pk=best[1]) if best else None
+
+    @staticmethod
+    def duplicate_fields(image_hash, user, exclude=None, status=None):
+        """
+        Champs duplicate_of / status d'une trouvaille d'après son image.
+        - Image proche d'une trouvaille du même déclarant : doublon, ni OCR ni matching.
+        - Image proche de celle d'un autre déclarant : seulement signalée (duplicate_of)
+          pour vérification par un administrateur ; deux cartes du même modèle sur un
+          même fond peuvent se ressembler, l'OCR et le matching ont lieu normalement.
+        Une trouvaille qui n'est plus un doublon (`status` actuel 'duplicate') repasse
+        en attente.
+        """
+        own = ImageHashIndex.find_duplicate(image_hash, exclude=exclude, user=user)
+        if own:
+            return {'duplicate_of': own, 'status': 'duplicate'}
+        fields = {'duplicate_of': ImageHashIndex.find_duplicate(image_hash, exclude=exclude)}
+        if status == 'duplicate':
+            fields['status'] = 'pending'
+        return fields
+
+    @staticmethod
+    def rebuild(batch_size=500, stdout=None):
+        """Calcule les hash manquants à partir des fichiers ; retourne le nombre d'objets hachés"""
+        queryset = FoundItem.objects.filter(image_hash__isnull=True).exclude(image='').only('id', 'image')
+        count, batch = 0, []
+        for item in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            try:
+                with item.image.open('rb') as image_file:
+                    fields = ImageHashIndex.hash_fields(image_file)
+            except (FileNotFoundError, OSError) as e:
+                if stdout:
+                    stdout.write(f"#{item.id} : {e}")
+                continue
+            for field, value in fields.items():
+                setattr(item, field, value)
+            batch.append(item)
+            if len(batch) >= batch_size:
+                count += FoundItem.objects.bulk_update(batch, HASH_FIELDS)
+                batch = []
+        if batch:
+            count += FoundItem.objects.bulk_update(batch, HASH_FIELDS)
+        return count
@@ -0,0 +1,152 @@
+"""
+Exports en flux (CSV ou NDJSON, gzip facultatif) des déclarations, correspondances et
+de l'historique pour l'administration.
+
+Les lignes sont lues par .values_list(...).iterator() (curseur côté serveur sous
+PostgreSQL) sur une projection à plat, sérialisées puis envoyées par blocs d'environ
+EXPORT_BUFFER_BYTES : la mémoire utilisée ne dépend pas de la taille de l'export.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .models import FoundItem, Historique, LostItem, Match
+
+# ressource -> (modèle, [(colonne, champ)], filtres autorisés {paramètre: lookup})
+EXPORTS = {
+    'lost-items': (LostItem, [
+        ('id', 'id'), ('user_email', 'user__email'), ('document_type', 'document_type__name'),
+        ('first_name', 'first_name'), ('last_name', 'last_name'), ('date_of_birth', 'date_of_birth'),
+        ('document_number', 'document_number'), ('lost_date', 'lost_date'),
+        ('lost_location', 'lost_location'), ('status', 'status'), ('created_at', 'created_at'),
+    ], {'status': 'status', 'document_type': 'document_type_id'}),
+    'found-items': (FoundItem, [
+        ('id', 'id'), ('user_email', 'user__email'), ('document_type', 'document_type__name'),
+        ('first_name', 'first_name'), ('last_name', 'last_name'), ('date_of_birth', 'date_of_birth'),
+        ('document_number', 'document_number'), ('found_date', 'found_date'),
+        ('found_location', 'found_location'), ('status', 'status'), ('ocr_confidence', 'ocr_confidence'),
+        ('created_at', 'created_at'),
+    ], {'status': 'status', 'document_type': 'document_type_id'}),
+    'matches': (Match, [
+        ('id', 'id'), ('lost_item_id', 'lost_item_id'), ('found_item_id', 'found_item_id'),
+        ('document_type', 'lost_item__document_type__name'), ('confidence_score', 'confidence_score'),
+        ('status', 'status'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ], {'status': 'status', 'document_type': 'lost_item__document_type_id'}),
+    'history': (Historique, [
+        ('id', 'id'), ('user_email', 'user__email'), ('action', 'action'), ('description', 'description'),
+        ('related_object_type', 'related_object_type'), ('related_object_id', 'related_object_id'),
+        ('created_at', 'created_at'),
+    ], {'action': 'action', 'user': 'user_id'}),
+}
+OUTPUTS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    """Ressource, format ou filtre invalide"""
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : write() retourne la ligne au lieu de l'écrire"""
+
+    def write(self, value):
+        return value
+
+
+class Export:
+    def __init__(self, resource, output='csv', compress=False, filters=None):
+        if resource not in EXPORTS:
+            raise ExportError(f"Ressource inconnue : {resource} (attendu : {', '.join(EXPORTS)})")
+        if output not in OUTPUTS:
+            raise ExportError(f"Format inconnu : {output} (attendu : {', '.join(OUTPUTS)})")
+        self.resource = resource
+        self.output = output
+        self.compress = compress
+        self.model, self.columns, self.allowed_filters = EXPORTS[resource]
+        self.queryset = self.build_queryset(filters or {})
+
+    def build_queryset(self, filters):
+        queryset = self.model.objects.all()
+        since, until = filters.get('since'), filters.get('until')
+        try:
+            if since:
+                queryset = queryset.filter(created_at__date__gte=date.fromisoformat(since))
+            if until:
+                queryset = queryset.filter(created_at__date__lte=date.fromisoformat(until))
+        except ValueError:
+            raise ExportError("since / until : date attendue au format AAAA-MM-JJ")
+        for param, lookup in self.allowed_filters.items():
+            if filters.get(param):
+                try:
+                    queryset = queryset.filter(**{lookup: filters[param]})
+                except (ValueError, ValidationError):
+                    # Identifiant non numérique (?document_type=abc) : refusé par le champ
+                    raise ExportError(f"{param} : valeur invalide ({filters[param]})")
+        # Ordre par clé primaire : parcours stable et indexé, sans tri en mémoire
+        return queryset.order_by('pk').values_list(*[field for _, field in self.columns])
+
+    @property
+    def content_type(self):
+        return 'application/gzip' if self.compress else OUTPUTS[self.output]
+
+    @property
+    def filename(self):
+        return f"{self.resource}.{self.output}{'.gz' if self.compress else ''}"
+
+    def lines(self):
+        headers = [name for name, _ in self.columns]
+        rows = self.queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        if self.output == 'csv':
+            writer = csv.writer(_Echo())
+            yield writer.writerow(headers)
+            for row in rows:
+                yield writer.writerow([_plain(value) for value in row])
+        else:
+            for row in rows:
+                yield json.dumps(dict(zip(headers, map(_plain, row))), ensure_ascii=False) + '\n'
+
+    def chunks(self):
+        """Blocs d'octets d'environ EXPORT_BUFFER_BYTES, compressés au fil de l'eau si demandé"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.compress else None  # 31 : en-tête gzip
+        buffer, size = [], 0
+        for line in self.lines():
+            data = line.encode('utf-8')
+            buffer.append(data)
+            size += len(data)
+            if size >= settings.EXPORT_BUFFER_BYTES:
+                block = b''.join(buffer)
+                buffer, size = [], 0
+                block = compressor.compress(block) if compressor else block
+                if block:
+                    yield block
+        block = b''.join(buffer)
+        if compressor:
+            block = compressor.compress(block) + compressor.flush()
+        if block:
+            yield block
+
+    async def achunks(self):
+        """Variante asynchrone pour ASGI : chaque bloc est produit dans le thread de la requête"""
+        iterator = iter(self.chunks())
+        done = object()
+        while True:
+            block = await sync_to_async(next, thread_sensitive=True)(iterator, done)
+            if block is done:
+                return
+            yield block
@@ -0,0 +1,198 @@
+"""
+Import en masse de déclarations (commissariats, mairies) au format CSV, JSON ou NDJSON.
+
+Le fichier est lu au fil de l'eau, chaque ligne est validée par le sérialiseur de l'API,
+puis les objets valides sont insérés par lots (bulk_create, sans signal par objet) :
+index n-grammes et LSH alimentés, puis un seul passage de matching par lot et par type
+de document (voir backfill.rematch_chunk). Le rapport indique les erreurs ligne par ligne.
+"""
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .backfill import rematch_chunk
+from .lsh import LshIndex
+from .models import DocumentType, FoundItem, LostItem
+from .ngram import DocumentNumberIndex
+from .outbox import Outbox
+from .serializers import FoundItemImportSerializer, LostItemSerializer
+from .services import MatchingService, StatisticsService
+
+FORMATS = ('csv', 'json', 'ndjson')
+
+
+class ImportFormatError(ValueError):
+    """Fichier illisible ou format non pris en charge"""
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension == 'jsonl':
+        return 'ndjson'
+    return extension if extension in FORMATS else None
+
+
+def iter_csv_records(stream):
+    """Lignes d'un CSV avec en-tête ; les cellules vides sont omises (champ non fourni)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.DictReader(text):
+            yield {key.strip(): value.strip() for key, value in row.items()
+                   if key and value is not None and value.strip()}
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFormatError(f"CSV illisible : {e}")
+    finally:
+        text.detach()
+
+
+def iter_json_records(stream, buffer_size=64 * 1024):
+    """
+    Objets d'un tableau JSON ([{...}, {...}]) ou d'un flux NDJSON, décodés un par un
+    à partir de blocs de `buffer_size` octets : le fichier n'est jamais chargé en entier.
+    """
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer, eof = '', False
+    try:
+        while True:
+            # Séparateurs de premier niveau entre deux objets
+            buffer = buffer.lstrip(' \t\r\n[],')
+            if not buffer:
+                if eof:
+                    return
+                data = text.read(buffer_size)
+                eof = not data
+                buffer += data
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ImportFormatError(f"JSON illisible : {e.msg}")
+                data = text.read(buffer_size)
+                eof = not data
+                buffer += data
+                continue
+            buffer = buffer[end:]
+            yield record
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f"Encodage invalide : {e}")
+    finally:
+        text.detach()
+
+
+def iter_records(stream, fmt):
+    if fmt == 'csv':
+        return iter_csv_records(stream)
+    if fmt in ('json', 'ndjson'):
+        return iter_json_records(stream)
+    raise ImportFormatError(f"Format non pris en charge : {fmt!r} (attendu : {', '.join(FORMATS)})")
+
+
+class DeclarationImporter:
+    KINDS = {
+        'lost': (LostItem, LostItemSerializer, 'lost_declaration'),
+        'found': (FoundItem, FoundItemImportSerializer, 'found_declaration'),
+    }
+
+    def __init__(self, kind, user, chunk_size=None, dry_run=False, notify=True):
+        if kind not in self.KINDS:
+            raise ValueError(f"Type d'import inconnu : {kind}")
+        self.kind = kind
+        self.model, self.serializer_class, self.action = self.KINDS[kind]
+        self.user = user
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.dry_run = dry_run
+        self.notify = notify
+
+    def run(self, stream, fmt):
+        """
+        Importe le flux ; retourne le rapport
+        {total, valid, created, invalid, matches_created, errors: [{row, errors}], aborted}.
+        Une erreur de format en cours de lecture arrête l'import (les lots déjà
+        insérés sont conservés) et figure dans le rapport.
+        """
+        records = iter_records(stream, fmt)
+        report = {
+            'kind': self.kind, 'format': fmt, 'dry_run': self.dry_run,
+            'total': 0, 'valid': 0, 'created': 0, 'invalid': 0, 'matches_created': 0,
+            'errors': [], 'aborted': False,
+        }
+        document_types = set(DocumentType.objects.values_list('id', flat=True))
+        chunk = []
+        row = 0
+        try:
+            for row, record in enumerate(records, start=1):
+                report['total'] += 1
+                item, errors = self.validate(record, document_types)
+                if errors:
+                    self.add_error(report, row, errors)
+                    continue
+                report['valid'] += 1
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    self.flush(chunk, report)
+                    chunk = []
+        except ImportFormatError as e:
+            report['aborted'] = True
+            self.add_error(report, row + 1, {'format': [str(e)]})
+        if chunk:
+            self.flush(chunk, report)
+
+        if report['created']:
+            StatisticsService.invalidate()
+            Outbox.record_action(
+                user=self.user,
+                action=self.action,
+                description=f"Import en masse : {report['created']} déclaration(s) sur {report['total']} ligne(s)"
+            )
+        return report
+
+    def validate(self, record, document_types):
+        """Retourne (objet non enregistré, None) ou (None, erreurs du sérialiseur)"""
+        if not isinstance(record, dict):
+            return None, {'non_field_errors': ["Un objet (colonnes nommées) est attendu"]}
+        serializer = self.serializer_class(data=record)
+        if not serializer.is_valid():
+            return None, {field: [str(e) for e in errors] if isinstance(errors, list) else errors
+                          for field, errors in serializer.errors.items()}
+        data = dict(serializer.validated_data)
+        if data['document_type_id'] not in document_types:
+            return None, {'document_type_id': [f"Type de document inconnu : {data['document_type_id']}"]}
+        if self.kind == 'found':
+            # Identité saisie par le partenaire : pas d'OCR à attendre
+            data.setdefault('status', 'processed')
+        return self.model(user=self.user, **data), None
+
+    @staticmethod
+    def add_error(report, row, errors):
+        report['invalid'] += 1
+        if len(report['errors']) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': row, 'errors': errors})
+
+    def flush(self, chunk, report):
+        if self.dry_run:
+            return
+        for item in chunk:
+            item.refresh_phonetic_keys()
+        with transaction.atomic():
+            created = self.model.objects.bulk_create(chunk)
+            DocumentNumberIndex.index_items(created, replace=False)
+            LshIndex.index_items(created, replace=False)
+        report['created'] += len(created)
+
+        # Matching groupé : un passage par type de document au lieu d'un signal par objet
+        active_statuses = (MatchingService.LOST_ACTIVE_STATUSES if self.kind == 'lost'
+                           else MatchingService.FOUND_ACTIVE_STATUSES)
+        by_type = defaultdict(list)
+        for item in created:
+            if item.status in active_statuses:
+                by_type[item.document_type_id].append(item)
+        for document_type_id, items in by_type.items():
+            stats = rematch_chunk(self.kind, items, MatchingService.rule_for(document_type_id), self.notify)
+            report['matches_created'] += stats['created']
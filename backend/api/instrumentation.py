@@ -0,0 +1,101 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+# Les listes IN (%s, %s, ...) de longueurs différentes ont la même signature
+IN_LIST_PATTERN = re.compile(r'IN \((?:%s, )*%s\)')
+SPACES_PATTERN = re.compile(r'\s+')
+
+
+def query_signature(sql):
+    """Forme normalisée d'une requête, utilisée pour repérer les répétitions (N+1)"""
+    return SPACES_PATTERN.sub(' ', IN_LIST_PATTERN.sub('IN (...)', sql)).strip()
+
+
+class QueryInspector:
+    """
+    Compte et chronomètre les requêtes SQL exécutées dans le bloc, sur toutes les
+    connexions, sans dépendre de DEBUG (connection.execute_wrapper).
+
+        with QueryInspector() as inspector:
+            ...
+        inspector.count, inspector.total_time, inspector.duplicates()
+    """
+
+    def __init__(self, using=None):
+        self.using = using
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        aliases = [self.using] if self.using else [c.alias for c in connections.all()]
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._wrapper(alias)))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+        return False
+
+    def _wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'duration': time.perf_counter() - started,
+                })
+        return wrapper
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(q['duration'] for q in self.queries)
+
+    def duplicates(self, min_count=2):
+        """Signatures exécutées au moins `min_count` fois, de la plus répétée à la moins répétée"""
+        counter = Counter(query_signature(q['sql']) for q in self.queries)
+        return [(sql, n) for sql, n in counter.most_common() if n >= min_count]
+
+    def slowest(self, limit=3):
+        return sorted(self.queries, key=lambda q: q['duration'], reverse=True)[:limit]
+
+
+class QueryStats:
+    """Agrégats par point d'accès depuis le démarrage du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, inspector):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += inspector.count
+            stats['max_queries'] = max(stats['max_queries'], inspector.count)
+            stats['db_time'] += inspector.total_time
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_stats = QueryStats()
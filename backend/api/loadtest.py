@@ -0,0 +1,366 @@
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date
+from urllib import error, request as urlrequest
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark import SyntheticPopulation, percentile
+from .models import CustomUser, DocumentType, FoundItem
+from .lsh import LshIndex
+from .ngram import DocumentNumberIndex
+
+LOADTEST_DOMAIN = 'loadtest.invalid'
+QUERY_COUNT_HEADER = 'X-DB-Query-Count'
+
+
+class Response:
+    def __init__(self, status, body, queries=None):
+        self.status = status
+        self.body = body
+        self.queries = queries
+
+    def json(self):
+        try:
+            return json.loads(self.body or b'null')
+        except ValueError:
+            return None
+
+
+class HttpTransport:
+    """Client HTTP minimal (bibliothèque standard) vers un serveur déjà lancé"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, data=None, files=None, token=None):
+        headers = {}
+        body = None
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        if files:
+            body, content_type = encode_multipart(data or {}, files)
+            headers['Content-Type'] = content_type
+        elif data is not None:
+            body = json.dumps(data).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urlrequest.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urlrequest.urlopen(req, timeout=60) as resp:
+                return Response(resp.status, resp.read(), _header_int(resp.headers.get(QUERY_COUNT_HEADER)))
+        except error.HTTPError as e:
+            return Response(e.code, e.read(), _header_int(e.headers.get(QUERY_COUNT_HEADER)))
+
+
+class InProcessTransport:
+    """
+    Appels via le client de test Django, sans serveur : les requêtes SQL
+    de chaque appel sont comptées directement.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, data=None, files=None, token=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            # 'testserver' ne figure pas dans ALLOWED_HOSTS
+            client = self._local.client = Client(SERVER_NAME='localhost')
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if files:
+            payload = dict(data or {})
+            for name, (filename, content, _content_type) in files.items():
+                upload = io.BytesIO(content)
+                upload.name = filename
+                payload[name] = upload
+            kwargs = {'data': payload}
+        elif data is not None:
+            kwargs = {'data': json.dumps(data), 'content_type': 'application/json'}
+        else:
+            kwargs = {}
+        with CaptureQueriesContext(connection) as ctx:
+            resp = getattr(client, method.lower())(path, **kwargs, **extra)
+            body = b''.join(resp.streaming_content) if resp.streaming else resp.content
+        return Response(resp.status_code, body, len(ctx.captured_queries))
+
+
+def _header_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        )
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def sample_image():
+    """Petite image JPEG générée une fois, envoyée comme photo de pièce trouvée"""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 200), (230, 230, 210)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class Recorder:
+    """Latences, codes et requêtes SQL par point d'accès (méthode + chemin normalisé)"""
+
+    ID_PATTERN = re.compile(r'/\d+(?=/|$)')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, method, path, seconds, response):
+        endpoint = f"{method} {self.ID_PATTERN.sub('/{id}', path.split('?')[0])}"
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if response.queries is not None:
+                self.queries[endpoint].append(response.queries)
+            self.statuses[endpoint][str(response.status)] += 1
+            if response.status >= 400:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.samples.items()):
+            queries = self.queries.get(endpoint)
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'errors': self.errors.get(endpoint, 0),
+                'statuses': dict(self.statuses[endpoint]),
+                'rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'avg_queries': round(sum(queries) / len(queries), 1) if queries else None,
+                'max_queries': max(queries) if queries else None,
+            }
+        total = sum(len(v) for v in self.samples.values())
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'rps': round(total / elapsed, 2) if elapsed else None,
+            'endpoints': endpoints,
+        }
+
+
+class VirtualUser:
+    API = '/api'
+
+    def __init__(self, runner, rng):
+        self.runner = runner
+        self.rng = rng
+        self.token = None
+
+    def call(self, method, path, data=None, files=None):
+        started = time.perf_counter()
+        response = self.runner.transport.request(method, self.API + path, data=data, files=files, token=self.token)
+        self.runner.recorder.record(method, self.API + path, time.perf_counter() - started, response)
+        return response
+
+    def login(self, email, password):
+        response = self.call('POST', '/token/', {'email': email, 'password': password})
+        self.token = (response.json() or {}).get('access')
+        return self.token is not None
+
+    def register_and_login(self):
+        email = f'{uuid.uuid4().hex[:12]}@{LOADTEST_DOMAIN}'
+        password = 'Loadtest-pass-123'
+        self.call('POST', '/register/', {
+            'email': email, 'first_name': 'Charge', 'last_name': 'Test',
+            'password': password, 'password_confirm': password,
+        })
+        return self.login(email, password)
+
+    def poll_notifications(self, times):
+        for _ in range(times):
+            self.call('GET', '/notifications/unread_count/')
+            self.call('GET', '/notifications/')
+
+
+class CitizenJourney(VirtualUser):
+    """Déclare une perte (identité d'une pièce déjà trouvée), attend la notification, confirme"""
+
+    def run(self):
+        if not self.register_and_login():
+            return
+        self.call('GET', '/document-types/')
+        identity, doc_type_id = self.rng.choice(self.runner.identities)
+        self.call('POST', '/lost-items/', {
+            'document_type_id': doc_type_id,
+            'first_name': identity['first_name'],
+            'last_name': identity['last_name'],
+            'date_of_birth': identity['date_of_birth'].isoformat(),
+            'document_number': identity['document_number'],
+            'lost_date': date.today().isoformat(),
+            'lost_location': 'Dakar Plateau',
+        })
+        self.poll_notifications(3)
+        matches = self.call('GET', '/matches/').json() or []
+        if isinstance(matches, dict):
+            matches = matches.get('results', [])
+        pending = [m for m in matches if m.get('status') == 'pending']
+        if pending:
+            self.call('GET', f"/matches/{pending[0]['id']}/")
+            self.call('POST', f"/matches/{pending[0]['id']}/confirm/")
+
+
+class FinderJourney(VirtualUser):
+    """Envoie la photo d'une pièce trouvée puis consulte ses notifications"""
+
+    def run(self):
+        if not self.register_and_login():
+            return
+        self.call('POST', '/found-items/', data={
+            'document_type_id': self.rng.choice(self.runner.doc_type_ids),
+            'found_date': date.today().isoformat(),
+            'found_location': 'Médina',
+        }, files={'image': ('piece.jpg', self.runner.image, 'image/jpeg')})
+        self.call('GET', '/found-items/')
+        self.poll_notifications(2)
+
+
+class AdminJourney(VirtualUser):
+    """Tableaux de bord d'administration"""
+
+    def run(self):
+        if not self.login(self.runner.admin_email, self.runner.admin_password):
+            return
+        self.call('GET', '/users/stats/')
+        self.call('GET', '/matches/')
+        self.call('GET', '/lost-items/')
+        self.call('GET', '/found-items/')
+        self.call('GET', '/verification-requests/')
+        self.call('GET', '/notifications/unread_count/')
+
+
+JOURNEYS = {
+    'citizen': CitizenJourney,
+    'finder': FinderJourney,
+    'admin': AdminJourney,
+}
+
+
+class LoadTestRunner:
+    """
+    Lance `users` utilisateurs virtuels en parallèle ; chacun enchaîne des
+    parcours tirés selon `mix` jusqu'à la fin de la durée ou du nombre d'itérations.
+    """
+
+    def __init__(self, transport, users=10, duration=60, iterations=None, mix=None,
+                 admin_email=None, admin_password=None, seed=42, seed_found_items=200):
+        self.transport = transport
+        self.users = users
+        self.duration = duration
+        self.iterations = iterations
+        self.mix = mix or {'citizen': 6, 'finder': 3, 'admin': 1}
+        if admin_email is None:
+            self.mix.pop('admin', None)
+        self.admin_email = admin_email
+        self.admin_password = admin_password
+        self.seed = seed
+        self.seed_found_items = seed_found_items
+        self.recorder = Recorder()
+        self.identities = []
+        self.doc_type_ids = []
+        self.image = b''
+
+    def prepare(self):
+        """
+        Données de départ : des pièces trouvées aux identités connues, que les
+        parcours citoyens redéclarent perdues pour déclencher de vraies correspondances.
+        """
+        self.image = sample_image()
+        doc_types = list(DocumentType.objects.all()[:3]) or [
+            DocumentType.objects.get_or_create(name="Carte d'identité")[0]
+        ]
+        self.doc_type_ids = [d.id for d in doc_types]
+        finder, _ = CustomUser.objects.get_or_create(
+            username=f'finder@{LOADTEST_DOMAIN}', defaults={'email': f'finder@{LOADTEST_DOMAIN}'}
+        )
+        population = SyntheticPopulation(seed=self.seed, noise=0.2)
+        rng = random.Random(self.seed)
+        found_items = []
+        for _ in range(self.seed_found_items):
+            identity, doc_type = population.identity(), rng.choice(doc_types)
+            self.identities.append((identity, doc_type.id))
+            copy = population.noisy_copy(identity)
+            found_items.append(FoundItem(
+                user=finder, document_type=doc_type, image='found_items/loadtest.jpg',
+                first_name=copy['first_name'], last_name=copy['last_name'],
+                date_of_birth=copy['date_of_birth'], document_number=copy['document_number'] or '',
+                found_date=date.today(), found_location='Pikine', status='processed',
+            ))
+        for item in found_items:
+            item.refresh_phonetic_keys()
+        FoundItem.objects.bulk_create(found_items)
+        DocumentNumberIndex.index_items(found_items, replace=False)
+        LshIndex.index_items(found_items, replace=False)
+
+    def run(self):
+        self.prepare()
+        journeys = list(self.mix)
+        weights = [self.mix[name] for name in journeys]
+        deadline = time.monotonic() + self.duration if self.duration else None
+
+        def worker(index):
+            rng = random.Random(self.seed + index)
+            done = 0
+            while True:
+                if self.iterations is not None and done >= self.iterations:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                journey = JOURNEYS[rng.choices(journeys, weights)[0]](self, rng)
+                journey.run()
+                done += 1
+
+        def threaded_worker(index):
+            try:
+                worker(index)
+            finally:
+                # Connexion ouverte par ce thread en mode in-process
+                connection.close()
+
+        started = time.perf_counter()
+        if self.users == 1:
+            worker(0)
+        else:
+            threads = [threading.Thread(target=threaded_worker, args=(i,)) for i in range(self.users)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return self.recorder.report(time.perf_counter() - started)
+
+    @staticmethod
+    def cleanup():
+        """Supprime les comptes créés par le test de charge (et leurs objets en cascade)"""
+        deleted, _ = CustomUser.objects.filter(email__endswith=f'@{LOADTEST_DOMAIN}').delete()
+        return deleted
@@ -0,0 +1,151 @@
+"""
+Génération de candidats par MinHash / LSH.
+
+Chaque objet est résumé par un ensemble de jetons (n-grammes des noms, clés
+phonétiques, composantes de la date de naissance, n-grammes du numéro de document).
+La signature MinHash de cet ensemble est découpée en MATCHING_LSH_BANDS bandes de
+MATCHING_LSH_ROWS valeurs ; deux objets deviennent candidats s'ils partagent au moins
+une bande. La probabilité de collision pour une similarité de Jaccard s vaut
+1 - (1 - s^rows)^bands : plus de bandes augmentent le rappel, plus de lignes par bande
+réduisent le nombre de candidats (seuil approximatif (1 / bands) ^ (1 / rows)).
+
+Contrairement aux clés de blocage exactes, un champ corrompu par l'OCR ne fait que
+baisser la similarité. Après changement des paramètres : python manage.py rebuild_lsh_index
+"""
+import hashlib
+import random
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import LshBucket, LostItem
+from .ngram import ngrams
+from .phonetics import normalize_name, phonetic_key
+
+# Nombre premier de Mersenne 2^61 - 1 : permutations universelles (a * x + b) mod p
+MERSENNE_PRIME = (1 << 61) - 1
+SIGNATURE_FIELDS = ('first_name', 'last_name', 'date_of_birth', 'document_number')
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big') % MERSENNE_PRIME
+
+
+def tokens(item):
+    """Ensemble de jetons d'un objet ; l'ordre prénom / nom n'a pas d'importance"""
+    result = set()
+    for name in (item.first_name, item.last_name):
+        normalized = normalize_name(name)
+        if normalized:
+            result.update(f'N:{gram}' for gram in ngrams(normalized))
+            result.add(f'P:{phonetic_key(name)}')
+    birth = item.date_of_birth
+    if birth:
+        # Les composantes séparées tolèrent un jour ou un mois mal lu
+        if isinstance(birth, str):
+            birth_year, birth_month, birth_day = birth.split('-')
+        else:
+            birth_year, birth_month, birth_day = f'{birth:%Y}', f'{birth:%m}', f'{birth:%d}'
+        result.update((f'Y:{birth_year}', f'M:{birth_month}', f'D:{birth_day}'))
+    result.update(f'C:{gram}' for gram in ngrams(item.document_number))
+    return result
+
+
+class MinHasher:
+    def __init__(self, bands, rows, seed=1):
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+
+    def signature(self, values):
+        hashes = [_hash(value) for value in values]
+        if not hashes:
+            return []
+        return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations]
+
+    def band_keys(self, signature):
+        """Une clé signée 64 bits par bande (le numéro de bande fait partie de la clé)"""
+        keys = []
+        for band in range(self.bands if signature else 0):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(f'{band}:{rows}'.encode(), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'big', signed=True))
+        return keys
+
+
+@lru_cache(maxsize=8)
+def _hasher(bands, rows):
+    return MinHasher(bands, rows)
+
+
+def get_hasher():
+    return _hasher(settings.MATCHING_LSH_BANDS, settings.MATCHING_LSH_ROWS)
+
+
+def band_keys(item):
+    hasher = get_hasher()
+    return hasher.band_keys(hasher.signature(tokens(item)))
+
+
+class LshIndex:
+    @staticmethod
+    def relation(item):
+        return 'lost_item' if isinstance(item, LostItem) else 'found_item'
+
+    @staticmethod
+    def index(item):
+        """(Ré)indexe un objet enregistré"""
+        LshIndex.index_items([item])
+
+    @staticmethod
+    def index_items(items, replace=True, batch_size=1000):
+        """Indexe des objets déjà enregistrés, par exemple après un bulk_create (replace=False)"""
+        rows, ids_by_relation = [], {}
+        for item in items:
+            relation = LshIndex.relation(item)
+            ids_by_relation.setdefault(relation, []).append(item.pk)
+            rows.extend(LshBucket(key=key, **{relation: item}) for key in set(band_keys(item)))
+        if replace:
+            for relation, ids in ids_by_relation.items():
+                LshBucket.objects.filter(**{f'{relation}__in': ids}).delete()
+        LshBucket.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
+
+    @staticmethod
+    def search(queryset, item, limit=None):
+        """
+        Objets de `queryset` partageant au moins une bande avec `item`, du plus grand
+        nombre de bandes communes (similarité estimée) au plus petit.
+        """
+        keys = band_keys(item)
+        if not keys:
+            return []
+        limit = limit or settings.MATCHING_LSH_CANDIDATES
+        return list(
+            queryset.filter(lsh_buckets__key__in=keys)
+            .annotate(shared_bands=Count('lsh_buckets'))
+            .order_by('-shared_bands', 'pk')[:limit]
+        )
+
+    @staticmethod
+    def rebuild(model, batch_size=2000):
+        """Reconstruit l'index d'un modèle ; retourne le nombre d'objets indexés"""
+        relation = 'lost_item' if model is LostItem else 'found_item'
+        LshBucket.objects.filter(**{f'{relation}__isnull': False}).delete()
+        queryset = model.objects.only('id', *SIGNATURE_FIELDS).order_by('pk')
+        count, batch = 0, []
+        for item in queryset.iterator(chunk_size=batch_size):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                LshIndex.index_items(batch, replace=False)
+                count += len(batch)
+                batch = []
+        if batch:
+            LshIndex.index_items(batch, replace=False)
+            count += len(batch)
+        return count
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.archive import ArchiveService
+
+
+class Command(BaseCommand):
+    help = "Archive par mois l'historique et les notifications lues au-delà de la durée de rétention"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.HISTORIQUE_RETENTION_DAYS,
+                            help="Rétention de l'historique en jours")
+        parser.add_argument('--notifications-days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help="Rétention des notifications lues en jours")
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help="Nombre maximal de lignes par segment d'archive")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Affiche les lignes concernées sans rien archiver")
+
+    def handle(self, *args, **options):
+        retention = {
+            'historique': options['days'],
+            'notification': options['notifications_days'],
+        }
+        for model_name, days in retention.items():
+            results = ArchiveService.archive(
+                model_name, days,
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+            for period_start, count in results:
+                self.stdout.write(f"{model_name} {period_start:%Y-%m} : {count} ligne(s)")
+            total = sum(count for _, count in results)
+            verb = 'à archiver' if options['dry_run'] else 'archivée(s)'
+            self.stdout.write(self.style.SUCCESS(f"{model_name} : {total} ligne(s) {verb}"))
@@ -0,0 +1,82 @@
+import json
+import logging
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from api.benchmark import MatchingBenchmark
+
+
+class Command(BaseCommand):
+    help = ("Mesure MatchingService.find_matches sur des populations synthétiques "
+            "(noms sénégalais, bruit OCR). Les données sont annulées en fin d'exécution.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help="Nombres de déclarations de perte, séparés par des virgules")
+        parser.add_argument('--found-ratio', type=float, default=0.5,
+                            help="Nombre d'objets trouvés rapporté au nombre de déclarations")
+        parser.add_argument('--overlap', type=float, default=0.8,
+                            help="Part des objets trouvés qui correspondent à une déclaration")
+        parser.add_argument('--queries', type=int, default=200,
+                            help="Nombre d'appels à find_matches mesurés par taille")
+        parser.add_argument('--noise', type=float, default=0.3,
+                            help="Probabilité de chaque type de bruit (OCR, faute de frappe, ...)")
+        parser.add_argument('--document-types', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--compare-exhaustive', action='store_true',
+                            help="Compare les candidats retenus au parcours exhaustif (rappel, temps)")
+        parser.add_argument('--lsh-bands', type=int, help="Remplace MATCHING_LSH_BANDS pendant la mesure")
+        parser.add_argument('--lsh-rows', type=int, help="Remplace MATCHING_LSH_ROWS pendant la mesure")
+        parser.add_argument('--log-level', default='WARNING',
+                            help="Niveau du logger api.services pendant la mesure "
+                                 "(INFO journalise chaque candidat et fausse les temps)")
+        parser.add_argument('--output', help="Fichier JSON où écrire le rapport")
+
+    def handle(self, *args, **options):
+        logging.getLogger('api.services').setLevel(options['log_level'].upper())
+        overrides = {
+            name: options[option] for name, option in (
+                ('MATCHING_LSH_BANDS', 'lsh_bands'), ('MATCHING_LSH_ROWS', 'lsh_rows'),
+            ) if options[option]
+        }
+        with override_settings(**overrides):
+            reports = self.run_sizes(options)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(reports, f, indent=2)
+            self.stdout.write(f"Rapport écrit dans {options['output']}")
+
+    def run_sizes(self, options):
+        reports = []
+        for size in [int(s) for s in options['sizes'].split(',') if s.strip()]:
+            self.stdout.write(f"Taille {size} :")
+            report = MatchingBenchmark(
+                size,
+                found_ratio=options['found_ratio'],
+                overlap=options['overlap'],
+                queries=options['queries'],
+                noise=options['noise'],
+                seed=options['seed'],
+                document_types=options['document_types'],
+                compare_exhaustive=options['compare_exhaustive'],
+                stdout=self.stdout,
+            ).run()
+            reports.append(report)
+            self.stdout.write(self.style.SUCCESS(
+                f"  {report['matches_per_second']} appels/s, p50 {report['p50_ms']} ms, "
+                f"p99 {report['p99_ms']} ms, {report['avg_queries']} requêtes/appel "
+                f"(max {report['max_queries']}), {report['avg_scored']} candidats scorés/appel "
+                f"({report['candidates_per_second']}/s), rappel {report['recall']}, "
+                f"précision {report['precision']}"
+            ))
+            if options['compare_exhaustive']:
+                self.stdout.write(
+                    f"  candidats : {report['avg_candidates']} en moyenne, rappel {report['candidate_recall']} "
+                    f"par rapport au parcours exhaustif, p50 {report['candidate_p50_ms']} ms "
+                    f"contre {report['exhaustive_p50_ms']} ms"
+                )
+                self.stdout.write(
+                    f"  LSH seul : {report['lsh_avg_candidates']} candidats en moyenne, "
+                    f"rappel {report['lsh_candidate_recall']}, p50 {report['lsh_p50_ms']} ms"
+                )
+        return reports
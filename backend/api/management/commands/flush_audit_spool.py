@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.audit import get_audit_writer
+
+
+class Command(BaseCommand):
+    help = "Rejoue dans Historique les segments de spool d'audit laissés par des processus arrêtés"
+
+    def handle(self, *args, **options):
+        recovered = get_audit_writer().recover()
+        self.stdout.write(self.style.SUCCESS(f"{recovered} entrée(s) d'historique rejouée(s)"))
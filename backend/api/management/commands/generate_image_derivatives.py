@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.derivatives import ImageDerivatives
+
+
+class Command(BaseCommand):
+    help = "Génère les images dérivées (miniature, taille moyenne, version OCR) des objets trouvés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Régénère aussi les dérivés existants (après changement de taille)")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Nombre d'objets lus par requête")
+
+    def handle(self, *args, **options):
+        count = ImageDerivatives.rebuild(batch_size=options['batch_size'], force=options['force'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"FoundItem : dérivés générés pour {count} image(s)"))
@@ -0,0 +1,55 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.imports import DeclarationImporter, ImportFormatError, detect_format
+from api.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Importe un fichier de déclarations (CSV, JSON ou NDJSON) transmis par un partenaire"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer")
+        parser.add_argument('--kind', choices=['lost', 'found'], required=True,
+                            help="Déclarations de perte ou de trouvaille")
+        parser.add_argument('--user', required=True, help="Email du compte partenaire déclarant")
+        parser.add_argument('--format', choices=['csv', 'json', 'ndjson'],
+                            help="Format du fichier (déduit de l'extension par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=settings.IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Valide le fichier sans rien créer")
+        parser.add_argument('--no-notify', action='store_true',
+                            help="Ne notifie pas les déclarants des correspondances trouvées")
+        parser.add_argument('--report', help="Fichier JSON où écrire le rapport complet")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"Utilisateur inconnu : {options['user']}")
+        fmt = options['format'] or detect_format(options['path'])
+        importer = DeclarationImporter(
+            options['kind'], user,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            notify=not options['no_notify'],
+        )
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(stream, fmt)
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"Ligne {error['row']} : {json.dumps(error['errors'], ensure_ascii=False)}"))
+        if report['invalid'] > 20:
+            self.stdout.write(f"... {report['invalid'] - 20} autre(s) ligne(s) en erreur")
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Rapport écrit dans {options['report']}")
+        style = self.style.ERROR if report['aborted'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{report['total']} ligne(s) : {report['valid']} valide(s), {report['created']} créée(s), "
+            f"{report['invalid']} en erreur, {report['matches_created']} correspondance(s)"
+            f"{' (interrompu)' if report['aborted'] else ''}"
+        ))
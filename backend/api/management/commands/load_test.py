@@ -0,0 +1,85 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.loadtest import LoadTestRunner, HttpTransport, InProcessTransport, JOURNEYS, LOADTEST_DOMAIN
+from api.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = ("Test de charge de l'API par parcours utilisateurs (inscription, déclaration, "
+            "envoi de photo, notifications, confirmation, tableaux de bord admin)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url',
+                            help="Serveur à tester (ex. http://127.0.0.1:8000). "
+                                 "Sans URL, les appels passent par le client de test Django")
+        parser.add_argument('--users', type=int, default=10, help="Utilisateurs virtuels simultanés")
+        parser.add_argument('--duration', type=float, default=60, help="Durée du test en secondes")
+        parser.add_argument('--iterations', type=int,
+                            help="Nombre de parcours par utilisateur (remplace --duration)")
+        parser.add_argument('--mix', default='citizen=6,finder=3,admin=1',
+                            help="Poids des parcours, ex. citizen=6,finder=3,admin=1")
+        parser.add_argument('--admin-email', help="Compte admin pour le parcours tableaux de bord")
+        parser.add_argument('--admin-password')
+        parser.add_argument('--create-admin', action='store_true',
+                            help="Crée un compte admin_plateforme dédié au test")
+        parser.add_argument('--seed-found-items', type=int, default=200,
+                            help="Pièces trouvées créées avant le test pour provoquer des correspondances")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep-data', action='store_true',
+                            help="Conserve les comptes et objets créés par le test")
+        parser.add_argument('--output', help="Fichier JSON où écrire le rapport")
+
+    def handle(self, *args, **options):
+        mix = {}
+        for part in options['mix'].split(','):
+            name, _, weight = part.partition('=')
+            if name.strip() not in JOURNEYS:
+                raise CommandError(f"Parcours inconnu : {name} (choix : {', '.join(JOURNEYS)})")
+            mix[name.strip()] = float(weight or 1)
+
+        admin_email, admin_password = options['admin_email'], options['admin_password']
+        if options['create_admin']:
+            admin_email, admin_password = f'admin@{LOADTEST_DOMAIN}', 'Loadtest-admin-123'
+            if not CustomUser.objects.filter(username=admin_email).exists():
+                CustomUser.objects.create_user(
+                    username=admin_email, email=admin_email,
+                    password=admin_password, role='admin_plateforme'
+                )
+
+        transport = HttpTransport(options['base_url']) if options['base_url'] else InProcessTransport()
+        runner = LoadTestRunner(
+            transport,
+            users=options['users'],
+            duration=None if options['iterations'] else options['duration'],
+            iterations=options['iterations'],
+            mix=mix,
+            admin_email=admin_email,
+            admin_password=admin_password,
+            seed=options['seed'],
+            seed_found_items=options['seed_found_items'],
+        )
+        try:
+            report = runner.run()
+        finally:
+            if not options['keep_data']:
+                LoadTestRunner.cleanup()
+
+        self.stdout.write(
+            f"{'Point d accès':<48} {'req':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6}  codes"
+        )
+        for endpoint, stats in report['endpoints'].items():
+            queries = stats['avg_queries'] if stats['avg_queries'] is not None else '-'
+            statuses = ' '.join(f'{code}x{count}' for code, count in sorted(stats['statuses'].items()))
+            self.stdout.write(
+                f"{endpoint:<48} {stats['requests']:>6} {stats['errors']:>5} {stats['rps']:>8} "
+                f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} {queries:>6}  {statuses}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} requêtes en {report['elapsed_seconds']} s "
+            f"({report['rps']} req/s), {report['errors']} erreur(s)"
+        ))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Rapport écrit dans {options['output']}")
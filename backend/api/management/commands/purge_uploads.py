@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.uploads import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = "Supprime les envois découpés abandonnés (inactifs depuis UPLOAD_SESSION_TTL secondes) et leurs fichiers"
+
+    def handle(self, *args, **options):
+        count = ChunkedUpload.purge()
+        self.stdout.write(self.style.SUCCESS(f"{count} envoi(s) supprimé(s)"))
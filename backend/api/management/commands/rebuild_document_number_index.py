@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.models import LostItem, FoundItem
+from api.ngram import DocumentNumberIndex
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index n-grammes des numéros de document (après changement de DOCUMENT_NUMBER_NGRAM_SIZE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Nombre d'objets indexés par lot")
+
+    def handle(self, *args, **options):
+        for model in (LostItem, FoundItem):
+            count = DocumentNumberIndex.rebuild(model, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__} : {count} numéro(s) indexé(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.duplicates import ImageHashIndex
+
+
+class Command(BaseCommand):
+    help = "Calcule le hash perceptuel des images d'objets trouvés qui n'en ont pas encore (détection des doublons)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Nombre d'objets mis à jour par lot")
+
+    def handle(self, *args, **options):
+        count = ImageHashIndex.rebuild(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"FoundItem : {count} image(s) hachée(s)"))
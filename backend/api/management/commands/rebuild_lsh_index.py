@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.lsh import LshIndex
+from api.models import LostItem, FoundItem
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index LSH des signatures (après changement de MATCHING_LSH_BANDS / MATCHING_LSH_ROWS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Nombre d'objets indexés par lot")
+
+    def handle(self, *args, **options):
+        for model in (LostItem, FoundItem):
+            count = LshIndex.rebuild(model, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__} : {count} objet(s) indexé(s)"))
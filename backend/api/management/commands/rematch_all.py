@@ -0,0 +1,47 @@
+import logging
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.backfill import RematchBackfill
+
+
+class Command(BaseCommand):
+    help = ("Recalcule les correspondances de tous les objets actifs, par partitions "
+            "(type de document, initiale du nom) ; reprend au dernier point de contrôle")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--side', choices=['found', 'lost'], default='found',
+                            help="Objets parcourus : trouvés (défaut) ou perdus")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Nombre de processus (1 sous SQLite)")
+        parser.add_argument('--chunk-size', type=int, default=settings.REMATCH_CHUNK_SIZE,
+                            help="Objets lus et écrits par lot")
+        parser.add_argument('--document-types', default='',
+                            help="Identifiants de types de document, séparés par des virgules (tous par défaut)")
+        parser.add_argument('--checkpoint', default=settings.REMATCH_CHECKPOINT_FILE,
+                            help="Fichier de reprise")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore le point de contrôle existant et repart de zéro")
+        parser.add_argument('--no-notify', action='store_true',
+                            help="Ne notifie pas les déclarants des nouvelles correspondances")
+        parser.add_argument('--log-level', default='WARNING',
+                            help="Niveau du logger api.services pendant le traitement")
+
+    def handle(self, *args, **options):
+        logging.getLogger('api.services').setLevel(options['log_level'].upper())
+        document_types = [int(i) for i in options['document_types'].split(',') if i.strip()]
+        report = RematchBackfill(
+            side=options['side'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            checkpoint=options['checkpoint'],
+            document_types=document_types or None,
+            notify=not options['no_notify'],
+            restart=options['restart'],
+            stdout=self.stdout,
+        ).run()
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.get('items', 0)} objet(s) en {report['seconds']} s "
+            f"({report['items_per_second']} objets/s) : {report.get('created', 0)} créée(s), "
+            f"{report.get('updated', 0)} mise(s) à jour, {report.get('retracted', 0)} retirée(s)"
+        ))
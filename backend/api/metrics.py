@@ -0,0 +1,371 @@
+"""
+Métriques au format d'exposition texte Prometheus, sans dépendance externe.
+
+Les valeurs sont tenues en mémoire par chaque processus. Avec plusieurs processus
+(workers gunicorn, workers Celery), /metrics ne verrait que ceux du worker qui
+répond : METRICS_MULTIPROC_DIR désigne alors un répertoire partagé où chaque
+processus écrit un instantané de ses valeurs (toutes les METRICS_FLUSH_INTERVAL
+secondes, et après chaque tâche Celery). /metrics les fusionne : compteurs et
+histogrammes sont additionnés, les jauges gardent le maximum. Les instantanés des
+processus arrêtés sont conservés (les compteurs ne doivent pas décroître) ; vider
+le répertoire au redéploiement.
+"""
+import glob
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} attend les labels {self.labelnames}, reçu {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self, values=None):
+        """Lignes d'exposition ; `values` : valeurs fusionnées des processus, sinon celles du processus"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+        if values is None:
+            values = self.snapshot()
+        lines.extend(self._samples(sorted(values.items())))
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+    def _samples(self, items):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.changed()
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Jauge fixée explicitement, ou calculée à chaque collecte si `callback` est fourni"""
+    TYPE = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, callback=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        if self.callback is None:
+            self.registry.changed()
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    @staticmethod
+    def merge(a, b):
+        return max(a, b)
+
+    def collect(self, values=None):
+        if self.callback is not None:
+            # Calculée par le processus qui répond, jamais lue dans les instantanés
+            try:
+                self.set(self.callback())
+            except Exception:
+                # Une jauge indisponible ne doit pas faire échouer toute la collecte
+                pass
+            values = None
+        return super().collect(values)
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+        self.registry.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state['count'] if state else 0
+
+    def total(self, **labels):
+        """Somme des valeurs observées"""
+        state = self._values.get(self._key(labels))
+        return state['sum'] if state else 0.0
+
+    @staticmethod
+    def _copy(state):
+        return {'buckets': list(state['buckets']), 'sum': state['sum'], 'count': state['count']}
+
+    @staticmethod
+    def merge(a, b):
+        return {
+            'buckets': [x + y for x, y in zip(a['buckets'], b['buckets'])],
+            'sum': a['sum'] + b['sum'],
+            'count': a['count'] + b['count'],
+        }
+
+    def _samples(self, items):
+        lines = []
+        for key, state in items:
+            for bound, cumulative in zip(self.buckets, state['buckets']):
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+            lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class Registry:
+    def __init__(self, multiprocess_dir=None, flush_interval=None):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        # None : lus dans les settings (METRICS_MULTIPROC_DIR, METRICS_FLUSH_INTERVAL)
+        self._multiprocess_dir = multiprocess_dir
+        self._flush_interval = flush_interval
+        self._dirty = threading.Event()
+        self._flusher_pid = None
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrique déjà enregistrée : {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def expose(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        directory = self.multiprocess_dir()
+        merged = {}
+        if directory:
+            self.write_snapshot()
+            merged = self._read_snapshots(directory)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect(merged.get(metric.name, {}) if directory else None))
+        return '\n'.join(lines) + '\n'
+
+    # ---------------- multiprocessus ----------------
+    def multiprocess_dir(self):
+        if self._multiprocess_dir is None:
+            from django.conf import settings
+            self._multiprocess_dir = getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+        return self._multiprocess_dir
+
+    def changed(self):
+        """Appelé à chaque mise à jour : démarre l'écriture périodique de l'instantané"""
+        if not self.multiprocess_dir():
+            return
+        self._dirty.set()
+        # Après un fork (workers gunicorn ou Celery), le thread du parent n'existe plus
+        if self._flusher_pid != os.getpid():
+            with self._lock:
+                if self._flusher_pid != os.getpid():
+                    self._flusher_pid = os.getpid()
+                    threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True).start()
+
+    def _flush_loop(self):
+        if self._flush_interval is None:
+            from django.conf import settings
+            self._flush_interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+        while True:
+            time.sleep(self._flush_interval)
+            if self._dirty.is_set():
+                self._dirty.clear()
+                try:
+                    self.write_snapshot()
+                except OSError:
+                    self._dirty.set()
+
+    def write_snapshot(self):
+        """Écrit les valeurs du processus dans METRICS_MULTIPROC_DIR (remplacement atomique)"""
+        directory = self.multiprocess_dir()
+        if not directory:
+            return
+        with self._lock:
+            metrics = list(self._metrics.values())
+        data = {
+            metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for metric in metrics if getattr(metric, 'callback', None) is None
+        }
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(f'{path}.tmp', path)
+
+    def _read_snapshots(self, directory):
+        merged = {}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, items in data.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in items:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return merged
+
+    def reset(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+
+def _pending_ocr_count():
+    from .models import FoundItem
+    return FoundItem.objects.filter(status='pending').count()
+
+
+# ---------------- API ----------------
+HTTP_REQUEST_DURATION = Histogram(
+    'findmyid_http_request_duration_seconds', "Durée des requêtes HTTP par vue et action",
+    ['view', 'action', 'method', 'status'],
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    'findmyid_http_request_db_queries', "Requêtes SQL par requête HTTP",
+    ['endpoint'], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+# ---------------- Matching ----------------
+MATCHING_DURATION = Histogram(
+    'findmyid_matching_duration_seconds', "Durée de MatchingService.find_matches", ['item_type'],
+)
+MATCHING_CANDIDATES = Counter(
+    'findmyid_matching_candidates_total', "Candidats évalués par find_matches", ['item_type'],
+)
+MATCHING_CANDIDATES_PRUNED = Counter(
+    'findmyid_matching_candidates_pruned_total',
+    "Candidats abandonnés avant la fin du calcul (ne pouvaient pas entrer dans le top-k)", ['item_type'],
+)
+MATCHES_CREATED = Counter(
+    'findmyid_matches_created_total', "Correspondances créées", ['item_type'],
+)
+MATCHES_RETRACTED = Counter(
+    'findmyid_matches_retracted_total', "Correspondances en attente retirées après modification", ['item_type'],
+)
+
+FOUND_ITEM_DUPLICATES = Counter(
+    'findmyid_found_item_duplicates_total', "Trouvailles reconnues comme doublons d'image (OCR et matching évités)",
+)
+
+# ---------------- OCR ----------------
+OCR_STAGE_DURATION = Histogram(
+    'findmyid_ocr_stage_duration_seconds', "Durée des étapes du pipeline OCR", ['stage'],
+)
+OCR_MRZ_READS = Counter(
+    'findmyid_ocr_mrz_reads_total', "Lectures de MRZ (valid : OCR pleine page évité)", ['outcome'],
+)
+OCR_PASSES = Counter(
+    'findmyid_ocr_exits_total', "Fin du pipeline OCR par passe (mrz, fast : sortie anticipée ; lines, page : passe lourde)",
+    ['exit'],
+)
+OCR_VARIANTS = Counter(
+    'findmyid_ocr_robust_variants_total', "Variantes du mode robuste (used, late : hors délai, error, skipped : aucun thread libre)", ['outcome'],
+)
+OCR_MODEL_LOADS = Counter(
+    'findmyid_ocr_model_loads_total', "Chargements de modèles OCR/DL", ['model'],
+)
+OCR_MODEL_LOAD_SECONDS = Gauge(
+    'findmyid_ocr_model_load_seconds', "Durée du dernier chargement de chaque modèle", ['model'],
+)
+OCR_QUEUE_DEPTH = Gauge(
+    'findmyid_ocr_pending_items', "Objets trouvés en attente de traitement OCR",
+    callback=_pending_ocr_count,
+)
+
+# ---------------- Celery ----------------
+# Mesurée dans les workers Celery : visible sur /metrics avec METRICS_MULTIPROC_DIR
+CELERY_TASK_DURATION = Histogram(
+    'findmyid_celery_task_duration_seconds', "Durée d'exécution des tâches Celery", ['task', 'state'],
+)
+
+# ---------------- Cache ----------------
+CACHE_REQUESTS = Counter(
+    'findmyid_cache_requests_total', "Lectures de cache applicatif", ['cache', 'result'],
+)
@@ -0,0 +1,91 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import metrics
+from .instrumentation import QueryInspector, query_stats
+
+logger = logging.getLogger('api.queries')
+
+
+class QueryCountMiddleware:
+    """
+    Mesure les requêtes SQL de chaque requête HTTP : nombre, temps base de données,
+    requêtes répétées (signatures N+1) et plus lentes.
+
+    - QUERY_INSPECTOR_HEADERS (DEBUG par défaut) : ajoute les en-têtes X-DB-* à la réponse
+      (X-DB-Duplicate-Queries compte toute requête répétée, même deux fois) ;
+    - au-delà de QUERY_COUNT_THRESHOLD requêtes, QUERY_TIME_THRESHOLD_MS ms ou
+      QUERY_DUPLICATE_THRESHOLD répétitions d'une même requête, le point d'accès est journalisé ;
+    - les agrégats par point d'accès sont conservés dans instrumentation.query_stats.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSPECTOR_ENABLED:
+            return self.get_response(request)
+
+        with QueryInspector() as inspector:
+            response = self.get_response(request)
+
+        endpoint = self.endpoint(request)
+        query_stats.record(endpoint, inspector)
+        metrics.HTTP_REQUEST_QUERIES.observe(inspector.count, endpoint=endpoint)
+        repeated_queries = inspector.duplicates()
+        duplicates = [(sql, n) for sql, n in repeated_queries if n >= settings.QUERY_DUPLICATE_THRESHOLD]
+
+        if settings.QUERY_INSPECTOR_HEADERS:
+            response['X-DB-Query-Count'] = str(inspector.count)
+            response['X-DB-Query-Time-Ms'] = f'{inspector.total_time * 1000:.1f}'
+            response['X-DB-Duplicate-Queries'] = str(sum(n - 1 for _, n in repeated_queries))
+
+        db_time_ms = inspector.total_time * 1000
+        if (inspector.count > settings.QUERY_COUNT_THRESHOLD
+                or db_time_ms > settings.QUERY_TIME_THRESHOLD_MS or duplicates):
+            slowest = '; '.join(
+                f"{q['duration'] * 1000:.1f} ms {q['sql'][:200]}" for q in inspector.slowest()
+            )
+            repeated = '; '.join(f"{n}x {sql[:200]}" for sql, n in duplicates[:3])
+            logger.warning(
+                f"{endpoint}: {inspector.count} queries, {db_time_ms:.1f} ms in DB"
+                f"{f' | repeated: {repeated}' if repeated else ''} | slowest: {slowest}"
+            )
+        return response
+
+    @staticmethod
+    def endpoint(request):
+        # Nom de vue (ex. lostitem-detail) plutôt que le chemin, pour regrouper les identifiants ;
+        # chemin non résolu (404, scans) : une seule étiquette, comme MetricsMiddleware
+        match = getattr(request, 'resolver_match', None)
+        return f"{request.method} {match.view_name if match else 'unresolved'}"
+
+
+class MetricsMiddleware:
+    """Durée de chaque requête, étiquetée par vue DRF et action (list, retrieve, confirm...)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        view, action = self.view_and_action(request)
+        metrics.HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            view=view, action=action, method=request.method, status=response.status_code,
+        )
+        return response
+
+    @staticmethod
+    def view_and_action(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved', ''
+        view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+        view = view_class.__name__ if view_class else match.view_name
+        # Pour un ViewSet, as_view() conserve la correspondance méthode -> action
+        actions = getattr(match.func, 'actions', None) or {}
+        return view, actions.get(request.method.lower(), '')
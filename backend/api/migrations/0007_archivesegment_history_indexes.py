@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_historique_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('historique', 'Historique'), ('notification', 'Notification')], max_length=20)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('file', models.FileField(upload_to='archives/')),
+                ('row_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['model_name', 'period_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='historique',
+            index=models.Index(fields=['created_at'], name='api_histori_created_7f12cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historique',
+            index=models.Index(fields=['user', '-created_at'], name='api_histori_user_id_f3cb63_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='api_notific_user_id_48bbdc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='api_notific_created_238c70_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivesegment',
+            index=models.Index(fields=['model_name', 'period_start', 'period_end'], name='api_archive_model_n_d86f0b_idx'),
+        ),
+    ]
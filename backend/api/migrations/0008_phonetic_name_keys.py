@@ -0,0 +1,81 @@
+from django.db import migrations, models
+
+from api.phonetics import phonetic_key
+
+
+def fill_phonetic_keys(apps, schema_editor):
+    for model_name in ('LostItem', 'FoundItem'):
+        model = apps.get_model('api', model_name)
+        batch = []
+        for item in model.objects.only('id', 'first_name', 'last_name').iterator(chunk_size=2000):
+            item.first_name_phonetic = phonetic_key(item.first_name)
+            item.last_name_phonetic = phonetic_key(item.last_name)
+            batch.append(item)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['first_name_phonetic', 'last_name_phonetic'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['first_name_phonetic', 'last_name_phonetic'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_archivesegment_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='founditem',
+            name='first_name_phonetic',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='last_name_phonetic',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='lostitem',
+            name='first_name_phonetic',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='lostitem',
+            name='last_name_phonetic',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['document_type', 'last_name_phonetic'], name='api_foundit_documen_12e4d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['document_type', 'first_name_phonetic'], name='api_foundit_documen_18ebce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['document_type', 'date_of_birth'], name='api_foundit_documen_909722_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['document_type', 'document_number'], name='api_foundit_documen_572f0e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['document_type', 'last_name_phonetic'], name='api_lostite_documen_f4b165_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['document_type', 'first_name_phonetic'], name='api_lostite_documen_503dc4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['document_type', 'date_of_birth'], name='api_lostite_documen_02d384_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['document_type', 'document_number'], name='api_lostite_documen_310cb0_idx'),
+        ),
+        migrations.RunPython(fill_phonetic_keys, migrations.RunPython.noop),
+    ]
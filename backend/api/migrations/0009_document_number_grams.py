@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from api.ngram import ngrams
+
+
+def fill_document_number_grams(apps, schema_editor):
+    DocumentNumberGram = apps.get_model('api', 'DocumentNumberGram')
+    for model_name, relation in (('LostItem', 'lost_item_id'), ('FoundItem', 'found_item_id')):
+        model = apps.get_model('api', model_name)
+        rows = []
+        for item in model.objects.exclude(document_number='').only('id', 'document_number').iterator(chunk_size=2000):
+            rows.extend(DocumentNumberGram(gram=gram, **{relation: item.id}) for gram in ngrams(item.document_number))
+            if len(rows) >= 10000:
+                DocumentNumberGram.objects.bulk_create(rows)
+                rows = []
+        if rows:
+            DocumentNumberGram.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_phonetic_name_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentNumberGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=10)),
+                ('found_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_number_grams', to='api.founditem')),
+                ('lost_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_number_grams', to='api.lostitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gram', 'lost_item'], name='api_documen_gram_d9f92f_idx'), models.Index(fields=['gram', 'found_item'], name='api_documen_gram_2ae293_idx')],
+            },
+        ),
+        migrations.RunPython(fill_document_number_grams, migrations.RunPython.noop),
+    ]
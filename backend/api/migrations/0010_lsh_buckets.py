@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from api.lsh import SIGNATURE_FIELDS, band_keys
+
+
+def fill_lsh_buckets(apps, schema_editor):
+    LshBucket = apps.get_model('api', 'LshBucket')
+    for model_name, relation in (('LostItem', 'lost_item_id'), ('FoundItem', 'found_item_id')):
+        model = apps.get_model('api', model_name)
+        rows = []
+        for item in model.objects.only('id', *SIGNATURE_FIELDS).iterator(chunk_size=2000):
+            rows.extend(LshBucket(key=key, **{relation: item.id}) for key in set(band_keys(item)))
+            if len(rows) >= 10000:
+                LshBucket.objects.bulk_create(rows)
+                rows = []
+        if rows:
+            LshBucket.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_document_number_grams'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('found_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='api.founditem')),
+                ('lost_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='api.lostitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'lost_item'], name='api_lshbuck_key_76942f_idx'), models.Index(fields=['key', 'found_item'], name='api_lshbuck_key_49ba9b_idx')],
+            },
+        ),
+        migrations.RunPython(fill_lsh_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_lsh_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.FloatField(default=0.5, help_text="Score minimal (exclu) d'une correspondance")),
+                ('top_k', models.PositiveSmallIntegerField(default=5, help_text='Correspondances créées au plus par objet')),
+                ('first_name_weight', models.FloatField(default=0.3)),
+                ('last_name_weight', models.FloatField(default=0.3)),
+                ('date_of_birth_weight', models.FloatField(default=0.25)),
+                ('document_number_weight', models.FloatField(default=0.15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document_type', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='matching_rule', to='api.documenttype')),
+            ],
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_matchingrule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='founditem',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='api.founditem'),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_hash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_hash_0',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_hash_1',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_hash_2',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_hash_3',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='founditem',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('processed', 'Traité'), ('matched', 'Correspondance trouvée'), ('handed_over', 'Remis'), ('duplicate', 'Doublon')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['image_hash_0'], name='api_foundit_image_h_e4d9ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['image_hash_1'], name='api_foundit_image_h_5285e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['image_hash_2'], name='api_foundit_image_h_b99725_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='founditem',
+            index=models.Index(fields=['image_hash_3'], name='api_foundit_image_h_1d6dcf_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_found_item_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='founditem',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to='found_items/'),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_ocr',
+            field=models.ImageField(blank=True, editable=False, upload_to='found_items/'),
+        ),
+        migrations.AddField(
+            model_name='founditem',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='found_items/'),
+        ),
+    ]
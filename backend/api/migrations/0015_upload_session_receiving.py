@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_upload_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'En cours'), ('receiving', 'Morceau en cours de réception'), ('complete', 'Terminé')], default='uploading', max_length=20),
+        ),
+    ]
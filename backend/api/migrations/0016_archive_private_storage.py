@@ -0,0 +1,34 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.db import migrations, models
+
+import api.models
+
+
+def move_archives(apps, schema_editor):
+    """Segments déjà écrits sous MEDIA_ROOT déplacés vers ARCHIVE_ROOT (même nom relatif)"""
+    ArchiveSegment = apps.get_model('api', 'ArchiveSegment')
+    for name in ArchiveSegment.objects.values_list('file', flat=True).iterator():
+        source = os.path.join(settings.MEDIA_ROOT, name)
+        target = os.path.join(settings.ARCHIVE_ROOT, name)
+        if os.path.exists(source) and not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(source, target)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_upload_session_receiving'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivesegment',
+            name='file',
+            field=models.FileField(storage=api.models.ArchiveStorage(), upload_to='archives/'),
+        ),
+        migrations.RunPython(move_archives, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import FileSystemStorage
 from django.core.validators import RegexValidator
+from django.utils.deconstruct import deconstructible
+from django.conf import settings
+from django.utils import timezone
+import os
+import uuid
+from .phonetics import phonetic_key
 
 class CustomUser(AbstractUser):
     """Modèle User personnalisé avec gestion des rôles"""
@@ -58,7 +65,77 @@ class DocumentType(models.Model):
     def __str__(self):
         return self.name
 
-class LostItem(models.Model):
+class MatchingRule(models.Model):
+    """
+    Paramètres du matching d'un type de document. Sans règle enregistrée, les valeurs
+    par défaut des champs s'appliquent (MatchingService.rule_for, mis en cache).
+    """
+    document_type = models.OneToOneField(DocumentType, on_delete=models.CASCADE, related_name='matching_rule')
+    threshold = models.FloatField(default=0.5, help_text="Score minimal (exclu) d'une correspondance")
+    top_k = models.PositiveSmallIntegerField(default=5, help_text="Correspondances créées au plus par objet")
+    first_name_weight = models.FloatField(default=0.3)
+    last_name_weight = models.FloatField(default=0.3)
+    date_of_birth_weight = models.FloatField(default=0.25)
+    document_number_weight = models.FloatField(default=0.15)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Règle de matching - {self.document_type_id}"
+
+    def as_rule(self):
+        return {
+            'threshold': self.threshold,
+            'top_k': max(self.top_k, 1),
+            'weights': {
+                'first_name': self.first_name_weight,
+                'last_name': self.last_name_weight,
+                'date_of_birth': self.date_of_birth_weight,
+                'document_number': self.document_number_weight,
+            },
+        }
+
+class MatchableMixin:
+    """
+    Suivi des champs utilisés par le matching : la valeur chargée depuis la base
+    (ou à la dernière sauvegarde) est mémorisée pour ne relancer le matching que
+    si l'un de ces champs a réellement changé.
+    """
+    MATCH_FIELDS = ('document_type_id', 'first_name', 'last_name', 'date_of_birth', 'document_number')
+
+    def snapshot_match_fields(self):
+        # Les champs différés (only/defer) ne sont pas chargés : pas de requête supplémentaire
+        self._match_snapshot = {
+            name: self._normalized_match_value(name)
+            for name in self.MATCH_FIELDS if name in self.__dict__
+        }
+
+    def changed_match_fields(self):
+        snapshot = getattr(self, '_match_snapshot', {})
+        return [
+            name for name in self.MATCH_FIELDS
+            if name in snapshot and self._normalized_match_value(name) != snapshot[name]
+        ]
+
+    def _normalized_match_value(self, name):
+        # '1990-01-01' et date(1990, 1, 1) doivent être considérés comme égaux
+        field = self._meta.get_field(name[:-3] if name.endswith('_id') else name)
+        value = self.__dict__.get(name)
+        return value if name.endswith('_id') else field.to_python(value)
+
+    def refresh_phonetic_keys(self):
+        """Recalcule les clés phonétiques ; à appeler avant un bulk_create (save() le fait)"""
+        self.first_name_phonetic = phonetic_key(self.first_name)
+        self.last_name_phonetic = phonetic_key(self.last_name)
+
+    def save(self, *args, **kwargs):
+        self.refresh_phonetic_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'first_name_phonetic', 'last_name_phonetic'}
+        super().save(*args, **kwargs)
+
+
+class LostItem(MatchableMixin, models.Model):
     """Déclaration de perte d'une pièce d'identité"""
     STATUS_CHOICES = [
         ('active', 'Active'),
@@ -70,6 +147,9 @@ class LostItem(models.Model):
     document_type = models.ForeignKey(DocumentType, on_delete=models.CASCADE)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
+    # Clés phonétiques (api/phonetics.py), utilisées pour la recherche de candidats
+    first_name_phonetic = models.CharField(max_length=100, blank=True, editable=False)
+    last_name_phonetic = models.CharField(max_length=100, blank=True, editable=False)
     date_of_birth = models.DateField()
     document_number = models.CharField(max_length=50, blank=True)
     lost_date = models.DateField()
@@ -83,24 +163,45 @@ class LostItem(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['document_type', 'last_name_phonetic']),
+            models.Index(fields=['document_type', 'first_name_phonetic']),
+            models.Index(fields=['document_type', 'date_of_birth']),
+            models.Index(fields=['document_type', 'document_number']),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.document_type.name}"
 
-class FoundItem(models.Model):
+class FoundItem(MatchableMixin, models.Model):
     """Déclaration de trouvaille d'une pièce d'identité"""
     STATUS_CHOICES = [
         ('pending', 'En attente'),
         ('processed', 'Traité'),
         ('matched', 'Correspondance trouvée'),
         ('handed_over', 'Remis'),
+        ('duplicate', 'Doublon'),
     ]
 
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     document_type = models.ForeignKey(DocumentType, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='found_items/')
+    # Dérivés générés à l'envoi (voir api/derivatives.py)
+    image_thumbnail = models.ImageField(upload_to='found_items/', blank=True, editable=False)
+    image_medium = models.ImageField(upload_to='found_items/', blank=True, editable=False)
+    image_ocr = models.ImageField(upload_to='found_items/', blank=True, editable=False)
+    # Hash perceptuel (dHash 64 bits) de l'image et ses 4 segments de 16 bits indexés (voir api/duplicates.py)
+    image_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+    image_hash_0 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_hash_1 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_hash_2 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_hash_3 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='duplicates')
     first_name = models.CharField(max_length=100, blank=True)
     last_name = models.CharField(max_length=100, blank=True)
+    first_name_phonetic = models.CharField(max_length=100, blank=True, editable=False)
+    last_name_phonetic = models.CharField(max_length=100, blank=True, editable=False)
     date_of_birth = models.DateField(null=True, blank=True)
     document_number = models.CharField(max_length=50, blank=True)
     found_date = models.DateField()
@@ -109,16 +210,68 @@ class FoundItem(models.Model):
     contact_phone = models.CharField(max_length=20, blank=True)
     contact_email = models.EmailField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Moyenne des scores de reconnaissance par champ (`confidence` de process_image) ; les valeurs
+    # enregistrées avant ce calcul sont la part des champs remplis et ne sont pas recalculées
     ocr_confidence = models.FloatField(default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['document_type', 'last_name_phonetic']),
+            models.Index(fields=['document_type', 'first_name_phonetic']),
+            models.Index(fields=['document_type', 'date_of_birth']),
+            models.Index(fields=['document_type', 'document_number']),
+            models.Index(fields=['image_hash_0']),
+            models.Index(fields=['image_hash_1']),
+            models.Index(fields=['image_hash_2']),
+            models.Index(fields=['image_hash_3']),
+        ]
     
     def __str__(self):
         return f"Pièce trouvée - {self.document_type.name}"
 
+class DocumentNumberGram(models.Model):
+    """
+    Index inversé des n-grammes de caractères des numéros de document normalisés
+    (voir api/ngram.py) : retrouve les numéros proches d'un numéro lu avec des erreurs OCR.
+    """
+    gram = models.CharField(max_length=10)
+    lost_item = models.ForeignKey(LostItem, on_delete=models.CASCADE, null=True, blank=True,
+                                  related_name='document_number_grams')
+    found_item = models.ForeignKey(FoundItem, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='document_number_grams')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['gram', 'lost_item']),
+            models.Index(fields=['gram', 'found_item']),
+        ]
+
+    def __str__(self):
+        return f"{self.gram} -> {self.lost_item_id or self.found_item_id}"
+
+class LshBucket(models.Model):
+    """
+    Seaux LSH (MinHash par bandes, voir api/lsh.py) de la signature nom + date de
+    naissance + numéro de document : une ligne par bande et par objet.
+    """
+    key = models.BigIntegerField()
+    lost_item = models.ForeignKey(LostItem, on_delete=models.CASCADE, null=True, blank=True,
+                                  related_name='lsh_buckets')
+    found_item = models.ForeignKey(FoundItem, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='lsh_buckets')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'lost_item']),
+            models.Index(fields=['key', 'found_item']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} -> {self.lost_item_id or self.found_item_id}"
+
 class Match(models.Model):
     """Correspondance entre une pièce perdue et une pièce trouvée"""
     STATUS_CHOICES = [
@@ -170,6 +323,15 @@ class VerificationRequest(models.Model):
         return f"VerificationRequest Match#{self.match_id} - {self.status}"
 
 
+class NotificationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create n'émet pas post_save : on publie explicitement vers le flux temps réel"""
+        from .realtime import publish_notifications
+        created = super().bulk_create(objs, *args, **kwargs)
+        publish_notifications(created)
+        return created
+
+
 class Notification(models.Model):
     """Notifications pour les utilisateurs"""
     TYPE_CHOICES = [
@@ -186,8 +348,14 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -212,24 +380,46 @@ class Historique(models.Model):
     description = models.TextField()
     related_object_id = models.PositiveIntegerField(null=True, blank=True)  # ID de l'objet lié
     related_object_type = models.CharField(max_length=50, blank=True)  # Type de l'objet lié
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default plutôt que auto_now_add : l'écriture différée conserve l'heure de l'action
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['user', '-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.created_at}"
 
     @staticmethod
     def enregistrerAction(user, action, description, related_object=None):
-        """Enregistre une action dans l'historique"""
-        historique = Historique.objects.create(
+        """
+        Enregistre une action dans l'historique.
+        En mode 'buffered' ou 'celery' (AUDIT_WRITER_MODE), l'insertion est différée
+        et groupée par AuditWriter : l'instance retournée n'est pas encore sauvegardée.
+        """
+        historique = Historique(
             user=user,
             action=action,
             description=description,
             related_object_id=related_object.id if related_object else None,
             related_object_type=related_object.__class__.__name__ if related_object else ''
         )
+        if settings.AUDIT_WRITER_MODE == 'sync':
+            historique.save()
+            return historique
+
+        from .audit import get_audit_writer
+        get_audit_writer().write(
+            user_id=user.id,
+            action=action,
+            description=description,
+            related_object_id=historique.related_object_id,
+            related_object_type=historique.related_object_type,
+            created_at=historique.created_at
+        )
         return historique
 
     @staticmethod
@@ -248,7 +438,129 @@ class Historique(models.Model):
 
         return queryset
 
+    @staticmethod
+    def consulterHistoriqueComplet(user=None, action=None, date_debut=None, date_fin=None):
+        """
+        Comme consulterHistorique, en incluant les entrées archivées.
+        Seuls les segments d'archive qui chevauchent la période sont lus.
+        Retourne une liste de dictionnaires triée de la plus récente à la plus ancienne.
+        """
+        from .archive import ArchiveService
+        entries = list(
+            Historique.consulterHistorique(user, action, date_debut, date_fin).values(
+                'id', 'user_id', 'action', 'description',
+                'related_object_id', 'related_object_type', 'created_at'
+            )
+        )
+        filters = {}
+        if user:
+            filters['user_id'] = user.id
+        if action:
+            filters['action'] = action
+        entries.extend(ArchiveService.read_archived('historique', date_debut, date_fin, **filters))
+        entries.sort(key=lambda entry: entry['created_at'], reverse=True)
+        return entries
+
     @staticmethod
     def filtrerParUtilisateur(user):
         """Filtre l'historique par utilisateur"""
         return Historique.objects.filter(user=user)
+
+
+class OutboxEvent(models.Model):
+    """
+    Effets de bord (notifications, historique) enregistrés dans la même
+    transaction que le changement d'état, puis appliqués par lots par
+    OutboxDispatcher (voir outbox.py).
+    """
+    TYPE_CHOICES = [
+        ('notification', 'Notification'),
+        ('historique', 'Historique'),
+    ]
+
+    event_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    payload = models.JSONField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"OutboxEvent #{self.id} - {self.event_type}"
+
+
+@deconstructible
+class ArchiveStorage(FileSystemStorage):
+    """
+    Stockage privé des archives (ARCHIVE_ROOT, hors de MEDIA_ROOT) : elles contiennent
+    e-mails et descriptions d'actions et ne doivent jamais être servies sous /media/.
+    Emplacement relu à chaque accès (override_settings dans les tests).
+    """
+    @property
+    def base_location(self):
+        return settings.ARCHIVE_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError("Les archives ne sont pas accessibles par URL")
+
+class ArchiveSegment(models.Model):
+    """
+    Lot de lignes archivées (JSON Lines compressé gzip) pour une période d'un mois,
+    retiré de la table chaude par la commande archive_history.
+    """
+    MODEL_CHOICES = [
+        ('historique', 'Historique'),
+        ('notification', 'Notification'),
+    ]
+
+    model_name = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    file = models.FileField(upload_to='archives/', storage=ArchiveStorage())
+    row_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['model_name', 'period_start']
+        indexes = [
+            models.Index(fields=['model_name', 'period_start', 'period_end']),
+        ]
+
+    def __str__(self):
+        return f"Archive {self.model_name} {self.period_start:%Y-%m} ({self.row_count} lignes)"
+
+class UploadSession(models.Model):
+    """
+    Envoi d'image découpé en morceaux et reprenable (voir api/uploads.py) : le fichier
+    est écrit directement à son emplacement final au fil des morceaux reçus.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'En cours'),
+        ('receiving', 'Morceau en cours de réception'),
+        ('complete', 'Terminé'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    file = models.FileField(upload_to='found_items/', max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Envoi {self.filename} ({self.offset}/{self.size})"
@@ -0,0 +1,114 @@
+"""
+Index inversé de n-grammes de caractères sur les numéros de document.
+
+Les numéros lus par OCR sont bruités (chiffre remplacé, omis ou ajouté) : la recherche
+exacte échoue et SequenceMatcher sur tous les candidats d'un type de document est
+linéaire. Chaque numéro est découpé en n-grammes stockés dans DocumentNumberGram ;
+une recherche ne lit que les listes des n-grammes du numéro cherché, puis classe les
+meilleurs candidats par similarité de Dice.
+
+Portable SQLite/PostgreSQL (pas de pg_trgm) ; après changement de
+DOCUMENT_NUMBER_NGRAM_SIZE : python manage.py rebuild_document_number_index
+"""
+import math
+import re
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import DocumentNumberGram, LostItem
+
+NON_ALNUM = re.compile(r'[^0-9A-Z]')
+
+
+def normalize_document_number(value):
+    return NON_ALNUM.sub('', (value or '').upper())
+
+
+def ngrams(value, size=None):
+    """N-grammes distincts du numéro normalisé ; le début et la fin sont marqués comme dans pg_trgm"""
+    size = size or settings.DOCUMENT_NUMBER_NGRAM_SIZE
+    value = normalize_document_number(value)
+    if not value:
+        return set()
+    padded = '^' * (size - 1) + value + '$'
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def similarity(grams_a, grams_b):
+    """Coefficient de Dice entre deux ensembles de n-grammes (1.0 : numéros identiques)"""
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class DocumentNumberIndex:
+    @staticmethod
+    def relation(item):
+        return 'lost_item' if isinstance(item, LostItem) else 'found_item'
+
+    @staticmethod
+    def index(item):
+        """(Ré)indexe le numéro d'un objet enregistré"""
+        DocumentNumberIndex.index_items([item])
+
+    @staticmethod
+    def index_items(items, replace=True, batch_size=1000):
+        """Indexe des objets déjà enregistrés, par exemple après un bulk_create (replace=False)"""
+        rows, ids_by_relation = [], {}
+        for item in items:
+            relation = DocumentNumberIndex.relation(item)
+            ids_by_relation.setdefault(relation, []).append(item.pk)
+            rows.extend(
+                DocumentNumberGram(gram=gram, **{relation: item})
+                for gram in sorted(ngrams(item.document_number))
+            )
+        if replace:
+            for relation, ids in ids_by_relation.items():
+                DocumentNumberGram.objects.filter(**{f'{relation}__in': ids}).delete()
+        DocumentNumberGram.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
+
+    @staticmethod
+    def search(queryset, document_number, limit=None, min_similarity=None):
+        """
+        Les `limit` objets de `queryset` (LostItem ou FoundItem, déjà filtré par type et
+        statut) dont le numéro est le plus proche de `document_number`, sous forme de
+        liste [(objet, similarité)] triée par similarité décroissante.
+        """
+        grams = ngrams(document_number)
+        if not grams:
+            return []
+        limit = limit or settings.DOCUMENT_NUMBER_CANDIDATES
+        if min_similarity is None:
+            min_similarity = settings.DOCUMENT_NUMBER_MIN_SIMILARITY
+        # Dice >= s impose au moins s * (|A| + 1) / 2 n-grammes communs : filtré dans le HAVING
+        min_shared = max(1, math.ceil(min_similarity * (len(grams) + 1) / 2))
+        ranked = (
+            queryset.filter(document_number_grams__gram__in=grams)
+            .annotate(shared_grams=Count('document_number_grams'))
+            .filter(shared_grams__gte=min_shared)
+            .order_by('-shared_grams', 'pk')[:limit * 2]
+        )
+        results = [(item, similarity(grams, ngrams(item.document_number))) for item in ranked]
+        results = [(item, score) for item, score in results if score >= min_similarity]
+        results.sort(key=lambda result: result[1], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def rebuild(model, batch_size=2000):
+        """Reconstruit l'index d'un modèle ; retourne le nombre d'objets indexés"""
+        relation = 'lost_item' if model is LostItem else 'found_item'
+        DocumentNumberGram.objects.filter(**{f'{relation}__isnull': False}).delete()
+        queryset = model.objects.exclude(document_number='').only('id', 'document_number').order_by('pk')
+        count, batch = 0, []
+        for item in queryset.iterator(chunk_size=batch_size):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                DocumentNumberIndex.index_items(batch, replace=False)
+                count += len(batch)
+                batch = []
+        if batch:
+            DocumentNumberIndex.index_items(batch, replace=False)
+            count += len(batch)
+        return count
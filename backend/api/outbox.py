@@ -0,0 +1,182 @@
+from django.conf import settings
+from django.db import transaction
+from .models import OutboxEvent, Notification, Historique, CustomUser, Match
+from .audit import get_audit_writer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Enregistre les effets de bord d'une action dans la table OutboxEvent.
+    À appeler à l'intérieur du transaction.atomic() qui modifie l'état :
+    soit tout est validé (état + événements), soit rien ne l'est.
+    """
+
+    @staticmethod
+    def notify(user, notification_type, title, message, match=None):
+        return Outbox._add('notification', Outbox._notification(user, notification_type, title, message, match))
+
+    @staticmethod
+    def notify_many(users, notification_type, title, message, match=None):
+        """Même notification pour plusieurs destinataires : un seul INSERT d'événements"""
+        events = OutboxEvent.objects.bulk_create([
+            OutboxEvent(event_type='notification',
+                        payload=Outbox._notification(user, notification_type, title, message, match))
+            for user in users
+        ])
+        if events:
+            Outbox._schedule_dispatch()
+        return events
+
+    @staticmethod
+    def _notification(user, notification_type, title, message, match):
+        return {
+            'user_id': user.id,
+            'match_id': match.id if match else None,
+            'notification_type': notification_type,
+            'title': title,
+            'message': message,
+        }
+
+    @staticmethod
+    def record_action(user, action, description, related_object=None):
+        return Outbox._add('historique', {
+            'user_id': user.id,
+            'action': action,
+            'description': description,
+            'related_object_id': related_object.id if related_object else None,
+            'related_object_type': related_object.__class__.__name__ if related_object else '',
+        })
+
+    @staticmethod
+    def _add(event_type, payload):
+        event = OutboxEvent.objects.create(event_type=event_type, payload=payload)
+        Outbox._schedule_dispatch()
+        return event
+
+    @staticmethod
+    def _schedule_dispatch():
+        """
+        Un seul dispatch par transaction, quel que soit le nombre d'événements : le
+        rappel déjà en attente sur la connexion suffit (il disparaît avec un rollback,
+        un événement ultérieur l'enregistre alors de nouveau).
+        """
+        connection = transaction.get_connection()
+        if connection.in_atomic_block and any(
+            entry[1] is OutboxDispatcher.schedule for entry in connection.run_on_commit
+        ):
+            return
+        transaction.on_commit(OutboxDispatcher.schedule)
+
+
+class OutboxDispatcher:
+    """
+    Applique les événements en attente par lots (bulk_create). Hors mode 'sync'
+    (AUDIT_WRITER_MODE), l'historique est confié à AuditWriter, qui le regroupe
+    au-delà d'un seul lot de l'outbox.
+    """
+
+    BUILDERS = {
+        'notification': Notification,
+        'historique': Historique,
+    }
+
+    @staticmethod
+    def schedule():
+        if settings.OUTBOX_DISPATCH_ASYNC:
+            from .tasks import dispatch_outbox
+            try:
+                # Sans nouvelle tentative : un broker injoignable ne doit pas retarder la réponse
+                dispatch_outbox.apply_async(retry=False)
+                return
+            except Exception as e:
+                logger.warning(f"Unable to enqueue outbox dispatch, dispatching in process: {e}")
+        OutboxDispatcher.dispatch_pending()
+
+    @staticmethod
+    def dispatch_pending(batch_size=None):
+        """Traite tous les événements en attente, retourne le nombre appliqué"""
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        dispatched = 0
+        while True:
+            with transaction.atomic():
+                events = list(
+                    OutboxEvent.objects.select_for_update(skip_locked=True)
+                    .filter(attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)
+                    .order_by('id')[:batch_size]
+                )
+                if not events:
+                    break
+                try:
+                    with transaction.atomic():
+                        dispatched += OutboxDispatcher._apply(events)
+                except Exception as e:
+                    logger.warning(f"Outbox batch failed ({e}), retrying events one by one")
+                    dispatched += OutboxDispatcher._apply_individually(events)
+            if len(events) < batch_size:
+                break
+        if dispatched:
+            logger.info(f"Dispatched {dispatched} outbox events")
+        return dispatched
+
+    @staticmethod
+    def _apply(events):
+        events = OutboxDispatcher._drop_orphans(events)
+        by_type = {}
+        for event in events:
+            by_type.setdefault(event.event_type, []).append(event)
+        audited = []
+        if settings.AUDIT_WRITER_MODE != 'sync':
+            audited = by_type.pop('historique', [])
+        for event_type, batch in by_type.items():
+            model = OutboxDispatcher.BUILDERS[event_type]
+            model.objects.bulk_create([model(**event.payload) for event in batch])
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+        # En dernier : une fois dans le spool, l'entrée sera écrite même si ce lot
+        # est rejoué (au moins une fois), elle ne doit donc pas précéder un échec
+        if audited:
+            writer = get_audit_writer()
+            for event in audited:
+                writer.write(created_at=event.created_at, **event.payload)
+        return len(events)
+
+    @staticmethod
+    def _drop_orphans(events):
+        """
+        Écarte les événements dont l'utilisateur ou le match a été supprimé entre-temps
+        (la ligne aurait été supprimée en cascade). Les clés étrangères étant différées
+        sous PostgreSQL, l'erreur n'apparaîtrait qu'au commit et annulerait tout le lot.
+        """
+        user_ids = {e.payload.get('user_id') for e in events}
+        match_ids = {e.payload.get('match_id') for e in events} - {None}
+        existing_users = set(CustomUser.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        existing_matches = set(Match.objects.filter(id__in=match_ids).values_list('id', flat=True)) if match_ids else set()
+
+        kept, orphans = [], []
+        for event in events:
+            match_id = event.payload.get('match_id')
+            if event.payload.get('user_id') in existing_users and (match_id is None or match_id in existing_matches):
+                kept.append(event)
+            else:
+                orphans.append(event.id)
+        if orphans:
+            logger.info(f"Dropping {len(orphans)} orphan outbox events")
+            OutboxEvent.objects.filter(id__in=orphans).delete()
+        return kept
+
+    @staticmethod
+    def _apply_individually(events):
+        applied = 0
+        for event in events:
+            try:
+                with transaction.atomic():
+                    applied += OutboxDispatcher._apply([event])
+            except Exception as e:
+                logger.error(f"Outbox event {event.id} failed: {e}")
+                OutboxEvent.objects.filter(id=event.id).update(
+                    attempts=event.attempts + 1,
+                    last_error=str(e)
+                )
+        return applied
@@ -0,0 +1,46 @@
+import re
+import unicodedata
+
+# Règles appliquées dans l'ordre sur le nom normalisé (majuscules, sans accents ni séparateurs).
+# Elles rapprochent les graphies françaises, wolof et anglaises d'un même nom :
+# Ndiaye / N'Diaye / Ndiay / Njaay, Mamadou / Mamadu, Seydou / Seidou, Khady / Xadi,
+# Cheikh / Sheikh, Gueye / Guèye, Djibril / Jibril, Thiam / Tiam.
+RULES = [
+    (re.compile(r'PH'), 'F'),
+    (re.compile(r'(?:KH|X|Q|CK)'), 'K'),
+    (re.compile(r'(?:SCH|SH|CH)'), 'S'),
+    (re.compile(r'C(?=[EIY])'), 'S'),
+    (re.compile(r'C'), 'K'),
+    (re.compile(r'GU(?=[EIY])'), 'G'),
+    (re.compile(r'(?:TH|DH)'), lambda m: m.group(0)[0]),
+    (re.compile(r'DJ|DI(?=[AEOU])|DY(?=[AEOU])'), 'J'),
+    (re.compile(r'OU'), 'U'),
+    (re.compile(r'[YW](?![AEIOU])'), 'I'),
+    (re.compile(r'Y'), 'I'),
+    (re.compile(r'Z'), 'S'),
+    (re.compile(r'H'), ''),
+    (re.compile(r'([AEIOU])(?:[AEIOU])+'), r'\1'),
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+TRAILING_E = re.compile(r'(?<=[A-Z]{2})E$')
+NON_LETTERS = re.compile(r'[^A-Z]')
+
+
+def normalize_name(name):
+    value = unicodedata.normalize('NFKD', name or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return NON_LETTERS.sub('', value.upper())
+
+
+def phonetic_key(name):
+    """
+    Clé phonétique d'un nom (prénom ou nom de famille) adaptée aux noms sénégalais.
+    Deux graphies d'un même nom donnent la même clé ; chaîne vide si le nom est vide.
+    """
+    value = normalize_name(name)
+    if not value:
+        return ''
+    for pattern, replacement in RULES:
+        value = pattern.sub(replacement, value)
+    # E final muet (Diaye/Diay), conservé pour les noms très courts
+    return TRAILING_E.sub('', value)
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import secrets
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STREAM_TICKET_SALT = 'api.notification_stream'
+
+
+def issue_stream_ticket(user):
+    """
+    Ticket signé ouvrant une connexion au flux SSE de l'utilisateur : EventSource ne
+    peut pas envoyer d'en-tête Authorization, et le jeton JWT ne doit pas apparaître
+    dans les URL (journaux des proxys). Valable NOTIFICATION_STREAM_TICKET_TTL secondes,
+    pour une seule connexion.
+    """
+    return signing.dumps({'user': user.id, 'nonce': secrets.token_urlsafe(12)}, salt=STREAM_TICKET_SALT)
+
+
+def redeem_stream_ticket(ticket):
+    """Id de l'utilisateur du ticket, ou None s'il est invalide, expiré ou déjà utilisé"""
+    ttl = settings.NOTIFICATION_STREAM_TICKET_TTL
+    try:
+        data = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=ttl)
+    except signing.BadSignature:
+        return None
+    if not cache.add(f"api:stream_ticket:{data['nonce']}", True, ttl):
+        return None
+    return data['user']
+
+
+def serialize_notification(notification):
+    """Représentation plate d'une notification pour le flux temps réel"""
+    return {
+        'id': notification.id,
+        'user': notification.user_id,
+        'match': notification.match_id,
+        'notification_type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def format_sse(payload, event='notification'):
+    """Formate un message Server-Sent Events"""
+    lines = []
+    if payload.get('id') is not None:
+        lines.append(f"id: {payload['id']}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class _MemorySubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def push(self, payload):
+        # publish() peut être appelé depuis un thread de vue synchrone
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InMemoryNotificationBroker:
+    """
+    Pub/sub en mémoire du processus. Suffisant pour les tests et un serveur
+    ASGI mono-processus ; utiliser le broker Redis avec plusieurs workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, user_id, payload):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.push(payload)
+            except RuntimeError:
+                # Boucle événementielle déjà fermée : abonnement orphelin
+                self._unsubscribe(subscription)
+
+    async def subscribe(self, user_id):
+        subscription = _MemorySubscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self, user_id):
+        with self._lock:
+            return len(self._subscriptions.get(user_id, ()))
+
+
+class _RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.close()
+        await self.client.close()
+
+
+class RedisNotificationBroker:
+    """Pub/sub Redis partagé entre tous les workers ASGI/WSGI et Celery"""
+    CHANNEL_PREFIX = 'notifications:'
+
+    def __init__(self, url):
+        import redis
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, user_id, payload):
+        self._client.publish(f'{self.CHANNEL_PREFIX}{user_id}', json.dumps(payload))
+
+    async def subscribe(self, user_id):
+        import redis.asyncio as aioredis
+        client = aioredis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(f'{self.CHANNEL_PREFIX}{user_id}')
+        return _RedisSubscription(client, pubsub)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_notification_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if settings.NOTIFICATION_BROKER == 'redis':
+                    _broker = RedisNotificationBroker(settings.NOTIFICATION_BROKER_URL)
+                else:
+                    _broker = InMemoryNotificationBroker()
+    return _broker
+
+
+def publish_notifications(notifications):
+    """
+    Pousse les notifications vers les flux SSE de leurs destinataires,
+    une fois la transaction courante validée.
+    """
+    payloads = [serialize_notification(n) for n in notifications if n.pk]
+    if not payloads:
+        return
+
+    def _publish():
+        broker = get_notification_broker()
+        for payload in payloads:
+            try:
+                broker.publish(payload['user'], payload)
+            except Exception as e:
+                # Le flux temps réel est best-effort : le polling reste disponible
+                logger.warning(f"Unable to publish notification {payload['id']}: {e}")
+
+    transaction.on_commit(_publish)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import DocumentType, LostItem, FoundItem, Match, Notification, CustomUser, VerificationRequest
+from .models import DocumentType, LostItem, FoundItem, Match, Notification, CustomUser, VerificationRequest, UploadSession
+from .uploads import ChunkedUpload, UploadError
 
 class UserSerializer(serializers.ModelSerializer):
     is_admin_plateforme = serializers.SerializerMethodField()
@@ -49,17 +50,42 @@ class FoundItemSerializer(serializers.ModelSerializer):
     document_type = DocumentTypeSerializer(read_only=True)
     document_type_id = serializers.IntegerField(write_only=True)
     image = serializers.ImageField(required=False)
+    image_thumbnail = serializers.ImageField(read_only=True)
+    image_medium = serializers.ImageField(read_only=True)
+    # Envoi découpé terminé (POST /uploads/) à utiliser comme image, à la place de 'image'
+    upload_id = serializers.UUIDField(write_only=True, required=False)
 
     class Meta:
         model = FoundItem
         fields = [
-            'id', 'user', 'document_type', 'document_type_id', 'image',
+            'id', 'user', 'document_type', 'document_type_id', 'image', 'image_thumbnail', 'image_medium', 'upload_id',
             'first_name', 'last_name', 'date_of_birth', 'document_number',
             'found_date', 'found_location', 'description', 'contact_phone',
-            'contact_email', 'status', 'ocr_confidence', 'created_at', 'updated_at'
+            'contact_email', 'status', 'ocr_confidence', 'duplicate_of', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user', 'first_name', 'last_name', 'date_of_birth',
-                           'document_number', 'ocr_confidence', 'created_at', 'updated_at']
+                           'document_number', 'ocr_confidence', 'duplicate_of', 'created_at', 'updated_at']
+
+    def validate_upload_id(self, value):
+        request = self.context.get('request')
+        if request is None:
+            raise serializers.ValidationError("Envoi découpé non disponible ici")
+        try:
+            return ChunkedUpload.claim(request.user, value)
+        except UploadError as e:
+            raise serializers.ValidationError(str(e))
+
+class FoundItemImportSerializer(FoundItemSerializer):
+    """Import en masse (api/imports.py) : l'identité est fournie par le partenaire, sans image"""
+
+    class Meta(FoundItemSerializer.Meta):
+        read_only_fields = ['id', 'user', 'ocr_confidence', 'duplicate_of', 'created_at', 'updated_at']
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'size', 'offset', 'status', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'status', 'created_at', 'updated_at']
 
 class MatchSerializer(serializers.ModelSerializer):
     lost_item = LostItemSerializer(read_only=True)
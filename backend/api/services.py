@@ -1,124 +1,339 @@
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count
+from django.utils import timezone
 from difflib import SequenceMatcher
 from datetime import datetime, date
-from .models import LostItem, FoundItem, Match, Notification
+from .models import LostItem, FoundItem, Match, MatchingRule, Notification, CustomUser
+from . import metrics
+from .phonetics import phonetic_key
+from .ngram import DocumentNumberIndex
+from .lsh import LshIndex
+import heapq
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MatchingService:
+    # Seuil, top-k et poids par type de document : voir MatchingRule (models.py)
+    RULE_CACHE_KEY = 'api:matching_rule:{}'
+    SCORING_ORDER = ('date_of_birth', 'document_number', 'first_name', 'last_name')
+    # Statuts dans lesquels un objet peut encore recevoir des correspondances
+    LOST_ACTIVE_STATUSES = ['active']
+    FOUND_ACTIVE_STATUSES = ['pending', 'processed']
+    # Score minimal d'un nom dont la clé phonétique est identique (variante de transcription)
+    PHONETIC_NAME_SCORE = 0.9
+
     @staticmethod
     def find_matches(item):
         """
-        Trouve les correspondances potentielles pour un objet perdu ou trouvé
+        Trouve les correspondances potentielles pour un objet perdu ou trouvé.
+        Retourne le nombre de candidats évalués (scorés).
         """
+        item_type = type(item).__name__
+        with metrics.MATCHING_DURATION.time(item_type=item_type):
+            candidates, created_count = MatchingService._find_matches(item)
+        metrics.MATCHING_CANDIDATES.inc(candidates, item_type=item_type)
+        if created_count:
+            metrics.MATCHES_CREATED.inc(created_count, item_type=item_type)
+        return candidates
+
+    @staticmethod
+    def _find_matches(item):
+        """Retourne (nombre de candidats évalués, nombre de correspondances créées)"""
         logger.info(f"Starting matching for {type(item).__name__}: {item.id}")
+        candidates = MatchingService.candidates(item)
+        if candidates is None:
+            logger.warning(f"Unknown item type: {type(item)}")
+            return 0, 0
+        rule = MatchingService.rule_for(item.document_type_id)
+        ranked, evaluated, pruned = MatchingService.rank_candidates(item, candidates, rule)
+        if pruned:
+            metrics.MATCHING_CANDIDATES_PRUNED.inc(pruned, item_type=type(item).__name__)
+        logger.info(f"{evaluated} candidates for {type(item).__name__} {item.id}, {len(ranked)} kept, {pruned} pruned")
+
+        created_count = 0
+        for rank, (confidence, candidate) in enumerate(ranked, start=1):
+            lost_item, found_item = (item, candidate) if isinstance(item, LostItem) else (candidate, item)
+            match, created = Match.objects.get_or_create(
+                lost_item=lost_item,
+                found_item=found_item,
+                defaults={
+                    'confidence_score': confidence,
+                    'match_criteria': {'method': 'ranked', 'rank': rank}
+                }
+            )
+            if not created:
+                logger.info(f"Match already exists: {match.id}")
+                continue
+            created_count += 1
+            logger.info(f"Created match: {match.id}")
+            MatchingService.match_notification(item, candidate, match).save()
+            logger.info(f"Created notification for user {candidate.user_id}")
+        return evaluated, created_count
+
+    @staticmethod
+    def candidates(item):
+        """
+        Objets actifs de l'autre côté, même type de document, retenus par le blocage, par
+        clé primaire croissante (ordre de déclaration, voir rank_candidates)
+        """
         if isinstance(item, LostItem):
             # Chercher dans les objets trouvés
-            found_items = FoundItem.objects.filter(
-                document_type=item.document_type,
-                status__in=['pending', 'processed']
-            )
-            logger.info(f"Found {found_items.count()} potential found items for lost item {item.id}")
-            for found_item in found_items:
-                confidence = MatchingService.calculate_confidence(item, found_item)
-                logger.info(f"Confidence for lost {item.id} and found {found_item.id}: {confidence}")
-                if confidence > 0.5:  # Seuil de confiance
-                    match, created = Match.objects.get_or_create(
-                        lost_item=item,
-                        found_item=found_item,
-                        defaults={
-                            'confidence_score': confidence,
-                            'match_criteria': {'method': 'basic'}
-                        }
-                    )
-                    if created:
-                        logger.info(f"Created match: {match.id}")
-                        # Créer une notification
-                        Notification.objects.create(
-                            user=found_item.user,
-                            match=match,
-                            notification_type='match_found',
-                            title='Correspondance trouvée',
-                            message=f'Une correspondance a été trouvée pour votre objet trouvé.'
-                        )
-                        logger.info(f"Created notification for user {found_item.user.id}")
-                    else:
-                        logger.info(f"Match already exists: {match.id}")
+            targets = FoundItem.objects.filter(status__in=MatchingService.FOUND_ACTIVE_STATUSES)
         elif isinstance(item, FoundItem):
             # Chercher dans les objets perdus
-            lost_items = LostItem.objects.filter(
-                document_type=item.document_type,
-                status='active'
-            )
-            logger.info(f"Found {lost_items.count()} potential lost items for found item {item.id}")
-            for lost_item in lost_items:
-                confidence = MatchingService.calculate_confidence(lost_item, item)
-                logger.info(f"Confidence for lost {lost_item.id} and found {item.id}: {confidence}")
-                if confidence > 0.5:
-                    match, created = Match.objects.get_or_create(
-                        lost_item=lost_item,
-                        found_item=item,
-                        defaults={
-                            'confidence_score': confidence,
-                            'match_criteria': {'method': 'basic'}
-                        }
-                    )
-                    if created:
-                        logger.info(f"Created match: {match.id}")
-                        # Créer une notification
-                        Notification.objects.create(
-                            user=lost_item.user,
-                            match=match,
-                            notification_type='match_found',
-                            title='Correspondance trouvée',
-                            message=f'Une correspondance a été trouvée pour votre objet perdu.'
-                        )
-                        logger.info(f"Created notification for user {lost_item.user.id}")
-                    else:
-                        logger.info(f"Match already exists: {match.id}")
+            targets = LostItem.objects.filter(status__in=MatchingService.LOST_ACTIVE_STATUSES)
         else:
-            logger.warning(f"Unknown item type: {type(item)}")
+            return None
+        return targets.filter(
+            MatchingService.candidate_filter(item), document_type=item.document_type_id
+        ).order_by('pk')
+
+    @staticmethod
+    def match_notification(item, candidate, match):
+        """Notification (non enregistrée) du déclarant de l'objet existant `candidate`"""
+        return Notification(
+            user_id=candidate.user_id,
+            match=match,
+            notification_type='match_found',
+            title='Correspondance trouvée',
+            message='Une correspondance a été trouvée pour votre objet '
+                    f"{'trouvé' if isinstance(item, LostItem) else 'perdu'}."
+        )
 
     @staticmethod
-    def calculate_confidence(lost_item, found_item):
-        """Calcule le score de confiance entre deux pièces"""
-        scores = []
-        
-        # Comparaison des noms
-        if lost_item.first_name and found_item.first_name:
-            first_name_score = SequenceMatcher(
-                None, 
-                lost_item.first_name.lower(), 
-                found_item.first_name.lower()
-            ).ratio()
-            scores.append(first_name_score * 0.3)  # Poids 30%
-        
-        if lost_item.last_name and found_item.last_name:
-            last_name_score = SequenceMatcher(
-                None, 
-                lost_item.last_name.lower(), 
-                found_item.last_name.lower()
-            ).ratio()
-            scores.append(last_name_score * 0.3)  # Poids 30%
-        
-        # Comparaison des dates de naissance
-        if lost_item.date_of_birth and found_item.date_of_birth:
-            if lost_item.date_of_birth == found_item.date_of_birth:
-                scores.append(1.0 * 0.25)  # Poids 25%
+    def rank_candidates(item, candidates, rule):
+        """
+        Retourne ([(score, candidat)] des rule['top_k'] meilleurs candidats au-dessus du
+        seuil, nombre de candidats évalués, nombre de candidats abandonnés en cours de calcul).
+        Dès que k candidats sont retenus, le k-ième score devient le plancher : le calcul
+        d'un candidat s'arrête dès que sa borne supérieure ne peut plus le dépasser.
+        """
+        best = []  # tas min de (score, -pk, candidat) : best[0] est le k-ième meilleur
+        evaluated = pruned = 0
+        for candidate in candidates:
+            evaluated += 1
+            floor = best[0][0] if len(best) >= rule['top_k'] else rule['threshold']
+            lost_item, found_item = (item, candidate) if isinstance(item, LostItem) else (candidate, item)
+            confidence = MatchingService.calculate_confidence(lost_item, found_item, rule=rule, floor=floor)
+            if confidence is None:
+                pruned += 1
+                continue
+            if confidence <= floor:
+                continue
+            # À score égal, le candidat déclaré le plus tôt est conservé : les candidats arrivent
+            # par pk croissant et un score égal au plancher est écarté (ou élagué) ci-dessus
+            entry = (confidence, -candidate.pk, candidate)
+            if len(best) < rule['top_k']:
+                heapq.heappush(best, entry)
             else:
-                scores.append(0.0)
-        
-        # Comparaison des numéros de document
-        if lost_item.document_number and found_item.document_number:
-            if lost_item.document_number == found_item.document_number:
-                scores.append(1.0 * 0.15)  # Poids 15%
+                heapq.heapreplace(best, entry)
+        ranked = sorted(best, key=lambda entry: entry[:2], reverse=True)
+        return [(confidence, candidate) for confidence, _pk, candidate in ranked], evaluated, pruned
+
+    @staticmethod
+    def rule_for(document_type_id):
+        """Seuil, top-k et poids du type de document (MatchingRule ou valeurs par défaut), en cache"""
+        key = MatchingService.RULE_CACHE_KEY.format(document_type_id)
+        rule = cache.get(key)
+        metrics.CACHE_REQUESTS.inc(cache='matching_rule', result='miss' if rule is None else 'hit')
+        if rule is None:
+            stored = MatchingRule.objects.filter(document_type_id=document_type_id).first()
+            # Une règle non enregistrée porte les valeurs par défaut des champs
+            rule = (stored or MatchingRule(document_type_id=document_type_id)).as_rule()
+            cache.set(key, rule, settings.MATCHING_RULE_CACHE_TTL)
+        return rule
+
+    @staticmethod
+    def invalidate_rule(document_type_id):
+        cache.delete(MatchingService.RULE_CACHE_KEY.format(document_type_id))
+
+    @staticmethod
+    def rematch(item, changed_fields):
+        """
+        Met à jour les correspondances d'un objet modifié : les correspondances en attente
+        sont recalculées (score mis à jour ou retrait si elles ne passent plus le seuil),
+        puis les nouveaux candidats du même type de document sont recherchés.
+        Les correspondances déjà traitées (confirmées, remises...) ne sont jamais modifiées.
+        """
+        item_type = type(item).__name__
+        if isinstance(item, LostItem):
+            pending = Match.objects.filter(lost_item=item, status='pending').select_related('found_item')
+            active = item.status in MatchingService.LOST_ACTIVE_STATUSES
+        else:
+            pending = Match.objects.filter(found_item=item, status='pending').select_related('lost_item')
+            active = item.status in MatchingService.FOUND_ACTIVE_STATUSES
+        pending = pending.annotate(verification_count=Count('verification_requests'))
+        rule = MatchingService.rule_for(item.document_type_id)
+
+        retracted, updated = [], []
+        for match in pending:
+            lost_item = item if isinstance(item, LostItem) else match.lost_item
+            found_item = item if isinstance(item, FoundItem) else match.found_item
+            if lost_item.document_type_id != found_item.document_type_id:
+                confidence = 0.0
+            else:
+                confidence = MatchingService.calculate_confidence(lost_item, found_item, rule=rule)
+
+            if confidence > rule['threshold']:
+                if confidence != match.confidence_score:
+                    match.confidence_score = confidence
+                    match.match_criteria = {**match.match_criteria, 'rescored_fields': changed_fields}
+                    match.updated_at = timezone.now()
+                    updated.append(match)
+            elif match.verification_count == 0:
+                retracted.append(match.id)
             else:
-                doc_score = SequenceMatcher(
-                    None, 
-                    lost_item.document_number, 
-                    found_item.document_number
-                ).ratio()
-                scores.append(doc_score * 0.15)
-        
-        return sum(scores) if scores else 0.0
+                # Une vérification est en cours : l'administration tranche
+                logger.info(f"Match {match.id} below threshold but under verification, kept")
+
+        if updated:
+            Match.objects.bulk_update(updated, ['confidence_score', 'match_criteria', 'updated_at'])
+        if retracted:
+            Match.objects.filter(id__in=retracted).delete()
+            metrics.MATCHES_RETRACTED.inc(len(retracted), item_type=item_type)
+        logger.info(f"Rematch {item_type} {item.id}: {len(updated)} updated, {len(retracted)} retracted")
+
+        if active:
+            MatchingService.find_matches(item)
+        return {'updated': len(updated), 'retracted': len(retracted)}
+
+    @staticmethod
+    def candidate_filter(item):
+        """
+        Blocage des candidats : seuls les objets partageant une clé phonétique de nom
+        (prénom et nom éventuellement inversés), la date de naissance ou le numéro de
+        document sont évalués. Les colonnes utilisées sont indexées avec document_type.
+        Les numéros proches (erreurs OCR) sont retrouvés par l'index n-grammes, et les
+        objets de signature globale voisine par l'index LSH (champ de blocage corrompu).
+        """
+        if isinstance(item, LostItem):
+            targets = FoundItem.objects.filter(status__in=MatchingService.FOUND_ACTIVE_STATUSES)
+        else:
+            targets = LostItem.objects.filter(status__in=MatchingService.LOST_ACTIVE_STATUSES)
+        targets = targets.filter(document_type_id=item.document_type_id)
+
+        condition = Q(pk__in=[])
+        first_key, last_key = MatchingService.phonetic_keys(item)
+        for key in {first_key, last_key} - {''}:
+            condition |= Q(first_name_phonetic=key) | Q(last_name_phonetic=key)
+        if item.date_of_birth:
+            condition |= Q(date_of_birth=item.date_of_birth)
+        if item.document_number:
+            condition |= Q(document_number=item.document_number)
+            nearest = DocumentNumberIndex.search(targets, item.document_number)
+            condition |= Q(pk__in=[candidate.pk for candidate, _score in nearest])
+        if settings.MATCHING_LSH_ENABLED:
+            condition |= Q(pk__in=[candidate.pk for candidate in LshIndex.search(targets, item)])
+        return condition
+
+    @staticmethod
+    def phonetic_keys(item):
+        """Clés (prénom, nom) stockées, recalculées si l'objet n'a pas encore été enregistré"""
+        return (
+            item.first_name_phonetic or phonetic_key(item.first_name),
+            item.last_name_phonetic or phonetic_key(item.last_name),
+        )
+
+    @staticmethod
+    def name_similarity(lost_name, found_name, lost_key, found_key):
+        """Similarité de deux noms ; deux graphies d'un même nom (Ndiaye / N'Diaye) sont presque égales"""
+        score = SequenceMatcher(None, lost_name.lower(), found_name.lower()).ratio()
+        if lost_key and lost_key == found_key:
+            score = max(score, MatchingService.PHONETIC_NAME_SCORE)
+        return score
+
+    @staticmethod
+    def calculate_confidence(lost_item, found_item, rule=None, floor=None):
+        """
+        Calcule le score de confiance entre deux pièces, pondéré selon le type de document.
+        Avec `floor`, retourne None dès que le score ne peut plus dépasser ce plancher.
+        """
+        weights = (rule or MatchingService.rule_for(lost_item.document_type_id))['weights']
+        # Seuls les champs renseignés des deux côtés comptent ; les moins coûteux d'abord,
+        # pour que la borne supérieure se resserre avant les SequenceMatcher sur les noms
+        fields = [
+            field for field in MatchingService.SCORING_ORDER
+            if getattr(lost_item, field) and getattr(found_item, field)
+        ]
+        remaining = sum(weights[field] for field in fields)
+        score = 0.0
+        for position, field in enumerate(fields, start=1):
+            score += MatchingService.field_similarity(field, lost_item, found_item) * weights[field]
+            remaining -= weights[field]
+            if floor is not None and position < len(fields) and score + remaining <= floor:
+                return None
+        return score
+
+    @staticmethod
+    def field_similarity(field, lost_item, found_item):
+        """Similarité entre 0 et 1 d'un champ renseigné des deux côtés"""
+        lost_value, found_value = getattr(lost_item, field), getattr(found_item, field)
+        if field == 'date_of_birth':
+            return 1.0 if lost_value == found_value else 0.0
+        if field == 'document_number':
+            if lost_value == found_value:
+                return 1.0
+            return SequenceMatcher(None, lost_value, found_value).ratio()
+        # Noms : orthographe puis prononciation
+        return MatchingService.name_similarity(
+            lost_value, found_value,
+            getattr(lost_item, f'{field}_phonetic') or phonetic_key(lost_value),
+            getattr(found_item, f'{field}_phonetic') or phonetic_key(found_value),
+        )
+
+
+class StatisticsService:
+    """
+    Statistiques de la plateforme pour les tableaux de bord admin.
+    Une seule requête d'agrégation conditionnelle par table, mise en cache
+    et invalidée par les signaux d'écriture (voir signals.py).
+    """
+    CACHE_KEY = 'api:platform_stats'
+
+    @staticmethod
+    def get_platform_stats():
+        stats = cache.get(StatisticsService.CACHE_KEY)
+        metrics.CACHE_REQUESTS.inc(cache='platform_stats', result='miss' if stats is None else 'hit')
+        if stats is None:
+            stats = StatisticsService.compute_platform_stats()
+            cache.set(StatisticsService.CACHE_KEY, stats, settings.STATS_CACHE_TTL)
+        return stats
+
+    @staticmethod
+    def invalidate():
+        cache.delete(StatisticsService.CACHE_KEY)
+
+    @staticmethod
+    def _count_by_status(model):
+        """Compte total + répartition par statut en une seule requête"""
+        aggregates = {'total': Count('id')}
+        for code, _label in model.STATUS_CHOICES:
+            aggregates[code] = Count('id', filter=Q(status=code))
+        counts = model.objects.aggregate(**aggregates)
+        total = counts.pop('total')
+        return total, counts
+
+    @staticmethod
+    def compute_platform_stats():
+        users = CustomUser.objects.aggregate(
+            total_users=Count('id'),
+            active_users=Count('id', filter=Q(is_active=True)),
+            citoyens=Count('id', filter=Q(role='citoyen')),
+            admin_public=Count('id', filter=Q(role='admin_public')),
+            admin_plateforme=Count('id', filter=Q(role='admin_plateforme')),
+        )
+        total_lost, lost_by_status = StatisticsService._count_by_status(LostItem)
+        total_found, found_by_status = StatisticsService._count_by_status(FoundItem)
+        total_matches, matches_by_status = StatisticsService._count_by_status(Match)
+
+        return {
+            **users,
+            'total_lost_items': total_lost,
+            'lost_items_by_status': lost_by_status,
+            'total_found_items': total_found,
+            'found_items_by_status': found_by_status,
+            'total_matches': total_matches,
+            'matches_by_status': matches_by_status,
+        }
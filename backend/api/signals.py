@@ -1,25 +1,79 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
-from .models import FoundItem, LostItem
-from .services import MatchingService
+from .models import FoundItem, LostItem, Match, MatchingRule, CustomUser, Notification
+from .services import MatchingService, StatisticsService
+from .ngram import DocumentNumberIndex
+from .lsh import LshIndex, SIGNATURE_FIELDS
+from .realtime import publish_notifications
 import logging
 
 logger = logging.getLogger(__name__)
 
+@receiver(post_init, sender=FoundItem)
+@receiver(post_init, sender=LostItem)
+def snapshot_match_fields(sender, instance, **kwargs):
+    instance.snapshot_match_fields()
+
 @receiver(post_save, sender=FoundItem)
 def trigger_matching_on_found_item(sender, instance, created, **kwargs):
+    if instance.status == 'duplicate':
+        # Doublon d'image d'une trouvaille existante : ni index ni matching
+        return
+    reindex_candidates(instance, created)
     if created:
         logger.info(f"Triggering matching for new FoundItem: {instance.id}")
         try:
             MatchingService.find_matches(instance)
         except Exception as e:
             logger.error(f"Error in matching for FoundItem {instance.id}: {e}")
+    else:
+        rematch_if_changed(instance)
+    instance.snapshot_match_fields()
 
 @receiver(post_save, sender=LostItem)
 def trigger_matching_on_lost_item(sender, instance, created, **kwargs):
+    reindex_candidates(instance, created)
     if created:
         logger.info(f"Triggering matching for new LostItem: {instance.id}")
         try:
             MatchingService.find_matches(instance)
         except Exception as e:
             logger.error(f"Error in matching for LostItem {instance.id}: {e}")
+    else:
+        rematch_if_changed(instance)
+    instance.snapshot_match_fields()
+
+def reindex_candidates(instance, created):
+    """Met à jour les index n-grammes et LSH avant le matching (la suppression se fait en cascade)"""
+    changed = set(instance.changed_match_fields())
+    if created or 'document_number' in changed:
+        DocumentNumberIndex.index(instance)
+    if created or changed & set(SIGNATURE_FIELDS):
+        LshIndex.index(instance)
+
+def rematch_if_changed(instance):
+    """Relance le matching uniquement si un champ utilisé pour le score a changé"""
+    changed = instance.changed_match_fields()
+    if not changed:
+        return
+    logger.info(f"Rematching {type(instance).__name__} {instance.id} after change of {changed}")
+    try:
+        MatchingService.rematch(instance, changed)
+    except Exception as e:
+        logger.error(f"Error in rematching for {type(instance).__name__} {instance.id}: {e}")
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=LostItem)
+@receiver([post_save, post_delete], sender=FoundItem)
+@receiver([post_save, post_delete], sender=Match)
+def invalidate_platform_stats(sender, **kwargs):
+    StatisticsService.invalidate()
+
+@receiver([post_save, post_delete], sender=MatchingRule)
+def invalidate_matching_rule(sender, instance, **kwargs):
+    MatchingService.invalidate_rule(instance.document_type_id)
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+    if created:
+        publish_notifications([instance])
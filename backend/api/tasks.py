@@ -0,0 +1,44 @@
+import time
+from celery import shared_task
+from celery.signals import task_prerun, task_postrun
+from .outbox import OutboxDispatcher
+from .audit import remove_segments, write_entries
+from . import metrics
+
+_task_started = {}
+
+
+@task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.CELERY_TASK_DURATION.observe(
+            time.perf_counter() - started, task=task.name if task else '', state=state or ''
+        )
+        # Sans attendre l'écriture périodique : un worker peut être recyclé juste après
+        try:
+            metrics.REGISTRY.write_snapshot()
+        except OSError:
+            pass
+
+
+@shared_task
+def dispatch_outbox():
+    """Applique les notifications et entrées d'historique en attente"""
+    return OutboxDispatcher.dispatch_pending()
+
+
+@shared_task
+def write_audit_entries(entries, segments=()):
+    """
+    Insère un lot d'entrées d'historique mis en tampon par AuditWriter, puis
+    supprime les segments de spool qui les contiennent (conservés si l'insertion échoue)
+    """
+    write_entries(entries)
+    remove_segments(segments)
+    return len(entries)
@@ -3,8 +3,49 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import DocumentType, LostItem, FoundItem, Match, Notification, CustomUser
-from .services import MatchingService
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+from .models import (
+    DocumentType, LostItem, FoundItem, Match, Notification, CustomUser, Historique,
+    OutboxEvent, VerificationRequest, ArchiveSegment, MatchingRule, UploadSession
+)
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+from asgiref.sync import async_to_sync, sync_to_async
+from rest_framework_simplejwt.tokens import RefreshToken
+from .services import MatchingService, StatisticsService
+from .realtime import get_notification_broker
+from .outbox import OutboxDispatcher
+from .audit import AuditWriter
+from .archive import ArchiveService
+from .backfill import RematchBackfill
+from .imports import iter_json_records
+from .exports import Export
+from .duplicates import ImageHashIndex, dhash, hamming
+from .uploads import ChunkedUpload
+from .benchmark import MatchingBenchmark, SyntheticPopulation
+from .loadtest import LoadTestRunner, InProcessTransport
+from .instrumentation import QueryInspector, query_stats
+from .phonetics import phonetic_key
+from .ngram import DocumentNumberIndex, ngrams
+from .lsh import LshIndex, band_keys
+from . import metrics
+from .views import NotificationStreamView
+from ocr.benchmark import OCRBenchmark, compare_to_baseline, flatten, percentile, run_stages
+from ocr.classifier import Classification, classify, refine_document_type
+from ocr.mrz import locate_mrz, parse_mrz
+from ocr.variants import brightened, deskewed, vote
 
 
 class AuthTests(APITestCase):
@@ -315,3 +356,1771 @@ class DeclarationToMatchingFlowTests(APITestCase):
         self.assertEqual(list_response.data['count'], 1)
         self.assertEqual(list_response.data['results'][0]['id'], match.id)
 
+
+class PlatformStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.admin_user = CustomUser.objects.create_user(
+            username='stats_admin',
+            email='stats_admin@example.com',
+            password='pass12345',
+            role='admin_plateforme'
+        )
+        self.citoyen = CustomUser.objects.create_user(
+            username='stats_citoyen',
+            email='stats_citoyen@example.com',
+            password='pass12345',
+            role='citoyen'
+        )
+        self.url = reverse('customuser-stats')
+
+    def _create_lost_item(self):
+        return LostItem.objects.create(
+            user=self.citoyen,
+            document_type=self.document_type,
+            first_name='Moussa',
+            last_name='Sow',
+            date_of_birth='1985-03-12',
+            lost_date='2024-10-01',
+            lost_location='Thiès'
+        )
+
+    def test_stats_counts_by_role_and_status(self):
+        self._create_lost_item()
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['citoyens'], CustomUser.objects.filter(role='citoyen').count())
+        self.assertEqual(response.data['total_lost_items'], 1)
+        self.assertEqual(response.data['lost_items_by_status']['active'], 1)
+        self.assertEqual(response.data['total_matches'], 0)
+
+    def test_stats_use_one_query_per_table_and_cache(self):
+        with CaptureQueriesContext(connection) as ctx:
+            StatisticsService.get_platform_stats()
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+        with CaptureQueriesContext(connection) as ctx:
+            StatisticsService.get_platform_stats()
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_stats_invalidated_on_write(self):
+        self.assertEqual(StatisticsService.get_platform_stats()['total_lost_items'], 0)
+        self._create_lost_item()
+        self.assertEqual(StatisticsService.get_platform_stats()['total_lost_items'], 1)
+
+    def test_stats_forbidden_for_citoyen(self):
+        self.client.force_authenticate(user=self.citoyen)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class NotificationStreamTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='stream_user',
+            email='stream@example.com',
+            password='pass12345'
+        )
+
+    def _create_notifications(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.bulk_create([
+                Notification(
+                    user=self.user,
+                    notification_type='match_found',
+                    title=f'Notification {i}',
+                    message='Une correspondance a été trouvée.'
+                ) for i in range(count)
+            ])
+
+    def test_bulk_created_notifications_are_published(self):
+        broker = get_notification_broker()
+
+        async def scenario():
+            subscription = await broker.subscribe(self.user.id)
+            try:
+                await sync_to_async(self._create_notifications)(2)
+                return [await subscription.get(timeout=1), await subscription.get(timeout=1)]
+            finally:
+                await subscription.close()
+
+        payloads = async_to_sync(scenario)()
+        self.assertEqual([p['title'] for p in payloads], ['Notification 0', 'Notification 1'])
+        self.assertEqual(broker.subscriber_count(self.user.id), 0)
+
+    def test_stream_requires_authentication(self):
+        response = self.client.get(reverse('notification_stream'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def _open(self, query, **headers):
+        request = RequestFactory().get(f'/api/notifications/stream/?{query}', **headers)
+
+        async def consume():
+            response = await NotificationStreamView.as_view()(request)
+            if response.status_code != 200:
+                return response.status_code, ''
+            return response.status_code, b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        return async_to_sync(consume)()
+
+    def _ticket(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('notification-stream-ticket'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['ticket']
+
+    @override_settings(NOTIFICATION_STREAM_MAX_AGE=0)
+    def test_stream_replays_notifications_after_last_event_id(self):
+        first, second = self._create_notifications(2)
+        code, chunks = self._open(f'ticket={self._ticket()}', HTTP_LAST_EVENT_ID=str(first.id))
+        self.assertEqual(code, 200)
+        self.assertIn(f'id: {second.id}', chunks)
+        self.assertNotIn(f'id: {first.id}\n', chunks)
+
+    @override_settings(NOTIFICATION_STREAM_MAX_AGE=0)
+    def test_ticket_is_single_use_and_jwt_stays_out_of_url(self):
+        ticket = self._ticket()
+        self.assertEqual(self._open(f'ticket={ticket}')[0], 200)
+        self.assertEqual(self._open(f'ticket={ticket}')[0], 401)
+        # Le jeton d'accès n'est accepté que dans l'en-tête Authorization
+        token = str(RefreshToken.for_user(self.user).access_token)
+        self.assertEqual(self._open(f'token={token}')[0], 401)
+        self.assertEqual(self._open('', HTTP_AUTHORIZATION=f'Bearer {token}')[0], 200)
+
+    @override_settings(NOTIFICATION_STREAM_MAX_AGE=0, NOTIFICATION_STREAM_TICKET_TTL=30)
+    def test_expired_ticket_is_rejected(self):
+        ticket = self._ticket()
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 31):
+            self.assertEqual(self._open(f'ticket={ticket}')[0], 401)
+
+
+@override_settings(AUDIT_WRITER_MODE='sync', OUTBOX_DISPATCH_ASYNC=False)
+class OutboxTests(APITestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.finder = CustomUser.objects.create_user(
+            username='finder', email='finder_outbox@example.com', password='pass12345'
+        )
+        self.admin_public = CustomUser.objects.create_user(
+            username='agent', email='agent@example.com', password='pass12345',
+            role='admin_public'
+        )
+        lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Awa',
+            last_name='Ndiaye', date_of_birth='1990-02-01', lost_date='2024-10-01',
+            lost_location='Dakar'
+        )
+        found_item = FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, found_date='2024-10-02',
+            found_location='Dakar'
+        )
+        self.match, _ = Match.objects.get_or_create(
+            lost_item=lost_item, found_item=found_item,
+            defaults={'confidence_score': 0.9, 'match_criteria': {'method': 'basic'}}
+        )
+        self.verification = VerificationRequest.objects.create(
+            match=self.match, requested_by=self.admin_public
+        )
+        Notification.objects.all().delete()
+        self.url = reverse(
+            'verificationrequest-supervise-restitution',
+            kwargs={'pk': self.verification.id}
+        )
+
+    def test_supervise_restitution_side_effects_go_through_outbox(self):
+        self.client.force_authenticate(user=self.admin_public)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(OutboxEvent.objects.count(), 0)
+        self.assertEqual(Notification.objects.filter(match=self.match).count(), 2)
+        self.assertTrue(Historique.objects.filter(
+            user=self.admin_public, action='item_handed_over').exists())
+
+    def test_failed_restitution_leaves_no_partial_side_effects(self):
+        self.client.force_authenticate(user=self.admin_public)
+        with mock.patch.object(FoundItem, 'save', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(self.url)
+        self.verification.refresh_from_db()
+        self.match.refresh_from_db()
+        self.assertEqual(self.verification.status, 'pending')
+        self.assertEqual(self.match.status, 'pending')
+        self.assertEqual(OutboxEvent.objects.count(), 0)
+
+    @override_settings(OUTBOX_DISPATCH_ASYNC=True)
+    def test_one_dispatch_per_transaction_for_fan_out(self):
+        for i in range(2):
+            CustomUser.objects.create_user(
+                username=f'agent{i}', email=f'agent{i}@example.com', password='pass12345', role='admin_public'
+            )
+        platform_admin = CustomUser.objects.create_user(
+            username='platform', email='platform@example.com', password='pass12345', role='admin_plateforme'
+        )
+        self.client.force_authenticate(user=platform_admin)
+        url = reverse('match-request-auth-check', kwargs={'pk': self.match.id})
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            OutboxEvent.objects.filter(payload__title='Vérification requise').count(),
+            CustomUser.objects.filter(role='admin_public').count()
+        )
+        scheduled = [callback for callback in callbacks if callback is OutboxDispatcher.schedule]
+        self.assertEqual(len(scheduled), 1)
+        with mock.patch('api.tasks.dispatch_outbox') as task:
+            scheduled[0]()
+        task.apply_async.assert_called_once_with(retry=False)
+
+    @override_settings(OUTBOX_DISPATCH_ASYNC=True)
+    def test_unreachable_broker_falls_back_to_in_process_dispatch(self):
+        from findmyid import celery_app
+        from .tasks import dispatch_outbox
+        # Tâche rattachée à l'application configurée (CELERY_* des settings)
+        self.assertIs(dispatch_outbox.app, celery_app)
+        self.client.force_authenticate(user=self.admin_public)
+        with mock.patch.object(dispatch_outbox, 'apply_async', side_effect=OSError('Connection refused')):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(OutboxEvent.objects.count(), 0)
+        self.assertEqual(Notification.objects.filter(match=self.match).count(), 2)
+
+    def test_dispatcher_batches_and_drops_orphan_events(self):
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(event_type='historique', payload={
+                'user_id': self.owner.id, 'action': 'match_confirmed',
+                'description': f'Action {i}', 'related_object_id': None,
+                'related_object_type': ''
+            }) for i in range(3)
+        ] + [
+            OutboxEvent(event_type='notification', payload={
+                'user_id': 999999, 'match_id': None, 'notification_type': 'match_found',
+                'title': 'Orpheline', 'message': 'Utilisateur supprimé'
+            })
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            dispatched = OutboxDispatcher.dispatch_pending(batch_size=10)
+        self.assertEqual(dispatched, 3)
+        self.assertEqual(Historique.objects.filter(user=self.owner).count(), 3)
+        self.assertEqual(OutboxEvent.objects.count(), 0)
+        self.assertEqual(
+            len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "api_historique"')]), 1
+        )
+
+
+class AuditWriterTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='audited', email='audited@example.com', password='pass12345'
+        )
+        self.spool_dir = tempfile.mkdtemp()
+        self.writer = AuditWriter(self.spool_dir, batch_size=10, auto_flush=False)
+
+    def test_entries_are_buffered_then_bulk_inserted(self):
+        for i in range(5):
+            self.writer.write(self.user.id, 'login', f'Connexion {i}')
+        self.assertEqual(Historique.objects.count(), 0)
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            written = self.writer.flush()
+        self.assertEqual(written, 5)
+        self.assertEqual(Historique.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(
+            len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]), 1
+        )
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_spool_left_by_dead_process_is_replayed(self):
+        path = os.path.join(self.spool_dir, 'audit-999999999-0f3a.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'user_id': self.user.id, 'action': 'logout', 'description': 'Déconnexion',
+                'related_object_id': None, 'related_object_type': '',
+                'created_at': '2024-10-01T08:00:00+00:00'
+            }) + '\n')
+            f.write('{"user_id": ')  # ligne tronquée par le crash
+
+        self.assertEqual(self.writer.recover(), 1)
+        entry = Historique.objects.get(user=self.user)
+        self.assertEqual(entry.created_at.year, 2024)
+        self.assertFalse(os.path.exists(path))
+
+    def test_segment_of_previous_process_with_same_pid_is_not_reused(self):
+        # Processus précédent mort, relancé avec le même pid
+        stale = os.path.join(self.spool_dir, f'audit-{os.getpid()}-0f3a.jsonl')
+        with open(stale, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'user_id': self.user.id, 'action': 'logout', 'description': 'Avant le crash',
+                'related_object_id': None, 'related_object_type': '', 'created_at': None
+            }) + '\n')
+        self.writer.write(self.user.id, 'login', 'Après le redémarrage')
+        self.assertEqual(len(os.listdir(self.spool_dir)), 2)
+
+        self.assertEqual(self.writer.recover(), 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(Historique.objects.filter(user=self.user).count(), 2)
+
+    def test_segment_claimed_by_another_process_is_skipped(self):
+        path = os.path.join(self.spool_dir, 'audit-999999999-0f3a.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'user_id': self.user.id, 'action': 'logout', 'description': 'Déconnexion',
+                'related_object_id': None, 'related_object_type': '', 'created_at': None
+            }) + '\n')
+        # Un autre worker a renommé le segment entre la liste et la réclamation
+        with mock.patch('api.audit.os.rename', side_effect=FileNotFoundError):
+            self.assertEqual(self.writer.recover(), 0)
+        self.assertEqual(Historique.objects.count(), 0)
+
+    def test_outbox_history_goes_through_writer(self):
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(event_type='historique', payload={
+                'user_id': self.user.id, 'action': 'login', 'description': f'Connexion {i}',
+                'related_object_id': None, 'related_object_type': ''
+            }) for i in range(3)
+        ])
+        with mock.patch('api.outbox.get_audit_writer', return_value=self.writer):
+            self.assertEqual(OutboxDispatcher.dispatch_pending(), 3)
+        self.assertEqual(OutboxEvent.objects.count(), 0)
+        self.assertEqual(Historique.objects.count(), 0)
+        self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(Historique.objects.filter(user=self.user).count(), 3)
+
+    def test_celery_mode_keeps_segment_until_task_has_written(self):
+        from .tasks import write_audit_entries
+        writer = AuditWriter(self.spool_dir, batch_size=10, mode='celery', auto_flush=False)
+        for i in range(2):
+            writer.write(self.user.id, 'login', f'Connexion {i}')
+        with mock.patch.object(write_audit_entries, 'apply_async') as publish:
+            self.assertEqual(writer.flush(), 2)
+        entries, segments = publish.call_args.args[0]
+        # Publié mais pas encore inséré : le segment reste pour recover()
+        self.assertEqual(Historique.objects.count(), 0)
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+        with mock.patch('api.tasks.write_entries', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                write_audit_entries(entries, segments)
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+        self.assertEqual(write_audit_entries(entries, segments), 2)
+        self.assertEqual(Historique.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_celery_mode_writes_in_process_when_publish_fails(self):
+        from .tasks import write_audit_entries
+        writer = AuditWriter(self.spool_dir, batch_size=10, mode='celery', auto_flush=False)
+        writer.write(self.user.id, 'login', 'Connexion')
+        with mock.patch.object(write_audit_entries, 'apply_async', side_effect=OSError('Connection refused')):
+            self.assertEqual(writer.flush(), 1)
+        self.assertEqual(Historique.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    @override_settings(AUDIT_WRITER_MODE='sync')
+    def test_sync_mode_inserts_immediately(self):
+        historique = Historique.enregistrerAction(self.user, 'login', 'Connexion')
+        self.assertIsNotNone(historique.pk)
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.archive_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root, ARCHIVE_ROOT=self.archive_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = CustomUser.objects.create_user(
+            username='archived', email='archived@example.com', password='pass12345'
+        )
+        now = timezone.now()
+        self.old = now - timedelta(days=500)
+        self.recent = now - timedelta(days=5)
+        for i in range(3):
+            Historique.objects.create(user=self.user, action='login', description=f'Ancienne {i}', created_at=self.old)
+        Historique.objects.create(user=self.user, action='logout', description='Récente', created_at=self.recent)
+        Notification.objects.create(user=self.user, notification_type='system', title='Lue', message='m', is_read=True)
+        Notification.objects.create(user=self.user, notification_type='system', title='Non lue', message='m')
+        Notification.objects.update(created_at=self.old)
+
+    def test_old_rows_are_moved_to_monthly_segments(self):
+        results = ArchiveService.archive('historique', 365, batch_size=2)
+        self.assertEqual(sum(count for _, count in results), 3)
+        self.assertEqual(Historique.objects.count(), 1)
+        # Deux lots de 2 et 1 lignes pour le même mois
+        self.assertEqual(ArchiveSegment.objects.filter(model_name='historique').count(), 2)
+
+        ArchiveService.archive('notification', 90)
+        self.assertEqual(list(Notification.objects.values_list('title', flat=True)), ['Non lue'])
+        # Données personnelles : hors de MEDIA_ROOT, jamais servies sous /media/
+        segment = ArchiveSegment.objects.first()
+        self.assertTrue(segment.file.path.startswith(self.archive_root))
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_dry_run_keeps_rows(self):
+        results = ArchiveService.archive('historique', 365, dry_run=True)
+        self.assertEqual(sum(count for _, count in results), 3)
+        self.assertEqual(Historique.objects.count(), 4)
+        self.assertFalse(ArchiveSegment.objects.exists())
+
+    def test_history_query_only_reads_overlapping_segments(self):
+        ArchiveService.archive('historique', 365)
+        self.assertEqual(
+            ArchiveService.segments_for('historique', date_debut=self.recent - timedelta(days=1)).count(), 0
+        )
+        with mock.patch.object(ArchiveService, 'read_segment') as read_segment:
+            entries = Historique.consulterHistoriqueComplet(self.user, date_debut=self.recent - timedelta(days=1))
+        read_segment.assert_not_called()
+        self.assertEqual([e['description'] for e in entries], ['Récente'])
+
+        entries = Historique.consulterHistoriqueComplet(self.user, action='login')
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[0]['created_at'], self.old)
+
+    def test_archived_history_is_readable_through_api(self):
+        ArchiveService.archive('historique', 365)
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('historique'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['description'] for e in response.data], ['Récente', 'Ancienne 0', 'Ancienne 1', 'Ancienne 2'])
+        response = self.client.get(reverse('historique'), {'date_fin': (self.old + timedelta(days=1)).date().isoformat()})
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(self.client.get(reverse('historique'), {'date_debut': 'hier'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        # Historique d'un autre utilisateur : administrateur plateforme seulement
+        self.assertEqual(self.client.get(reverse('historique'), {'user': other.id}).status_code,
+                         status.HTTP_403_FORBIDDEN)
+        other.role = 'admin_plateforme'
+        other.save()
+        self.client.force_authenticate(user=other)
+        self.assertEqual(len(self.client.get(reverse('historique'), {'user': self.user.id}).data), 4)
+
+
+class MatchingBenchmarkTests(APITestCase):
+    def test_noisy_copy_keeps_ground_truth_recognisable(self):
+        population = SyntheticPopulation(seed=1, noise=1.0)
+        identity = population.identity()
+        copy = population.noisy_copy(identity)
+        self.assertNotEqual(copy, identity)
+        self.assertEqual(len(identity['document_number']), 13)
+
+    def test_benchmark_reports_and_rolls_back(self):
+        report = MatchingBenchmark(200, queries=20, noise=0.2, document_types=2).run()
+        self.assertGreater(report['queries'], 0)
+        self.assertGreater(report['p99_ms'], 0)
+        self.assertGreaterEqual(report['avg_queries'], 2)
+        self.assertGreater(report['recall'], 0.5)
+        # Candidats réellement scorés : au plus les déclarations du même type de document
+        self.assertGreater(report['avg_scored'], 0)
+        self.assertLessEqual(report['avg_scored'], 200)
+        self.assertGreater(report['candidates_per_second'], 0)
+        self.assertFalse(LostItem.objects.exists())
+        self.assertFalse(CustomUser.objects.filter(username__startswith='bench-').exists())
+
+
+class LoadTestTests(APITestCase):
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_journeys_are_recorded_per_endpoint(self):
+        DocumentType.objects.create(name="Carte d'identité")
+        CustomUser.objects.create_user(
+            username='admin@loadtest.invalid', email='admin@loadtest.invalid',
+            password='Loadtest-admin-123', role='admin_plateforme'
+        )
+        runner = LoadTestRunner(
+            InProcessTransport(), users=1, duration=None, iterations=3,
+            mix={'citizen': 1, 'finder': 1, 'admin': 1},
+            admin_email='admin@loadtest.invalid', admin_password='Loadtest-admin-123',
+            seed_found_items=20,
+        )
+        report = runner.run()
+        self.assertIn('POST /api/token/', report['endpoints'])
+        token_stats = report['endpoints']['POST /api/token/']
+        self.assertEqual(token_stats['statuses'], {'200': token_stats['requests']})
+        self.assertIsNotNone(token_stats['avg_queries'])
+        self.assertGreater(report['rps'], 0)
+
+        LoadTestRunner.cleanup()
+        self.assertFalse(CustomUser.objects.filter(email__endswith='@loadtest.invalid').exists())
+
+
+class QueryInstrumentationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='inspected', email='inspected@example.com', password='pass12345'
+        )
+        query_stats.reset()
+
+    def test_inspector_detects_repeated_queries(self):
+        with QueryInspector() as inspector:
+            for _ in range(3):
+                list(CustomUser.objects.filter(id__in=[self.user.id, 0]))
+            CustomUser.objects.count()
+        self.assertEqual(inspector.count, 4)
+        (signature, count), = inspector.duplicates()
+        self.assertEqual(count, 3)
+        self.assertIn('IN (...)', signature)
+        self.assertEqual(len(inspector.slowest(limit=2)), 2)
+
+    @override_settings(QUERY_INSPECTOR_HEADERS=True)
+    def test_middleware_sets_debug_headers_and_aggregates(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('documenttype-list'))
+        self.assertGreaterEqual(int(response['X-DB-Query-Count']), 1)
+        self.assertIn('X-DB-Query-Time-Ms', response)
+        self.assertEqual(query_stats.snapshot()['GET documenttype-list']['requests'], 1)
+
+    @override_settings(QUERY_COUNT_THRESHOLD=0, QUERY_INSPECTOR_HEADERS=False)
+    def test_endpoint_over_threshold_is_logged(self):
+        self.client.force_authenticate(user=self.user)
+        with self.assertLogs('api.queries', level='WARNING') as logs:
+            response = self.client.get(reverse('documenttype-list'))
+        self.assertNotIn('X-DB-Query-Count', response)
+        self.assertIn('GET documenttype-list', logs.output[0])
+
+    @override_settings(QUERY_INSPECTOR_HEADERS=True, QUERY_DUPLICATE_THRESHOLD=10)
+    def test_unresolved_paths_share_one_label_and_small_n_plus_one_is_reported(self):
+        from django.http import HttpResponse
+        from .middleware import QueryCountMiddleware
+
+        def view(request):
+            for _ in range(3):
+                list(CustomUser.objects.filter(id=self.user.id))
+            return HttpResponse()
+
+        middleware = QueryCountMiddleware(view)
+        for path in ('/wp-login.php', '/api/inconnu/42/'):
+            response = middleware(RequestFactory().get(path))
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '2')
+        snapshot = query_stats.snapshot()
+        self.assertEqual(snapshot['GET unresolved']['requests'], 2)
+        self.assertNotIn('GET /wp-login.php', snapshot)
+
+
+class MetricsTests(APITestCase):
+    def test_exposition_format(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter('demo_total', 'Demo', ['kind'], registry=registry)
+        histogram = metrics.Histogram('demo_seconds', 'Demo', registry=registry, buckets=(0.1, 1))
+        counter.inc(kind='a')
+        counter.inc(2, kind='a')
+        histogram.observe(0.5)
+        text = registry.expose()
+        self.assertIn('# TYPE demo_total counter', text)
+        self.assertIn('demo_total{kind="a"} 3', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('demo_seconds_count 1', text)
+        with self.assertRaises(ValueError):
+            counter.inc(other='b')
+
+    def test_find_matches_and_requests_are_measured(self):
+        user = CustomUser.objects.create_user(username='metrics', email='metrics@example.com', password='pass12345')
+        document_type = DocumentType.objects.create(name='Passeport')
+        calls = metrics.MATCHING_DURATION.count(item_type='LostItem')
+        LostItem.objects.create(
+            user=user, document_type=document_type, first_name='Awa', last_name='Fall',
+            date_of_birth='1990-01-01', lost_date='2024-10-01', lost_location='Dakar'
+        )
+        self.assertEqual(metrics.MATCHING_DURATION.count(item_type='LostItem'), calls + 1)
+
+        self.client.force_authenticate(user=user)
+        self.client.get(reverse('documenttype-list'))
+        with override_settings(METRICS_TOKEN='secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'findmyid_http_request_duration_seconds_count{view="DocumentTypeViewSet",action="list",method="GET",status="200"}',
+            body
+        )
+        self.assertIn('findmyid_ocr_pending_items 0', body)
+
+    def test_snapshots_of_other_processes_are_merged(self):
+        directory = tempfile.mkdtemp()
+        registry = metrics.Registry(multiprocess_dir=directory, flush_interval=60)
+        counter = metrics.Counter('demo_total', 'Demo', ['kind'], registry=registry)
+        histogram = metrics.Histogram('demo_seconds', 'Demo', registry=registry, buckets=(0.1, 1))
+        gauge = metrics.Gauge('demo_load_seconds', 'Demo', registry=registry)
+        counter.inc(kind='a')
+        histogram.observe(0.05)
+        gauge.set(1.5)
+        # Instantané d'un autre worker (gunicorn ou Celery)
+        with open(os.path.join(directory, 'metrics-999999999.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'demo_total': [[['a'], 2], [['b'], 1]],
+                'demo_seconds': [[[], {'buckets': [0, 1, 1], 'sum': 0.5, 'count': 1}]],
+                'demo_load_seconds': [[[], 4.0]],
+            }, f)
+        text = registry.expose()
+        self.assertIn('demo_total{kind="a"} 3', text)
+        self.assertIn('demo_total{kind="b"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 2', text)
+        self.assertIn('demo_seconds_count 2', text)
+        self.assertIn('demo_load_seconds 4', text)
+        self.assertTrue(os.path.exists(os.path.join(directory, f'metrics-{os.getpid()}.json')))
+
+    def test_celery_task_duration_is_written_for_the_scrape(self):
+        from . import tasks
+        directory = tempfile.mkdtemp()
+        task = mock.Mock()
+        task.name = 'api.tasks.dispatch_outbox'
+        with mock.patch.object(metrics.REGISTRY, '_multiprocess_dir', directory):
+            tasks._record_task_start(task_id='t1')
+            tasks._record_task_duration(task_id='t1', task=task, state='SUCCESS')
+        with open(os.path.join(directory, f'metrics-{os.getpid()}.json'), encoding='utf-8') as f:
+            snapshot = json.load(f)
+        self.assertIn([['api.tasks.dispatch_outbox', 'SUCCESS'], mock.ANY],
+                      snapshot['findmyid_celery_task_duration_seconds'])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_endpoint_without_token_is_served_only_in_debug(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class IncrementalRematchTests(APITestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+        self.found_item = FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            first_name='Awa', last_name='Diop', date_of_birth='1990-05-04',
+            document_number='1234567890123', found_date='2024-10-02', found_location='Dakar'
+        )
+        self.lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Awa', last_name='Diop',
+            date_of_birth='1990-05-04', document_number='1234567890123',
+            lost_date='2024-10-01', lost_location='Dakar'
+        )
+        self.match = Match.objects.get(lost_item=self.lost_item, found_item=self.found_item)
+
+    def test_irrelevant_edit_skips_matching(self):
+        lost_item = LostItem.objects.get(id=self.lost_item.id)
+        lost_item.description = 'Portefeuille noir'
+        lost_item.contact_phone = '770000000'
+        with mock.patch.object(MatchingService, 'rematch') as rematch:
+            lost_item.save()
+        rematch.assert_not_called()
+
+    def test_edit_updates_or_retracts_pending_match(self):
+        lost_item = LostItem.objects.get(id=self.lost_item.id)
+        lost_item.document_number = '1234567890124'
+        lost_item.save()
+        self.match.refresh_from_db()
+        self.assertLess(self.match.confidence_score, 1.0)
+        self.assertEqual(self.match.match_criteria['rescored_fields'], ['document_number'])
+
+        lost_item.first_name = 'Khady'
+        lost_item.last_name = 'Sarr'
+        lost_item.date_of_birth = '1975-01-01'
+        lost_item.save()
+        self.assertFalse(Match.objects.filter(id=self.match.id).exists())
+
+    def test_confirmed_match_is_never_retracted(self):
+        self.match.status = 'confirmed'
+        self.match.save()
+        found_item = FoundItem.objects.get(id=self.found_item.id)
+        found_item.first_name = 'Mamadou'
+        found_item.last_name = 'Ba'
+        found_item.date_of_birth = None
+        found_item.save()
+        self.assertTrue(Match.objects.filter(id=self.match.id, status='confirmed').exists())
+
+    def test_ocr_filled_fields_create_new_match(self):
+        found_item = FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/b.jpg',
+            found_date='2024-10-02', found_location='Thiès'
+        )
+        self.assertFalse(Match.objects.filter(found_item=found_item).exists())
+        found_item.first_name, found_item.last_name = 'Awa', 'Diop'
+        found_item.date_of_birth = '1990-05-04'
+        found_item.status = 'processed'
+        found_item.save()
+        self.assertTrue(Match.objects.filter(found_item=found_item, lost_item=self.lost_item).exists())
+
+
+class PhoneticMatchingTests(APITestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+
+    def test_transliteration_variants_share_key(self):
+        for variants in [("Ndiaye", "N'Diaye", 'Ndiay', 'Njaay'), ('Mamadou', 'Mamadu'),
+                         ('Seydou', 'Seidou'), ('Khady', 'Xadi'), ('Cheikh', 'Sheikh'),
+                         ('Djibril', 'Jibril'), ('Diallo', 'Jallo')]:
+            keys = {phonetic_key(name) for name in variants}
+            self.assertEqual(len(keys), 1, variants)
+        self.assertNotEqual(phonetic_key('Diop'), phonetic_key('Diouf'))
+        self.assertEqual(phonetic_key(''), '')
+
+    def test_keys_stored_on_save(self):
+        lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Seydou', last_name="N'Diaye",
+            date_of_birth='1988-02-10', lost_date='2024-10-01', lost_location='Dakar'
+        )
+        lost_item.refresh_from_db()
+        self.assertEqual(lost_item.first_name_phonetic, phonetic_key('Seidou'))
+        self.assertEqual(lost_item.last_name_phonetic, phonetic_key('Ndiaye'))
+        lost_item.last_name = 'Gueye'
+        lost_item.save(update_fields=['last_name'])
+        lost_item.refresh_from_db()
+        self.assertEqual(lost_item.last_name_phonetic, phonetic_key('Guèye'))
+
+    def test_variant_spelling_is_matched(self):
+        lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Mamadou', last_name="N'Diaye",
+            date_of_birth='1985-03-12', lost_date='2024-10-01', lost_location='Dakar'
+        )
+        found_item = FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            first_name='Mamadu', last_name='Ndiay', found_date='2024-10-02', found_location='Dakar',
+            status='processed'
+        )
+        match = Match.objects.get(lost_item=lost_item, found_item=found_item)
+        self.assertGreaterEqual(match.confidence_score, 2 * 0.3 * MatchingService.PHONETIC_NAME_SCORE)
+
+    def test_candidates_without_shared_key_are_not_scored(self):
+        LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Awa', last_name='Diop',
+            date_of_birth='1990-05-04', lost_date='2024-10-01', lost_location='Dakar'
+        )
+        with mock.patch.object(MatchingService, 'calculate_confidence', return_value=0.0) as scorer:
+            FoundItem.objects.create(
+                user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+                first_name='Khady', last_name='Sarr', date_of_birth='1975-01-01',
+                found_date='2024-10-02', found_location='Thiès', status='processed'
+            )
+        scorer.assert_not_called()
+
+
+class DocumentNumberIndexTests(APITestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+
+    def create_found(self, document_number, **fields):
+        return FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            document_number=document_number, found_date='2024-10-02', found_location='Dakar',
+            status='processed', **fields
+        )
+
+    def test_index_follows_document_number(self):
+        found_item = self.create_found('1 234-567-890 123')
+        self.assertEqual(
+            set(found_item.document_number_grams.values_list('gram', flat=True)), ngrams('1234567890123')
+        )
+        found_item.document_number = '9876543210987'
+        found_item.save()
+        self.assertEqual(
+            set(found_item.document_number_grams.values_list('gram', flat=True)), ngrams('9876543210987')
+        )
+
+    def test_search_returns_closest_numbers(self):
+        exact = self.create_found('1234567890123')
+        typo = self.create_found('1234567B90123')
+        self.create_found('5550001112223')
+        results = DocumentNumberIndex.search(FoundItem.objects.all(), '1234567890123', limit=2)
+        self.assertEqual([item for item, _ in results], [exact, typo])
+        self.assertEqual(results[0][1], 1.0)
+        self.assertEqual(DocumentNumberIndex.search(FoundItem.objects.all(), '9990004445556'), [])
+
+    def test_noisy_number_feeds_candidate_generation(self):
+        found_item = self.create_found('1234567890123', first_name='Fatou', last_name='Sow')
+        lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Awa', last_name='Dieng',
+            date_of_birth='1990-05-04', document_number='1234567890128',
+            lost_date='2024-10-01', lost_location='Dakar'
+        )
+        with mock.patch.object(MatchingService, 'calculate_confidence', return_value=0.0) as scorer:
+            MatchingService.find_matches(lost_item)
+        scorer.assert_called_once()
+        self.assertEqual(scorer.call_args.args, (lost_item, found_item))
+
+
+class LshCandidateTests(APITestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+        self.lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Ousmane', last_name='Camara',
+            date_of_birth='1984-11-23', document_number='2198407651234',
+            lost_date='2024-10-01', lost_location='Dakar'
+        )
+
+    def test_buckets_follow_signature_fields(self):
+        self.assertEqual(
+            set(self.lost_item.lsh_buckets.values_list('key', flat=True)), set(band_keys(self.lost_item))
+        )
+        before = set(self.lost_item.lsh_buckets.values_list('key', flat=True))
+        self.lost_item.last_name = 'Kamara'
+        self.lost_item.save()
+        after = set(self.lost_item.lsh_buckets.values_list('key', flat=True))
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, set(band_keys(self.lost_item)))
+
+    def test_corrupted_blocking_fields_still_collide(self):
+        # Chaque clé de blocage exacte est corrompue : seul le LSH rapproche les deux objets
+        found_item = FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            first_name='OUSMANE', last_name='CAMARAA', date_of_birth='1984-11-28',
+            document_number='2I984O7651234', found_date='2024-10-02', found_location='Dakar',
+            status='processed'
+        )
+        self.assertIn(self.lost_item, LshIndex.search(LostItem.objects.all(), found_item))
+
+    def test_unrelated_item_is_not_candidate(self):
+        found_item = FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            first_name='Rokhaya', last_name='Ndour', date_of_birth='1962-03-02',
+            document_number='1556002948871', found_date='2024-10-02', found_location='Thiès',
+            status='processed'
+        )
+        self.assertEqual(LshIndex.search(LostItem.objects.all(), found_item), [])
+
+    def test_benchmark_compares_with_exhaustive_scan(self):
+        report = MatchingBenchmark(120, queries=15, compare_exhaustive=True, seed=3).run()
+        self.assertGreaterEqual(report['candidate_recall'], 0.9)
+        self.assertLess(report['avg_candidates'], 40)
+
+
+class RankedMatchingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+
+    def create_lost(self, index, **fields):
+        values = {
+            'first_name': 'Moussa', 'last_name': 'Diop', 'date_of_birth': '1991-07-14',
+            'document_number': f'19910714{index:05d}', 'lost_date': '2024-10-01', 'lost_location': 'Dakar',
+        }
+        values.update(fields)
+        return LostItem.objects.create(user=self.owner, document_type=self.document_type, **values)
+
+    def create_found(self):
+        return FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            first_name='Moussa', last_name='Diop', date_of_birth='1991-07-14',
+            document_number='1991071400003', found_date='2024-10-02', found_location='Dakar', status='processed'
+        )
+
+    def test_only_top_k_matches_are_created(self):
+        MatchingRule.objects.create(document_type=self.document_type, top_k=2)
+        lost_items = [self.create_lost(index) for index in range(6)]
+        found_item = self.create_found()
+        matches = Match.objects.filter(found_item=found_item).order_by('-confidence_score')
+        self.assertEqual(len(matches), 2)
+        # Numéro identique d'abord, puis le numéro le plus proche déclaré le plus tôt
+        self.assertEqual(matches[0].lost_item, lost_items[3])
+        self.assertEqual(matches[0].match_criteria, {'method': 'ranked', 'rank': 1})
+        # Les cinq autres numéros diffèrent d'un chiffre : à égalité, le premier déclaré l'emporte
+        self.assertEqual(matches[1].lost_item, lost_items[0])
+        self.assertEqual(Notification.objects.filter(user=self.owner, notification_type='match_found').count(), 2)
+
+    def test_rule_threshold_and_weights_are_cached_per_document_type(self):
+        self.create_lost(0, first_name='Awa')
+        rule = MatchingRule.objects.create(document_type=self.document_type, threshold=0.95)
+        with CaptureQueriesContext(connection) as ctx:
+            MatchingService.rule_for(self.document_type.id)
+            MatchingService.rule_for(self.document_type.id)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        found_item = self.create_found()
+        self.assertFalse(Match.objects.filter(found_item=found_item).exists())
+
+        # Modifier la règle invalide le cache
+        rule.threshold = 0.5
+        rule.first_name_weight = 0.0
+        rule.save()
+        self.assertEqual(MatchingService.rule_for(self.document_type.id)['weights']['first_name'], 0.0)
+        found_item.refresh_from_db()
+        MatchingService.find_matches(found_item)
+        self.assertTrue(Match.objects.filter(found_item=found_item).exists())
+
+    def test_candidates_that_cannot_beat_floor_are_pruned(self):
+        lost_item = self.create_lost(0)
+        found_item = FoundItem(
+            document_type=self.document_type, first_name='Pape', last_name='Sarr',
+            date_of_birth='1970-01-01', document_number='2000000000000'
+        )
+        rule = MatchingService.rule_for(self.document_type.id)
+        self.assertIsNone(MatchingService.calculate_confidence(lost_item, found_item, rule=rule, floor=0.5))
+        self.assertLess(MatchingService.calculate_confidence(lost_item, found_item, rule=rule), 0.5)
+
+
+class RematchBackfillTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'rematch.json')
+        # Import historique : bulk_create sans signaux, donc sans matching
+        identities = [('Awa', 'Diop', '1990-05-04'), ('Moussa', 'Ndiaye', '1985-01-20'), ('Khady', 'Sarr', '1979-09-09')]
+        lost_items, found_items = [], []
+        for index, (first_name, last_name, birth) in enumerate(identities):
+            lost_items.append(LostItem(
+                user=self.owner, document_type=self.document_type, first_name=first_name, last_name=last_name,
+                date_of_birth=birth, document_number=f'12345678901{index:02d}',
+                lost_date='2024-10-01', lost_location='Dakar'
+            ))
+            found_items.append(FoundItem(
+                user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+                first_name=first_name.upper(), last_name=last_name.upper(), date_of_birth=birth,
+                document_number=f'12345678901{index:02d}', found_date='2024-10-02',
+                found_location='Dakar', status='processed'
+            ))
+        for item in lost_items + found_items:
+            item.refresh_phonetic_keys()
+        self.lost_items = LostItem.objects.bulk_create(lost_items)
+        self.found_items = FoundItem.objects.bulk_create(found_items)
+        DocumentNumberIndex.index_items(self.lost_items + self.found_items, replace=False)
+        LshIndex.index_items(self.lost_items + self.found_items, replace=False)
+
+    def run_backfill(self, **kwargs):
+        return RematchBackfill(checkpoint=self.checkpoint, chunk_size=2, **kwargs).run()
+
+    def test_backfill_creates_matches_and_notifications(self):
+        report = self.run_backfill()
+        self.assertEqual(report['items'], 3)
+        self.assertEqual(report['created'], 3)
+        for lost_item, found_item in zip(self.lost_items, self.found_items):
+            self.assertTrue(Match.objects.filter(lost_item=lost_item, found_item=found_item).exists())
+        self.assertEqual(Notification.objects.filter(user=self.owner, notification_type='match_found').count(), 3)
+
+    def test_checkpoint_skips_finished_partitions(self):
+        self.run_backfill()
+        with open(self.checkpoint, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['done']), 3)
+        Match.objects.all().delete()
+        self.run_backfill()
+        self.assertFalse(Match.objects.exists())
+        report = self.run_backfill(restart=True, notify=False)
+        self.assertEqual(report['created'], 3)
+
+    def test_stale_pending_match_is_retracted_but_confirmed_kept(self):
+        stale = Match.objects.create(
+            lost_item=self.lost_items[1], found_item=self.found_items[0],
+            confidence_score=0.9, match_criteria={'method': 'basic'}
+        )
+        confirmed = Match.objects.create(
+            lost_item=self.lost_items[2], found_item=self.found_items[1],
+            confidence_score=0.9, match_criteria={'method': 'basic'}, status='confirmed'
+        )
+        report = self.run_backfill()
+        self.assertEqual(report['retracted'], 1)
+        self.assertFalse(Match.objects.filter(id=stale.id).exists())
+        self.assertTrue(Match.objects.filter(id=confirmed.id).exists())
+
+    def test_conflict_fallback_stays_aligned_with_pairs(self):
+        from .backfill import _create_matches
+        existing = Match.objects.create(
+            lost_item=self.lost_items[0], found_item=self.found_items[0],
+            confidence_score=0.9, match_criteria={'method': 'basic'}
+        )
+        results = _create_matches([
+            Match(lost_item=self.lost_items[0], found_item=self.found_items[0], confidence_score=0.8, match_criteria={'method': 'ranked'}),
+            Match(lost_item=self.lost_items[1], found_item=self.found_items[1], confidence_score=0.8, match_criteria={'method': 'ranked'}),
+        ])
+        self.assertEqual([was_created for _, was_created in results], [False, True])
+        self.assertEqual(results[0][0].pk, existing.pk)
+        self.assertEqual(results[1][0].lost_item_id, self.lost_items[1].id)
+
+    def test_backfill_invalidates_platform_stats(self):
+        cache.set(StatisticsService.CACHE_KEY, {'total_matches': 0})
+        self.run_backfill(notify=False)
+        self.assertIsNone(cache.get(StatisticsService.CACHE_KEY))
+
+
+class DeclarationImportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.partner = CustomUser.objects.create_user(
+            username='commissariat', email='commissariat@example.com', password='pass12345', role='admin_public'
+        )
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='pass12345')
+        self.client.force_authenticate(user=self.partner)
+
+    def upload(self, url, name, content, **data):
+        return self.client.post(url, {'file': SimpleUploadedFile(name, content.encode()), **data}, format='multipart')
+
+    def test_csv_lost_import_reports_row_errors(self):
+        content = (
+            "document_type_id,first_name,last_name,date_of_birth,document_number,lost_date,lost_location\n"
+            f"{self.document_type.id},Awa,Diop,1990-05-04,1234567890123,2024-10-01,Dakar\n"
+            f"{self.document_type.id},Moussa,Fall,pas-une-date,,2024-10-01,Thiès\n"
+            f"999,Khady,Sarr,1979-09-09,,2024-10-01,Pikine\n"
+            f"{self.document_type.id},Ibrahima,Ba,1988-02-02,,2024-10-02,Rufisque\n"
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.upload('/api/lost-items/import/', 'pertes.csv', content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['total'], response.data['created'], response.data['invalid']), (4, 2, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('date_of_birth', response.data['errors'][0]['errors'])
+        self.assertIn('document_type_id', response.data['errors'][1]['errors'])
+        self.assertEqual(LostItem.objects.filter(user=self.partner).count(), 2)
+        # Un seul INSERT pour le lot, pas un save() par ligne
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "api_lostitem"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_json_found_import_matches_in_batch(self):
+        lost_item = LostItem.objects.create(
+            user=self.owner, document_type=self.document_type, first_name='Awa', last_name='Diop',
+            date_of_birth='1990-05-04', document_number='1234567890123', lost_date='2024-10-01', lost_location='Dakar'
+        )
+        rows = [
+            {'document_type_id': self.document_type.id, 'first_name': 'AWA', 'last_name': 'DIOP',
+             'date_of_birth': '1990-05-04', 'document_number': '1234567890123',
+             'found_date': '2024-10-03', 'found_location': 'Commissariat de Dakar'},
+            {'document_type_id': self.document_type.id, 'first_name': 'Pape', 'last_name': 'Ndour',
+             'found_date': '2024-10-03', 'found_location': 'Commissariat de Dakar'},
+        ]
+        response = self.upload('/api/found-items/import/', 'trouvailles.json', json.dumps(rows))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['matches_created'], 1)
+        found_item = FoundItem.objects.get(last_name='DIOP')
+        self.assertEqual(found_item.status, 'processed')
+        self.assertTrue(Match.objects.filter(lost_item=lost_item, found_item=found_item).exists())
+        self.assertTrue(Notification.objects.filter(user=self.owner, notification_type='match_found').exists())
+
+    def test_dry_run_and_malformed_file(self):
+        line = json.dumps({'document_type_id': self.document_type.id, 'first_name': 'Awa', 'last_name': 'Diop',
+                           'date_of_birth': '1990-05-04', 'lost_date': '2024-10-01', 'lost_location': 'Dakar'})
+        response = self.upload('/api/lost-items/import/', 'pertes.ndjson', f"{line}\n{line}\n", dry_run='true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['valid'], response.data['created']), (2, 0))
+        self.assertFalse(LostItem.objects.exists())
+
+        response = self.upload('/api/lost-items/import/', 'pertes.ndjson', f"{line}\n{{\"first_name\": ")
+        self.assertTrue(response.data['aborted'])
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+
+        response = self.upload('/api/lost-items/import/', 'pertes.xlsx', 'x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_citizen_cannot_import(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.upload('/api/lost-items/import/', 'pertes.csv', 'document_type_id\n1\n')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_json_records_are_decoded_incrementally(self):
+        payload = json.dumps([{'n': i, 'text': 'x' * 50} for i in range(20)]).encode()
+        records = list(iter_json_records(io.BytesIO(payload), buffer_size=16))
+        self.assertEqual([record['n'] for record in records], list(range(20)))
+
+
+class StreamingExportTests(APITestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name="Passeport")
+        self.admin = CustomUser.objects.create_user(
+            username='export-admin', email='export-admin@example.com', password='pass12345', role='admin_public'
+        )
+        self.owner = CustomUser.objects.create_user(username='déclarant', email='owner@example.com', password='pass12345')
+        for i in range(30):
+            LostItem.objects.create(
+                user=self.owner, document_type=self.document_type, first_name=f'Aïssatou{i}', last_name='Ndiaye',
+                date_of_birth='1990-05-04', document_number=f'A{i:05d}', lost_date='2024-10-01',
+                lost_location='Dakar, Plateau', status='resolved' if i % 3 == 0 else 'active'
+            )
+        self.client.force_authenticate(user=self.admin)
+
+    def test_csv_export_streams_flat_rows(self):
+        response = self.client.get('/api/exports/lost-items/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('lost-items.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[0]['first_name'], 'Aïssatou0')
+        self.assertEqual(rows[0]['user_email'], 'owner@example.com')
+        self.assertEqual(rows[0]['document_type'], 'Passeport')
+        self.assertEqual(rows[0]['lost_location'], 'Dakar, Plateau')
+        self.assertEqual(rows[0]['date_of_birth'], '1990-05-04')
+
+    def test_ndjson_gzip_export_with_filters(self):
+        response = self.client.get('/api/exports/lost-items/', {'output': 'ndjson', 'gzip': '1', 'status': 'resolved'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('lost-items.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 10)
+        self.assertTrue(all(record['status'] == 'resolved' for record in records))
+
+    @override_settings(EXPORT_CHUNK_SIZE=5, EXPORT_BUFFER_BYTES=256)
+    def test_export_is_sent_in_several_blocks(self):
+        chunks = list(Export('lost-items').chunks())
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) < 1024 for chunk in chunks))
+        self.assertEqual(b''.join(chunks).count(b'\r\n'), 31)
+
+        async def collect():
+            return [chunk async for chunk in Export('lost-items').achunks()]
+        self.assertEqual(async_to_sync(collect)(), chunks)
+
+    def test_export_validation_and_permissions(self):
+        self.assertEqual(self.client.get('/api/exports/unknown/').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.get('/api/exports/matches/', {'since': 'hier'}).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get('/api/exports/lost-items/', {'document_type': 'abc'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get('/api/exports/history/', {'user': 'x'}).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(self.client.get('/api/exports/history/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DuplicateImageTests(APITestCase):
+    def setUp(self):
+        media = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media.enable()
+        self.addCleanup(media.disable)
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+        self.client.force_authenticate(user=self.finder)
+
+    def card(self, seed, size=(320, 200), quality=90):
+        from PIL import Image, ImageDraw
+        import random
+        rng = random.Random(seed)
+        image = Image.new('RGB', (320, 200), 'white')
+        draw = ImageDraw.Draw(image)
+        for _ in range(25):
+            x, y = rng.randrange(300), rng.randrange(180)
+            draw.rectangle((x, y, x + rng.randrange(10, 80), y + rng.randrange(5, 40)),
+                           fill=tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.resize(size).save(buffer, format='JPEG', quality=quality)
+        return SimpleUploadedFile(f'carte-{seed}.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def declare(self, image):
+        return self.client.post('/api/found-items/', {
+            'document_type_id': self.document_type.id, 'image': image,
+            'found_date': '2024-10-01', 'found_location': 'Dakar',
+        }, format='multipart')
+
+    def test_reencoded_upload_is_linked_and_skips_ocr(self):
+        with mock.patch('api.views.OCRService') as ocr:
+            first = self.declare(self.card(1))
+            second = self.declare(self.card(1, size=(640, 400), quality=60))
+            other = self.declare(self.card(2))
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        original = FoundItem.objects.get(pk=first.data['id'])
+        duplicate = FoundItem.objects.get(pk=second.data['id'])
+        self.assertIsNotNone(original.image_hash)
+        self.assertEqual(duplicate.status, 'duplicate')
+        self.assertEqual(duplicate.duplicate_of, original)
+        self.assertEqual(second.data['duplicate_of'], original.id)
+        self.assertIsNone(FoundItem.objects.get(pk=other.data['id']).duplicate_of)
+        # OCR lancé pour l'original et l'autre pièce, pas pour le doublon
+        self.assertEqual(ocr.process_image_async.call_count, 2)
+        self.assertFalse(duplicate.lsh_buckets.exists())
+
+    def test_similar_image_of_another_user_is_only_flagged(self):
+        with mock.patch('api.views.OCRService') as ocr, \
+                mock.patch('api.signals.MatchingService.find_matches') as find_matches:
+            first = self.declare(self.card(1))
+            other_finder = CustomUser.objects.create_user(
+                username='finder2', email='finder2@example.com', password='pass12345'
+            )
+            self.client.force_authenticate(user=other_finder)
+            second = self.declare(self.card(1, size=(640, 400), quality=60))
+        flagged = FoundItem.objects.get(pk=second.data['id'])
+        # Signalée pour vérification, mais analysée et rapprochée normalement
+        self.assertEqual(flagged.duplicate_of_id, first.data['id'])
+        self.assertNotEqual(flagged.status, 'duplicate')
+        self.assertEqual(ocr.process_image_async.call_count, 2)
+        self.assertIn(flagged, [call.args[0] for call in find_matches.call_args_list])
+        self.assertTrue(any(
+            event.payload.get('related_object_id') == flagged.id and 'à vérifier' in event.payload['description']
+            for event in OutboxEvent.objects.filter(event_type='historique')
+        ))
+
+    def test_update_with_another_image_clears_duplicate_link(self):
+        with mock.patch('api.views.OCRService') as ocr:
+            self.declare(self.card(1))
+            second = self.declare(self.card(1, size=(640, 400), quality=60))
+            self.assertEqual(FoundItem.objects.get(pk=second.data['id']).status, 'duplicate')
+            response = self.client.patch(f"/api/found-items/{second.data['id']}/", {'image': self.card(2)},
+                                         format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updated = FoundItem.objects.get(pk=second.data['id'])
+        self.assertIsNone(updated.duplicate_of)
+        self.assertEqual(updated.status, 'pending')
+        # Plus un doublon : l'OCR est lancé
+        self.assertEqual(ocr.process_image_async.call_count, 2)
+
+    def test_segments_find_every_hash_within_three_bits(self):
+        image_hash = dhash(self.card(3))
+        FoundItem.objects.create(
+            user=self.finder, document_type=self.document_type, image='found_items/a.jpg',
+            found_date='2024-10-01', found_location='Dakar', **ImageHashIndex.hash_fields(self.card(3))
+        )
+        # Un bit modifié dans chacun de trois segments différents
+        flipped = image_hash ^ (1 << 2) ^ (1 << 20) ^ (1 << 40)
+        self.assertEqual(hamming(image_hash, flipped), 3)
+        self.assertIsNotNone(ImageHashIndex.find_duplicate(flipped))
+        self.assertIsNone(ImageHashIndex.find_duplicate(flipped, max_distance=2))
+
+
+class ImageDerivativeTests(APITestCase):
+    def setUp(self):
+        media = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media.enable()
+        self.addCleanup(media.disable)
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+        self.client.force_authenticate(user=self.finder)
+
+    def upload(self):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', (2400, 1500), (200, 180, 150)).save(buffer, format='JPEG')
+        with mock.patch('api.views.OCRService'):
+            response = self.client.post('/api/found-items/', {
+                'document_type_id': self.document_type.id, 'found_date': '2024-10-01', 'found_location': 'Dakar',
+                'image': SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response, FoundItem.objects.get(pk=response.data['id'])
+
+    @override_settings(IMAGE_THUMBNAIL_SIZE=200, IMAGE_MEDIUM_SIZE=800, IMAGE_OCR_SIZE=1200)
+    def test_upload_stores_derivatives_next_to_original(self):
+        from PIL import Image
+        response, item = self.upload()
+        self.assertTrue(response.data['image_thumbnail'].endswith('_thumbnail.jpg'))
+        self.assertTrue(response.data['image_medium'].endswith('_medium.jpg'))
+        self.assertNotIn('image_ocr', response.data)
+        for field, longest, mode in (('image_thumbnail', 200, 'RGB'), ('image_medium', 800, 'RGB'), ('image_ocr', 1200, 'RGB')):
+            derived = getattr(item, field)
+            self.assertEqual(os.path.dirname(derived.name), 'found_items')
+            with Image.open(derived.path) as image:
+                self.assertEqual(max(image.size), longest)
+                self.assertEqual(image.mode, mode)
+        # Couleurs conservées pour le classement du type de document (teinte, saturation)
+        with Image.open(item.image_ocr.path) as image:
+            red, green, blue = image.getpixel((600, 375))
+        self.assertGreater(red - blue, 30)
+
+    def test_ocr_reads_normalized_derivative(self):
+        _response, item = self.upload()
+        with mock.patch('api.views.OCRService') as ocr:
+            ocr.DOCUMENT_LABELS = {}
+            ocr.process_image.return_value = {'confidence': 0.5}
+            self.client.post(f'/api/found-items/{item.id}/process_ocr/')
+        self.assertEqual(ocr.process_image.call_args.args[0], item.image_ocr.path)
+        self.assertTrue(item.image_ocr.path.endswith('_ocr.png'))
+
+    def retype(self, declared_name, detected):
+        _response, item = self.upload()
+        item.document_type, _ = DocumentType.objects.get_or_create(name=declared_name)
+        item.save()
+        DocumentType.objects.get_or_create(name='Passeport')
+        with mock.patch('api.views.OCRService.process_image', return_value={
+            'confidence': 0.5, 'structured_payload': {}, **detected,
+        }) as process_image:
+            response = self.client.post(f'/api/found-items/{item.id}/process_ocr/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item.refresh_from_db()
+        return item, process_image.call_args.kwargs['doc_type']
+
+    def test_declared_type_is_kept_by_ocr(self):
+        # Repli du classifieur (CNI à 0.3) : la carte d'étudiant déclarée garde son type
+        item, doc_type = self.retype("Carte d'étudiant", {
+            'doc_type': 'cni_senegalaise', 'classification': {'confidence': 0.3},
+        })
+        self.assertEqual(doc_type, 'carte_etudiant')
+        self.assertEqual(item.document_type.name, "Carte d'étudiant")
+
+    def test_undeclared_type_needs_confident_classification(self):
+        item, doc_type = self.retype('Autre', {'doc_type': 'cni_senegalaise', 'classification': {'confidence': 0.3}})
+        self.assertIsNone(doc_type)
+        self.assertEqual(item.document_type.name, 'Autre')
+        item, _ = self.retype('Autre', {'doc_type': 'passeport', 'classification': {'confidence': 0.3}, 'mrz': 'TD3'})
+        self.assertEqual(item.document_type.name, 'Passeport')
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        media = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media.enable()
+        self.addCleanup(media.disable)
+        self.document_type = DocumentType.objects.create(name="Carte d'identité")
+        self.finder = CustomUser.objects.create_user(username='finder', email='finder@example.com', password='pass12345')
+        self.client.force_authenticate(user=self.finder)
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.effect_noise((600, 400), 40).convert('RGB').save(buffer, format='PNG')
+        self.content = buffer.getvalue()
+
+    def start(self, size=None):
+        response = self.client.post('/api/uploads/', {
+            'filename': 'carte recto.png', 'size': size or len(self.content), 'content_type': 'image/png',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return f"/api/uploads/{response.data['id']}/", response.data['id']
+
+    def send(self, url, offset, data):
+        return self.client.generic('PATCH', url, data, content_type='application/offset+octet-stream',
+                                   HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_resumed_upload_becomes_found_item_image_without_copy(self):
+        url, upload_id = self.start()
+        half = len(self.content) // 2
+        self.assertEqual(self.send(url, 0, self.content[:half]).data['offset'], half)
+        # Reprise après coupure : le client relit la position puis renvoie la suite
+        resume = self.client.get(url)
+        self.assertEqual(resume['Upload-Offset'], str(half))
+        conflict = self.send(url, 0, self.content[:half])
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data['offset'], half)
+        done = self.send(url, half, self.content[half:])
+        self.assertEqual(done.data['status'], 'complete')
+        path = UploadSession.objects.get(pk=upload_id).file.name
+
+        with mock.patch('api.views.OCRService'):
+            response = self.client.post('/api/found-items/', {
+                'document_type_id': self.document_type.id, 'upload_id': upload_id,
+                'found_date': '2024-10-01', 'found_location': 'Dakar',
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        item = FoundItem.objects.get(pk=response.data['id'])
+        self.assertEqual(item.image.name, path)
+        with item.image.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertTrue(item.image_ocr)
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+
+    def test_completed_upload_can_be_analysed_before_declaring(self):
+        url, upload_id = self.start()
+        self.send(url, 0, self.content[:100])
+        incomplete = self.client.post(reverse('ocr_analyse'), {'upload_id': upload_id}, format='json')
+        self.assertEqual(incomplete.status_code, status.HTTP_400_BAD_REQUEST)
+        self.send(url, 100, self.content[100:])
+        path = UploadSession.objects.get(pk=upload_id).file.path
+        with mock.patch('api.views.OCRService.process_image', return_value={
+            'doc_type': 'autre', 'structured_payload': {}, 'confidence': 0.4, 'success': True,
+        }) as process_image:
+            response = self.client.post(reverse('ocr_analyse'), {'upload_id': upload_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        process_image.assert_called_once_with(path)
+        self.assertEqual(response.data['ocr_data']['confidence'], 0.4)
+        # La session reste utilisable pour la déclaration
+        self.assertTrue(UploadSession.objects.filter(pk=upload_id, status='complete').exists())
+
+    def test_invalid_uploads_are_rejected(self):
+        url, _upload_id = self.start()
+        self.assertEqual(self.send(url, 0, self.content + b'x').status_code, status.HTTP_400_BAD_REQUEST)
+        # Morceau refusé : rien n'est gardé, la session reste utilisable
+        session = UploadSession.objects.get(pk=_upload_id)
+        self.assertEqual((session.offset, session.status), (0, 'uploading'))
+        self.assertEqual(os.path.getsize(session.file.path), 0)
+        response = self.client.post('/api/found-items/', {
+            'document_type_id': self.document_type.id, 'upload_id': _upload_id,
+            'found_date': '2024-10-01', 'found_location': 'Dakar',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('upload_id', response.data)
+
+        url, upload_id = self.start(size=10)
+        self.assertEqual(self.send(url, 0, b'0123456789').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+
+        url, _upload_id = self.start()
+        self.client.force_authenticate(user=CustomUser.objects.create_user(
+            username='other', email='other@example.com', password='pass12345'
+        ))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_interrupted_chunk_keeps_received_bytes(self):
+        session = ChunkedUpload.start(self.finder, 'carte.png', len(self.content), 'image/png')
+
+        class DroppedConnection(io.BytesIO):
+            def read(self, size=-1):
+                if self.tell() >= 70000:
+                    raise OSError('connexion perdue')
+                return super().read(size)
+
+        ChunkedUpload.append(session, 0, DroppedConnection(self.content[:200000]))
+        session.refresh_from_db()
+        self.assertEqual((session.offset, session.status), (65536 * 2, 'uploading'))
+
+    def test_concurrent_chunk_does_not_touch_file(self):
+        url, upload_id = self.start()
+        half = len(self.content) // 2
+        self.send(url, 0, self.content[:half])
+        # Un premier PATCH à la même position est en cours d'écriture
+        UploadSession.objects.filter(pk=upload_id).update(status='receiving')
+        conflict = self.send(url, half, b'x' * 100)
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data['offset'], half)
+        session = UploadSession.objects.get(pk=upload_id)
+        with open(session.file.path, 'rb') as f:
+            self.assertEqual(f.read(), self.content[:half])
+
+        # Réservation abandonnée par un processus arrêté : reprise après le délai
+        UploadSession.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.send(url, half, self.content[half:]).data['status'], 'complete')
+
+
+def synthetic_document(width=856, height=540, mrz=(), background=(235, 235, 235)):
+    """Document de synthèse (BGR) : quelques lignes de texte et, en bas, les lignes MRZ données"""
+    import cv2
+    import numpy as np
+    img = np.full((height, width, 3), background, np.uint8)
+    for i in range(4):
+        cv2.putText(img, f"NOM PRENOM {i} DIOP AWA", (width // 3, 60 + i * 45),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (30, 30, 30), 2)
+    for i, line in enumerate(mrz):
+        y = height - 25 - (len(mrz) - 1 - i) * 38
+        text_width = cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0][0]
+        cv2.putText(img, line, (int(width * 0.05), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.9 * width / text_width, (20, 20, 20), 2)
+    return img
+
+
+class DocumentClassifierTests(APITestCase):
+    TD1 = ["IDSEN1234567897<<<<<<<<<<<<<<<", "9005041M3012319SEN<<<<<<<<<<<6", "DIOP<<AWA<<<<<<<<<<<<<<<<<<<<<"]
+    TD3 = ["P<SENDIOP<<AWA<<<<<<<<<<<<<<<<<<<<<<<<<<<<<", "A12345678<SEN9005041M3012319<<<<<<<<<<<<<<06"]
+
+    def document(self, width=856, height=540, mrz=(), background=(235, 235, 235)):
+        return synthetic_document(width, height, mrz, background)
+
+    def test_mrz_lines_tell_identity_card_from_passport(self):
+        card = classify(self.document(mrz=self.TD1))
+        self.assertEqual((card.doc_type, card.features.mrz_lines), ('cni_senegalaise', 3))
+        passport = classify(self.document(1250, 880, mrz=self.TD3))
+        self.assertEqual((passport.doc_type, passport.features.mrz_lines), ('passeport', 2))
+        self.assertGreaterEqual(passport.confidence, 0.8)
+
+    def test_card_colour_selects_non_identity_documents(self):
+        self.assertEqual(classify(self.document(background=(60, 170, 40))).doc_type, 'carte_vitale')
+        self.assertEqual(classify(self.document(background=(180, 120, 230))).doc_type, 'permis_conduire')
+        self.assertEqual(classify(self.document(background=(120, 30, 10))).doc_type, 'carte_bancaire')
+        plain = classify(self.document())
+        self.assertEqual(plain.doc_type, 'cni_senegalaise')
+        self.assertLess(plain.confidence, 0.5)
+
+    def test_keywords_only_override_unsure_classification(self):
+        unsure = Classification('cni_senegalaise', 0.3, None)
+        self.assertEqual(refine_document_type(unsure, "REPUBLIQUE DU SENEGAL Passeport"), 'passeport')
+        self.assertEqual(refine_document_type(unsure, "Université Cheikh Anta Diop"), 'carte_etudiant')
+        self.assertEqual(refine_document_type(unsure, "DIOP AWA"), 'cni_senegalaise')
+        sure = Classification('cni_senegalaise', 0.9, None)
+        self.assertEqual(refine_document_type(sure, "PASSEPORT"), 'cni_senegalaise')
+
+
+class MrzTests(APITestCase):
+    # Spécimens OACI 9303 (chiffres de contrôle valides)
+    TD1 = ["I<UTOD231458907<<<<<<<<<<<<<<<", "7408122F1204159UTO<<<<<<<<<<<6", "ERIKSSON<<ANNA<MARIA<<<<<<<<<<"]
+    TD3 = ["P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<", "L898902C36UTO7408122F1204159ZE184226B<<<<<10"]
+
+    def test_parses_identity_card_and_passport(self):
+        card = parse_mrz(self.TD1)
+        self.assertEqual(card['format'], 'TD1')
+        self.assertEqual(card['type'], 'cni_senegalaise')
+        self.assertEqual((card['nom'], card['prenom']), ('Eriksson', 'Anna Maria'))
+        self.assertEqual((card['numero_document'], card['sexe']), ('D23145890', 'F'))
+        self.assertEqual((card['date_naissance'], card['date_expiration']), ('1974-08-12', '2012-04-15'))
+        passport = parse_mrz(self.TD3)
+        self.assertEqual((passport['format'], passport['type']), ('TD3', 'passeport'))
+        self.assertEqual(passport['numero_document'], 'L898902C3')
+
+    def test_tolerates_ocr_noise_but_rejects_bad_check_digits(self):
+        noisy = ["REPUBLIQUE DU SENEGAL", "I<UTOD231458907", "74O8122F12O4159UTO<<<<<<<<<<<6", "ERIKSSON << ANNA<MARIA"]
+        self.assertEqual(parse_mrz(noisy)['date_naissance'], '1974-08-12')
+        wrong = [self.TD1[0].replace('D23145890', 'D23145899'), *self.TD1[1:]]
+        self.assertIsNone(parse_mrz(wrong))
+        self.assertEqual(parse_mrz(["SEN", "DIOP AWA"]), None)
+
+    def test_locates_mrz_band_at_the_bottom(self):
+        img = synthetic_document(mrz=["IDSEN1234567897<<<<<<<<<<<<<<<", "9005041M3012319SEN<<<<<<<<<<<6",
+                                      "DIOP<<AWA<<<<<<<<<<<<<<<<<<<<<"])
+        band = locate_mrz(img)
+        self.assertIsNotNone(band)
+        self.assertLess(band.shape[0], img.shape[0] / 2)
+        self.assertIsNone(locate_mrz(synthetic_document()))
+
+    def test_valid_mrz_skips_full_page_ocr(self):
+        from ocr import services
+        img = synthetic_document(mrz=self.TD1)
+        rows = [((0, 10 + 40 * i, 800, 40 + 40 * i), line, 0.95) for i, line in enumerate(self.TD1)]
+        with tempfile.NamedTemporaryFile(suffix='.png') as f, \
+                mock.patch('ocr.services.ocr_extract_scored', return_value=rows) as ocr_extract:
+            import cv2
+            cv2.imwrite(f.name, img)
+            result = services.OCRService.process_image(f.name)
+        ocr_extract.assert_called_once()
+        self.assertLess(ocr_extract.call_args.args[0].shape[0], img.shape[0] / 2)
+        self.assertEqual((result['doc_type'], result['mrz']), ('cni_senegalaise', 'TD1'))
+        self.assertEqual(result['structured_payload']['numero_document'], 'D23145890')
+        self.assertEqual(result['structured_payload']['lieu_naissance'], '')
+        self.assertEqual(result['passes'], ['mrz'])
+        self.assertEqual(result['field_confidence']['numero_document'], 1.0)
+
+
+@override_settings(OCR_FIELD_CONFIDENCE=0.85)
+class OcrEarlyExitTests(APITestCase):
+    NAME = ((10, 10, 300, 40), "DIOP AWA", 0.98)
+    BIRTH = ((10, 60, 300, 90), "04/05/1990", 0.97)
+    NUMBER = ((10, 110, 300, 140), "1234567890", 0.99)
+
+    def process(self, *passes):
+        import cv2
+        import numpy as np
+        from ocr import services
+        with tempfile.NamedTemporaryFile(suffix='.png') as f, \
+                mock.patch('ocr.services.ocr_extract_scored', side_effect=list(passes)) as ocr_extract:
+            cv2.imwrite(f.name, np.full((1000, 1600, 3), 235, np.uint8))
+            result = services.OCRService.process_image(f.name, doc_type='autre')
+        return result, [call.args[0].shape for call in ocr_extract.call_args_list]
+
+    def test_confident_fast_pass_exits_early(self):
+        result, calls = self.process([self.NAME, self.BIRTH, self.NUMBER])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(result['passes'], ['fast'])
+        self.assertEqual(result['structured_payload']['numero_document'], '1234567890')
+        self.assertEqual(result['field_confidence'], {
+            'nom': 0.98, 'prenom': 0.98, 'date_naissance': 0.97, 'numero_document': 0.99,
+        })
+
+    def test_low_confidence_line_alone_is_recognized_again(self):
+        unsure = (self.NUMBER[0], "1234S67890", 0.5)
+        retry = [((4, 4, 290, 30), "1234567890", 0.96)]
+        result, calls = self.process([self.NAME, self.BIRTH, unsure], retry)
+        self.assertEqual(result['passes'], ['fast', 'lines'])
+        self.assertLess(calls[1][0], 100)  # seule la ligne du numéro est relue
+        self.assertEqual(result['structured_payload']['numero_document'], '1234567890')
+        self.assertEqual(result['field_confidence']['numero_document'], 0.96)
+        self.assertEqual(result['field_confidence']['nom'], 0.98)
+
+    def test_missing_field_reprocesses_whole_page(self):
+        result, calls = self.process([self.NAME, self.BIRTH], [self.NAME, self.BIRTH, self.NUMBER])
+        self.assertEqual(result['passes'], ['fast', 'page'])
+        self.assertEqual(calls[1], (1000, 1600, 3))
+        self.assertEqual(result['structured_payload']['numero_document'], '1234567890')
+
+    def test_settings_fall_back_to_defaults_outside_django(self):
+        from django.conf import LazySettings
+        from ocr import services
+        # python -m ocr.benchmark, test_ocr_*.py : DJANGO_SETTINGS_MODULE absent
+        with mock.patch.dict(os.environ, {}, clear=True), \
+                mock.patch('ocr.services.settings', LazySettings()):
+            self.assertEqual(services.ocr_setting('OCR_FIELD_CONFIDENCE'), 0.85)
+            self.assertFalse(services.ocr_setting('OCR_ROBUST_MODE'))
+        with override_settings(OCR_ROBUST_WORKERS=5):
+            self.assertEqual(services.ocr_setting('OCR_ROBUST_WORKERS'), 5)
+
+
+@override_settings(OCR_FIELD_CONFIDENCE=0.85, OCR_ROBUST_DEADLINE=30.0,
+                   OCR_ROBUST_VARIANTS=['deskewed', 'brightened', 'sharpened'])
+class OcrRobustModeTests(APITestCase):
+    NAME = ((10, 10, 300, 40), "DIOP AWA", 0.98)
+    BIRTH = ((10, 60, 300, 90), "04/05/1990", 0.97)
+
+    def setUp(self):
+        from ocr import services
+        # Moteurs des variantes chargés avant la mesure, comme au démarrage en mode robuste
+        self.assertTrue(services.warm_variant_pool(timeout=60))
+
+    def number(self, text, score):
+        return [self.NAME, self.BIRTH, ((10, 110, 300, 140), text, score)]
+
+    def test_vote_sums_confidences_per_value(self):
+        fields, confidences = vote([
+            ({'numero_document': '1234S67890', 'photo_detectee': False}, {'numero_document': 0.5}),
+            ({'numero_document': '1234567890'}, {'numero_document': 0.9}),
+            ({'numero_document': '1234567890'}, {'numero_document': 0.8}),
+            ({'numero_document': '1234567B90'}, {'numero_document': 0.95}),
+        ])
+        self.assertEqual(fields, {'numero_document': '1234567890', 'photo_detectee': False})
+        self.assertEqual(confidences, {'numero_document': 0.9})
+
+    def test_variants_fix_dark_and_rotated_photos(self):
+        import cv2
+        img = synthetic_document()
+        dark = cv2.convertScaleAbs(img, alpha=0.3, beta=0)
+        self.assertGreater(brightened(dark).mean(), dark.mean() * 1.5)
+        matrix = cv2.getRotationMatrix2D((428, 270), 15, 1.0)
+        rotated = cv2.warpAffine(img, matrix, (856, 540), borderMode=cv2.BORDER_REPLICATE)
+
+        def skew(image):
+            _, mask = cv2.threshold(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 0, 255,
+                                    cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+            angle = cv2.minAreaRect(cv2.findNonZero(mask))[-1]
+            return abs(angle - 90 if angle > 45 else angle)
+        self.assertGreater(skew(rotated), 10)
+        self.assertLess(skew(deskewed(rotated)), 2)
+
+    def test_robust_mode_votes_over_parallel_variants(self):
+        import cv2
+        import numpy as np
+        from ocr import services
+        variants = {
+            'deskewed': self.number("1234567890", 0.9),
+            'brightened': self.number("1234567890", 0.8),
+            'sharpened': self.number("1234567B90", 0.95),
+        }
+        with tempfile.NamedTemporaryFile(suffix='.png') as f, \
+                mock.patch('ocr.services.ocr_extract_scored', return_value=self.number("1234S67890", 0.5)) as fast, \
+                mock.patch('ocr.services.recognize_variant', side_effect=lambda name, img: variants[name]), \
+                mock.patch('ocr.services.dl_extractor', return_value=mock.Mock(**{'is_available.return_value': False})):
+            cv2.imwrite(f.name, np.full((1000, 1600, 3), 235, np.uint8))
+            result = services.OCRService.process_image(f.name, doc_type='autre', robust=True)
+        fast.assert_called_once()
+        self.assertEqual(result['passes'], ['fast', 'robust'])
+        self.assertEqual(result['variants'], ['deskewed', 'brightened', 'sharpened'])
+        self.assertEqual(result['structured_payload']['numero_document'], '1234567890')
+        self.assertEqual(result['field_confidence']['numero_document'], 0.9)
+
+    @override_settings(OCR_ROBUST_VARIANTS=['deskewed', 'brightened'])
+    def test_late_variants_are_dropped_at_deadline(self):
+        import threading
+        from ocr import services
+        release = threading.Event()
+
+        def recognize(name, img):
+            if name == 'brightened':
+                release.wait(5)
+            return self.number("1234567890", 0.9)
+        extracted = {'nom': 'Diop', 'numero_document': '1234S67890'}
+        confidences = {'nom': 0.98, 'numero_document': 0.5}
+        started = time.monotonic()
+        voted = ({'nom': 'Diop', 'numero_document': '1234567890'}, None)
+        try:
+            with mock.patch('ocr.services.recognize_variant', side_effect=recognize), \
+                    mock.patch('ocr.services.extract_fields', return_value=voted):
+                used = services.recognize_variants(None, extracted, confidences, 'autre', started + 0.5)
+        finally:
+            release.set()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(used, ['deskewed'])
+        self.assertEqual(extracted['numero_document'], '1234567890')
+
+    def test_busy_workers_fall_back_to_refine_pass(self):
+        import cv2
+        import numpy as np
+        from ocr import services
+        with tempfile.NamedTemporaryFile(suffix='.png') as f, \
+                mock.patch('ocr.services._acquire_variant_worker', return_value=False), \
+                mock.patch('ocr.services.recognize_variant') as variant, \
+                mock.patch('ocr.services.ocr_extract_scored', side_effect=[
+                    self.number("1234S67890", 0.5), [((4, 4, 290, 30), "1234567890", 0.96)]
+                ]), \
+                mock.patch('ocr.services.dl_extractor', return_value=mock.Mock(**{'is_available.return_value': False})):
+            cv2.imwrite(f.name, np.full((1000, 1600, 3), 235, np.uint8))
+            result = services.OCRService.process_image(f.name, doc_type='autre', robust=True)
+        variant.assert_not_called()
+        self.assertEqual(result['passes'], ['fast', 'lines'])
+        self.assertNotIn('variants', result)
+        self.assertEqual(result['structured_payload']['numero_document'], '1234567890')
+
+
+class OcrBenchmarkReportTests(APITestCase):
+    def report(self, latency=100.0, throughput=4.0, rss=300.0):
+        return {
+            'stages': {'ocr': {'p50_ms': latency, 'p95_ms': latency * 2}},
+            'throughput': {'1': throughput, '2': throughput * 1.8},
+            'model_load': {'paddleocr_s': 2.0},
+            'peak_rss_mb': {'main': rss, 'worker': rss},
+        }
+
+    def test_percentile_uses_nearest_rank(self):
+        values = [0.4, 0.1, 0.3, 0.2, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+        self.assertEqual(percentile(values, 50), 0.5)
+        self.assertEqual(percentile(values, 90), 0.9)
+        self.assertEqual(percentile(values, 99), 1.0)
+        self.assertEqual(percentile(values, 0), 0.1)
+        self.assertEqual(percentile([0.3], 95), 0.3)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_flatten_marks_only_throughput_as_higher_is_better(self):
+        metrics = flatten(self.report())
+        self.assertEqual(metrics['stages.ocr.p95_ms'], (200.0, False))
+        self.assertEqual(metrics['throughput.1'], (4.0, True))
+        self.assertEqual(metrics['throughput.2'], (7.2, True))
+        self.assertEqual(metrics['model_load.paddleocr_s'], (2.0, False))
+        self.assertEqual(metrics['peak_rss_mb.worker'], (300.0, False))
+        self.assertEqual(flatten({}), {})
+
+    def test_run_aggregates_throughput_per_worker_count(self):
+        with mock.patch('ocr.benchmark.load_models', return_value={}), \
+                mock.patch('ocr.benchmark.run_stages', return_value={'total': 0.01}), \
+                mock.patch('ocr.benchmark.peak_rss_mb', return_value=250.0), \
+                mock.patch.object(OCRBenchmark, 'measure_throughput',
+                                  side_effect=[(3.5, 400.0), (6.0, 420.0), (9.1, 410.0)]):
+            report = OCRBenchmark(['a.jpg'], workers=(1, 2, 4)).run()
+        self.assertEqual(report['throughput'], {'1': 3.5, '2': 6.0, '4': 9.1})
+        # Mémoire des workers : le maximum sur toutes les mesures de débit
+        self.assertEqual(report['peak_rss_mb'], {'main': 250.0, 'worker': 420.0})
+        self.assertEqual(report['stages']['total']['p50_ms'], 10.0)
+
+    def test_run_stages_reads_timings_recorded_by_process_image(self):
+        def process_image(image_path, doc_type=None):
+            metrics.OCR_STAGE_DURATION.observe(0.25, stage='mrz')
+            metrics.OCR_STAGE_DURATION.observe(0.5, stage='robust')
+            return {}
+
+        # Observations antérieures : seul l'écart dû à l'appel est retenu
+        metrics.OCR_STAGE_DURATION.observe(3.0, stage='mrz')
+        with mock.patch('ocr.services.OCRService.process_image', side_effect=process_image) as process:
+            timings = run_stages('a.jpg', doc_type='cni')
+        process.assert_called_once_with('a.jpg', doc_type='cni')
+        self.assertEqual(set(timings), {'mrz', 'robust', 'total'})
+        self.assertAlmostEqual(timings['mrz'], 0.25)
+        self.assertAlmostEqual(timings['robust'], 0.5)
+        self.assertGreaterEqual(timings['total'], 0)
+
+    def test_regressions_respect_direction_and_tolerance(self):
+        baseline = self.report()
+        self.assertEqual(compare_to_baseline(self.report(latency=115.0, throughput=3.5), baseline), [])
+        regressions = {r['metric']: r for r in compare_to_baseline(self.report(latency=130.0, throughput=3.0), baseline)}
+        self.assertEqual(set(regressions), {'stages.ocr.p50_ms', 'stages.ocr.p95_ms', 'throughput.1', 'throughput.2'})
+        self.assertEqual(regressions['throughput.1']['change_%'], -25.0)
+        self.assertEqual(regressions['stages.ocr.p50_ms']['current'], 130.0)
+        # Plus rapide ou plus de débit : jamais une régression
+        self.assertEqual(compare_to_baseline(self.report(latency=50.0, throughput=8.0), baseline), [])
+        self.assertEqual(len(compare_to_baseline(self.report(latency=115.0), baseline, tolerance=0.1)), 2)
+
+    def test_small_latency_deltas_and_missing_metrics_are_ignored(self):
+        baseline = self.report(latency=2.0)
+        # +100 % mais 2 ms d'écart : sous min_delta_ms
+        self.assertEqual(compare_to_baseline(self.report(latency=4.0), baseline), [])
+        self.assertEqual(len(compare_to_baseline(self.report(latency=4.0), baseline, min_delta_ms=1.0)), 2)
+        # Métrique absente du rapport courant ou référence nulle
+        current = self.report()
+        del current['throughput']['2']
+        baseline = self.report()
+        baseline['model_load']['paddleocr_s'] = 0.0
+        current['model_load']['paddleocr_s'] = 5.0
+        self.assertEqual(compare_to_baseline(current, baseline), [])
@@ -0,0 +1,180 @@
+"""
+Envois d'images découpés en morceaux et reprenables (réseaux mobiles lents).
+
+1. POST uploads/ {filename, size, content_type} ouvre une session et réserve le fichier
+   à son emplacement final (found_items/).
+2. PATCH uploads/<id>/ avec l'en-tête Upload-Offset envoie un morceau (corps brut) ; il
+   est écrit directement dans le fichier par blocs de 64 Ko, la mémoire ne dépend pas de
+   la taille. Si la connexion tombe en cours de morceau, les octets reçus sont conservés.
+   La session est réservée (statut 'receiving') avant toute écriture : un morceau
+   concurrent sur la même session est refusé sans toucher au fichier.
+3. GET uploads/<id>/ donne la position atteinte : le client reprend à partir de là.
+
+Une fois complet, l'envoi est désigné par son identifiant (upload_id) à la création d'un
+objet trouvé ou à l'analyse OCR : le fichier est utilisé tel quel, sans copie.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from PIL import Image, UnidentifiedImageError
+
+from .models import UploadSession
+
+ALLOWED_CONTENT_TYPES = ('image/jpeg', 'image/jpg', 'image/png')
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """Envoi refusé (taille, type, session terminée...)"""
+
+
+class UploadOffsetConflict(UploadError):
+    """Position annoncée différente de celle du serveur : le client doit reprendre à `offset`"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class ChunkedUpload:
+    @staticmethod
+    def start(user, filename, size, content_type):
+        if content_type not in ALLOWED_CONTENT_TYPES:
+            raise UploadError("Type de fichier non supporté. Utilisez JPEG ou PNG.")
+        if size <= 0 or size > settings.UPLOAD_MAX_SIZE:
+            raise UploadError(f"Taille invalide : 1 à {settings.UPLOAD_MAX_SIZE} octets")
+        filename = get_valid_filename(os.path.basename(filename or '')) or 'image'
+        # Fichier vide réservé à son emplacement final : le nom ne changera plus
+        name = default_storage.save(f'found_items/{filename}', ContentFile(b''))
+        return UploadSession.objects.create(
+            user=user, filename=filename, content_type=content_type, size=size, file=name
+        )
+
+    @staticmethod
+    def append(session, offset, stream):
+        """
+        Écrit le corps `stream` à la position `offset` ; retourne la session à jour.
+        Termine la session quand toute la taille annoncée est reçue.
+        """
+        if session.status == 'complete':
+            raise UploadError("Envoi déjà terminé")
+        if offset != session.offset:
+            raise UploadOffsetConflict(f"Position attendue : {session.offset}", session.offset)
+        ChunkedUpload._acquire(session, offset)
+        limit = min(settings.UPLOAD_CHUNK_MAX_SIZE, session.size - offset)
+        try:
+            with open(session.file.path, 'r+b') as f:
+                f.seek(offset)
+                try:
+                    written, interrupted = ChunkedUpload._copy(stream, f, limit, offset)
+                except Exception:
+                    # Morceau refusé : le fichier revient à la dernière position validée
+                    f.truncate(offset)
+                    raise
+                f.truncate(offset + written)
+        except Exception:
+            ChunkedUpload._release(session, offset)
+            raise
+        ChunkedUpload._release(session, offset + written)
+        if session.offset == session.size and not interrupted:
+            ChunkedUpload.complete(session)
+        return session
+
+    @staticmethod
+    def _acquire(session, offset):
+        """
+        Réserve la session avant d'écrire dans le fichier (mise à jour conditionnelle) :
+        un second morceau envoyé en parallèle est rejeté. Une réservation plus ancienne
+        que UPLOAD_CHUNK_LOCK_TIMEOUT secondes (processus arrêté en cours d'écriture)
+        peut être reprise.
+        """
+        stale = timezone.now() - timedelta(seconds=settings.UPLOAD_CHUNK_LOCK_TIMEOUT)
+        acquired = UploadSession.objects.filter(
+            Q(status='uploading') | Q(status='receiving', updated_at__lt=stale),
+            pk=session.pk, offset=offset,
+        ).update(status='receiving', updated_at=timezone.now())
+        if not acquired:
+            session.refresh_from_db()
+            if session.status == 'complete':
+                raise UploadError("Envoi déjà terminé")
+            if session.status == 'receiving':
+                raise UploadOffsetConflict(
+                    f"Un autre morceau est en cours de réception à la position {session.offset}", session.offset
+                )
+            raise UploadOffsetConflict(f"Position attendue : {session.offset}", session.offset)
+
+    @staticmethod
+    def _copy(stream, f, limit, offset):
+        """Recopie le corps par blocs ; retourne (octets écrits, connexion coupée)"""
+        written = 0
+        while True:
+            try:
+                block = stream.read(BLOCK_SIZE)
+            except OSError:
+                # Connexion coupée : on garde ce qui est arrivé, le client reprendra
+                return written, True
+            if not block:
+                return written, False
+            if written + len(block) > limit:
+                raise UploadError(
+                    f"Morceau trop grand : au plus {limit} octets à partir de la position {offset}"
+                )
+            f.write(block)
+            written += len(block)
+
+    @staticmethod
+    def _release(session, offset):
+        UploadSession.objects.filter(pk=session.pk, status='receiving').update(
+            status='uploading', offset=offset, updated_at=timezone.now()
+        )
+        session.status, session.offset = 'uploading', offset
+
+    @staticmethod
+    def complete(session):
+        """Vérifie que le fichier reçu est une image lisible et marque la session terminée"""
+        try:
+            with Image.open(session.file.path) as image:
+                image.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            ChunkedUpload.abort(session)
+            raise UploadError(f"Le fichier reçu n'est pas une image valide : {e}")
+        session.status = 'complete'
+        UploadSession.objects.filter(pk=session.pk).update(status='complete')
+
+    @staticmethod
+    def claim(user, upload_id):
+        """Session terminée de l'utilisateur, à utiliser comme image ; UploadError sinon"""
+        try:
+            session = UploadSession.objects.get(pk=upload_id, user=user)
+        except (UploadSession.DoesNotExist, ValidationError):
+            raise UploadError("Envoi inconnu")
+        if session.status != 'complete':
+            raise UploadError(f"Envoi incomplet : {session.offset}/{session.size} octets reçus")
+        return session
+
+    @staticmethod
+    def release(session):
+        """Le fichier appartient désormais à un objet trouvé : seule la session est supprimée"""
+        session.delete()
+
+    @staticmethod
+    def abort(session):
+        session.file.delete(save=False)
+        session.delete()
+
+    @staticmethod
+    def purge(older_than=None):
+        """Supprime les sessions (et leurs fichiers) inactives depuis UPLOAD_SESSION_TTL secondes"""
+        older_than = older_than or timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        count = 0
+        for session in UploadSession.objects.filter(updated_at__lt=older_than).iterator():
+            ChunkedUpload.abort(session)
+            count += 1
+        return count
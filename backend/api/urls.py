@@ -13,6 +13,13 @@ router.register(r'document-types', views.DocumentTypeViewSet)
 
 
 urlpatterns = [
+    # Avant le routeur : sinon 'stream' serait interprété comme une clé primaire
+    path('notifications/stream/', views.NotificationStreamView.as_view(), name='notification_stream'),
+    path('exports/<str:resource>/', views.ExportView.as_view(), name='export'),
+    path('uploads/', views.UploadView.as_view(), name='upload_create'),
+    path('uploads/<uuid:pk>/', views.UploadDetailView.as_view(), name='upload_detail'),
+    path('ocr/analyse/', views.OCRAnalyseView.as_view(), name='ocr_analyse'),
+    path('historique/', views.HistoriqueView.as_view(), name='historique'),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
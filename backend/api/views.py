@@ -5,15 +5,28 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
+from django.db import transaction
 from django.db.models import Q
-from datetime import datetime
+from datetime import datetime, time as day_time
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from .models import DocumentType, LostItem, FoundItem, Match, Notification, CustomUser, Historique, VerificationRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse, JsonResponse, HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views import View
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .models import (
+    DocumentType, LostItem, FoundItem, Match, Notification, CustomUser, Historique, VerificationRequest, UploadSession
+)
 from .serializers import (
     UserSerializer, DocumentTypeSerializer, LostItemSerializer,
     FoundItemSerializer, MatchSerializer, NotificationSerializer, RegisterSerializer,
-    OCRResultSerializer, VerificationRequestSerializer
+    VerificationRequestSerializer, UploadSessionSerializer
 )
 from .permissions import (
     AdminPermission,
@@ -23,9 +36,22 @@ from .permissions import (
     IsAdminPlatform,
     IsAdminPublic
 )
-from .services import MatchingService
+from .services import StatisticsService
+from .outbox import Outbox
+from .imports import DeclarationImporter, ImportFormatError, detect_format
+from .exports import Export, ExportError
+from .derivatives import ImageDerivatives
+from .duplicates import ImageHashIndex
+from .uploads import ChunkedUpload, UploadError, UploadOffsetConflict
+from .realtime import (
+    get_notification_broker, serialize_notification, format_sse, issue_stream_ticket, redeem_stream_ticket
+)
+from . import metrics
+from ocr.classifier import CONFIDENT
 from ocr.services import OCRService
 
+import asyncio
+import time
 import logging
 logger = logging.getLogger(__name__)
 
@@ -104,10 +130,32 @@ class DocumentTypeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = DocumentTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class LostItemViewSet(viewsets.ModelViewSet):
+class DeclarationImportMixin:
+    """POST <ressource>/import/ : import en masse d'un fichier CSV, JSON ou NDJSON (champ 'file')"""
+    import_kind = None
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[AdminPermission])
+    def bulk_import(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Fichier requis (champ 'file')"}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or detect_format(upload.name)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            report = DeclarationImporter(self.import_kind, request.user, dry_run=dry_run).run(upload, fmt)
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if report['created'] or (dry_run and report['valid']):
+            response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST if report['invalid'] else status.HTTP_200_OK
+        return Response(report, status=response_status)
+
+class LostItemViewSet(DeclarationImportMixin, viewsets.ModelViewSet):
     queryset = LostItem.objects.all()
     serializer_class = LostItemSerializer
     permission_classes = [IsOwnerOrAdminPermission.for_role('admin_public')]
+    import_kind = 'lost'
 
     def get_queryset(self):
         user = self.request.user
@@ -145,28 +193,30 @@ class LostItemViewSet(viewsets.ModelViewSet):
         Permet au déclarant de confirmer qu'il a récupéré sa pièce.
         """
         lost_item = self.get_object()
-        lost_item.status = 'found'
-        lost_item.save()
-
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_confirmed',
-            description=f"Confirmation de restitution pour la déclaration #{lost_item.id}",
-            related_object=lost_item
-        )
+        with transaction.atomic():
+            lost_item.status = 'found'
+            lost_item.save()
+
+            Outbox.record_action(
+                user=request.user,
+                action='match_confirmed',
+                description=f"Confirmation de restitution pour la déclaration #{lost_item.id}",
+                related_object=lost_item
+            )
 
-        Notification.objects.create(
-            user=request.user,
-            notification_type='item_handed_over',
-            title='Restitution confirmée',
-            message=f'Vous avez confirmé la restitution de votre {lost_item.document_type.name}.'
-        )
+            Outbox.notify(
+                user=request.user,
+                notification_type='item_handed_over',
+                title='Restitution confirmée',
+                message=f'Vous avez confirmé la restitution de votre {lost_item.document_type.name}.'
+            )
         return Response({'message': 'Restitution confirmée'}, status=status.HTTP_200_OK)
 
-class FoundItemViewSet(viewsets.ModelViewSet):
+class FoundItemViewSet(DeclarationImportMixin, viewsets.ModelViewSet):
     queryset = FoundItem.objects.all()
     serializer_class = FoundItemSerializer
     permission_classes = [IsOwnerOrAdminPermission.for_role('admin_public')]
+    import_kind = 'found'
 
     def get_queryset(self):
         user = self.request.user
@@ -176,23 +226,96 @@ class FoundItemViewSet(viewsets.ModelViewSet):
         return FoundItem.objects.filter(user=user)
     
     def perform_create(self, serializer):
-        found_item = serializer.save(user=self.request.user)
+        extra = {}
+        session = serializer.validated_data.pop('upload_id', None)
+        upload = serializer.validated_data.get('image')
+        if session is not None and upload is None:
+            # Envoi découpé : le fichier est déjà à son emplacement final, aucune copie
+            extra['image'] = session.file.name
+            with session.file.open('rb') as upload_file:
+                image = ImageDerivatives.decode(upload_file)
+        else:
+            image = ImageDerivatives.decode(upload) if upload else None
+        if image is not None:
+            extra.update(ImageHashIndex.hash_fields(image))
+            # Même pièce déjà déclarée par ce déclarant : pas d'OCR ni de matching (voir signals)
+            extra.update(ImageHashIndex.duplicate_fields(extra['image_hash'], self.request.user))
+        found_item = serializer.save(user=self.request.user, **extra)
         logger.info(f"Created FoundItem: {found_item.id}")
-        # OCR processing
+        if session is not None and upload is None:
+            ChunkedUpload.release(session)
+        if image is not None:
+            ImageDerivatives.generate(found_item, image)
+        if found_item.status == 'duplicate':
+            logger.info(f"FoundItem {found_item.id} is a duplicate of {found_item.duplicate_of_id}")
+            metrics.FOUND_ITEM_DUPLICATES.inc()
+            Outbox.record_action(
+                user=self.request.user,
+                action='found_declaration',
+                description=f"Trouvaille #{found_item.id} : doublon de la trouvaille #{found_item.duplicate_of_id}",
+                related_object=found_item
+            )
+            return
+        if found_item.duplicate_of_id:
+            self.flag_similar_image(found_item)
+        self.start_ocr(found_item)
+        # Matching will be triggered by signal
+
+    def perform_update(self, serializer):
+        upload = serializer.validated_data.get('image')
+        image = ImageDerivatives.decode(upload) if upload else None
+        extra = {}
+        previous_status = serializer.instance.status
+        if image is not None:
+            # Nouvelle image : le lien de doublon est recalculé (ou effacé)
+            extra.update(ImageHashIndex.hash_fields(image))
+            extra.update(ImageHashIndex.duplicate_fields(
+                extra['image_hash'], serializer.instance.user, exclude=serializer.instance.pk, status=previous_status
+            ))
+        found_item = serializer.save(**extra)
+        if image is not None:
+            ImageDerivatives.generate(found_item, image)
+            if found_item.status != 'duplicate' and found_item.duplicate_of_id:
+                self.flag_similar_image(found_item)
+            if previous_status == 'duplicate' and found_item.status != 'duplicate':
+                # Jamais analysée : traitée comme une nouvelle trouvaille
+                self.start_ocr(found_item)
+
+    def flag_similar_image(self, found_item):
+        """Image proche de la trouvaille d'un autre déclarant : trace pour vérification par un administrateur"""
+        logger.info(f"FoundItem {found_item.id} looks like FoundItem {found_item.duplicate_of_id} of another user")
+        Outbox.record_action(
+            user=found_item.user,
+            action='found_declaration',
+            description=f"Trouvaille #{found_item.id} : image proche de la trouvaille #{found_item.duplicate_of_id}"
+                        f" d'un autre déclarant, à vérifier",
+            related_object=found_item
+        )
+
+    @staticmethod
+    def start_ocr(found_item):
         try:
             if hasattr(OCRService, 'process_image_async'):
                 OCRService.process_image_async(found_item)
             else:
-                OCRService.process_image(found_item)
+                OCRService.process_image(ImageDerivatives.ocr_path(found_item))
         except Exception as e:
             logger.error(f"OCR failed for FoundItem {found_item.id}: {e}")
-        # Matching will be triggered by signal
     
     @action(detail=True, methods=['post'])
     def process_ocr(self, request, pk=None):
         found_item = self.get_object()
+        # robust=1 / 0 : force ou désactive le mode robuste (OCR_ROBUST_MODE par défaut)
+        robust = request.data.get('robust', request.query_params.get('robust'))
+        if robust is not None:
+            robust = str(robust).lower() in ('1', 'true', 'yes')
+        # Type déclaré imposé à l'OCR ; classement automatique seulement s'il est inconnu ou 'autre'
+        declared = next((
+            key for key, label in OCRService.DOCUMENT_LABELS.items()
+            if label == found_item.document_type.name and key != 'autre'
+        ), None)
         try:
-            ocr_data = OCRService.process_image(found_item.image.path)
+            ocr_data = OCRService.process_image(ImageDerivatives.ocr_path(found_item), doc_type=declared, robust=robust)
             structured_info = ocr_data.get('structured_info', {})
             payload = ocr_data.get('structured_payload', {})
             found_item.first_name = payload.get('prenom', structured_info.get('first_name', '')).title()
@@ -205,24 +328,25 @@ class FoundItemViewSet(viewsets.ModelViewSet):
                     found_item.date_of_birth = structured_info.get('date_of_birth')
             else:
                 found_item.date_of_birth = structured_info.get('date_of_birth')
-            found_item.document_number = payload.get('num_document') or structured_info.get('document_number', '')
+            found_item.document_number = payload.get('numero_document') or structured_info.get('document_number', '')
             found_item.ocr_confidence = ocr_data.get('confidence', 0.0)
             found_item.status = 'processed'
 
-            # Associer le type de document si détecté
-            doc_type_key = ocr_data.get('document_type', 'autre')
-            doc_type_name = OCRService.DOCUMENT_LABELS.get(doc_type_key, doc_type_key.replace('_', ' ').title())
-            try:
-                doc_type = DocumentType.objects.get(name=doc_type_name)
-                found_item.document_type = doc_type
-            except DocumentType.DoesNotExist:
-                pass
+            # Type détecté retenu seulement si le classement est sûr ou la MRZ validée :
+            # le repli du classifieur (CNI à 0.3) ne doit pas changer la partition de matching
+            doc_type_key = ocr_data.get('doc_type', 'autre')
+            classification = ocr_data.get('classification') or {}
+            if declared is None and (ocr_data.get('mrz') or classification.get('confidence', 0) >= CONFIDENT):
+                doc_type_name = OCRService.DOCUMENT_LABELS.get(doc_type_key, doc_type_key.replace('_', ' ').title())
+                try:
+                    doc_type = DocumentType.objects.get(name=doc_type_name)
+                    found_item.document_type = doc_type
+                except DocumentType.DoesNotExist:
+                    pass
 
+            # Le signal post_save relance le matching si des champs utiles ont changé
             found_item.save()
 
-            # Recherche de correspondances
-            MatchingService.find_matches(found_item)
-
             return Response({
                 'message': 'OCR traité avec succès',
                 'ocr_data': ocr_data
@@ -254,21 +378,22 @@ class FoundItemViewSet(viewsets.ModelViewSet):
             f"Disponibilité: {availability}" if availability else '',
         ]
         found_item.description = '\n'.join([part for part in note_parts if part])
-        found_item.save()
+        with transaction.atomic():
+            found_item.save()
 
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_confirmed',
-            description=f"Réponse du trouveur pour la trouvaille #{found_item.id}",
-            related_object=found_item
-        )
+            Outbox.record_action(
+                user=request.user,
+                action='match_confirmed',
+                description=f"Réponse du trouveur pour la trouvaille #{found_item.id}",
+                related_object=found_item
+            )
 
-        Notification.objects.create(
-            user=found_item.user,
-            notification_type='match_found',
-            title='Réponse envoyée',
-            message='Votre réponse a été prise en compte et sera partagée avec le déclarant.'
-        )
+            Outbox.notify(
+                user=found_item.user,
+                notification_type='match_found',
+                title='Réponse envoyée',
+                message='Votre réponse a été prise en compte et sera partagée avec le déclarant.'
+            )
 
         return Response({'message': 'Réponse enregistrée'}, status=status.HTTP_200_OK)
 
@@ -291,18 +416,19 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet):
     def confirm(self, request, pk=None):
         match = self.get_object()
         if match.lost_item.user == request.user:
-            match.status = 'confirmed'
-            match.save()
-            
-            # Créer notification pour le trouveur
-            Notification.objects.create(
-                user=match.found_item.user,
-                match=match,
-                notification_type='match_confirmed',
-                title='Correspondance confirmée',
-                message=f'La personne ayant perdu {match.lost_item.document_type.name} a confirmé la correspondance.'
-            )
-            
+            with transaction.atomic():
+                match.status = 'confirmed'
+                match.save()
+
+                # Créer notification pour le trouveur
+                Outbox.notify(
+                    user=match.found_item.user,
+                    match=match,
+                    notification_type='match_confirmed',
+                    title='Correspondance confirmée',
+                    message=f'La personne ayant perdu {match.lost_item.document_type.name} a confirmé la correspondance.'
+                )
+
             return Response({'message': 'Correspondance confirmée'})
         return Response({'error': 'Non autorisé'}, status=status.HTTP_403_FORBIDDEN)
     
@@ -319,24 +445,25 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet):
     def hand_over(self, request, pk=None):
         match = self.get_object()
         if match.found_item.user == request.user:
-            match.status = 'handed_over'
-            match.save()
-            
-            # Mettre à jour les statuts
-            match.lost_item.status = 'found'
-            match.lost_item.save()
-            match.found_item.status = 'handed_over'
-            match.found_item.save()
-            
-            # Créer notification
-            Notification.objects.create(
-                user=match.lost_item.user,
-                match=match,
-                notification_type='item_handed_over',
-                title='Pièce remise',
-                message=f'Votre {match.lost_item.document_type.name} a été remise avec succès.'
-            )
-            
+            with transaction.atomic():
+                match.status = 'handed_over'
+                match.save()
+
+                # Mettre à jour les statuts
+                match.lost_item.status = 'found'
+                match.lost_item.save()
+                match.found_item.status = 'handed_over'
+                match.found_item.save()
+
+                # Créer notification
+                Outbox.notify(
+                    user=match.lost_item.user,
+                    match=match,
+                    notification_type='item_handed_over',
+                    title='Pièce remise',
+                    message=f'Votre {match.lost_item.document_type.name} a été remise avec succès.'
+                )
+
             return Response({'message': 'Pièce remise avec succès'})
         return Response({'error': 'Non autorisé'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -351,37 +478,37 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet):
         Validation par un administrateur plateforme.
         """
         match = self.get_object()
-        match.status = 'confirmed'
-        match.save()
+        with transaction.atomic():
+            match.status = 'confirmed'
+            match.save()
 
-        match.lost_item.status = 'found'
-        match.lost_item.save()
-        match.found_item.status = 'processed'
-        match.found_item.save()
+            match.lost_item.status = 'found'
+            match.lost_item.save()
+            match.found_item.status = 'processed'
+            match.found_item.save()
 
-        Notification.objects.bulk_create([
-            Notification(
+            Outbox.notify(
                 user=match.lost_item.user,
                 match=match,
                 notification_type='match_confirmed',
                 title='Correspondance validée',
                 message='L\'administrateur a validé la correspondance. Préparez la restitution.'
-            ),
-            Notification(
+            )
+
+            Outbox.notify(
                 user=match.found_item.user,
                 match=match,
                 notification_type='match_confirmed',
                 title='Correspondance validée',
                 message='L\'administrateur a validé la correspondance. Coordonnez-vous avec le propriétaire.'
-            ),
-        ])
-
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_confirmed',
-            description=f'Validation admin plateforme du match #{match.id}',
-            related_object=match
-        )
+            )
+
+            Outbox.record_action(
+                user=request.user,
+                action='match_confirmed',
+                description=f'Validation admin plateforme du match #{match.id}',
+                related_object=match
+            )
 
         return Response({'message': 'Correspondance validée'}, status=status.HTTP_200_OK)
 
@@ -398,35 +525,35 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet):
         match = self.get_object()
         reason = request.data.get('reason', 'Décision administrative')
 
-        match.status = 'rejected'
-        criteria = match.match_criteria or {}
-        criteria['admin_decision'] = {'status': 'rejected', 'reason': reason}
-        match.match_criteria = criteria
-        match.save()
+        with transaction.atomic():
+            match.status = 'rejected'
+            criteria = match.match_criteria or {}
+            criteria['admin_decision'] = {'status': 'rejected', 'reason': reason}
+            match.match_criteria = criteria
+            match.save()
 
-        Notification.objects.bulk_create([
-            Notification(
+            Outbox.notify(
                 user=match.lost_item.user,
                 match=match,
                 notification_type='match_found',
                 title='Correspondance rejetée',
                 message=f'La correspondance a été rejetée. Motif : {reason}'
-            ),
-            Notification(
+            )
+
+            Outbox.notify(
                 user=match.found_item.user,
                 match=match,
                 notification_type='match_found',
                 title='Correspondance rejetée',
                 message=f'La correspondance a été rejetée. Motif : {reason}'
-            ),
-        ])
-
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_rejected',
-            description=f'Rejet admin plateforme du match #{match.id} : {reason}',
-            related_object=match
-        )
+            )
+
+            Outbox.record_action(
+                user=request.user,
+                action='match_rejected',
+                description=f'Rejet admin plateforme du match #{match.id} : {reason}',
+                related_object=match
+            )
 
         return Response({'message': 'Correspondance rejetée'}, status=status.HTTP_200_OK)
 
@@ -441,42 +568,40 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet):
         Permet de solliciter l'administration publique pour vérifier l'authenticité.
         """
         match = self.get_object()
-        criteria = match.match_criteria or {}
-        criteria['needs_admin_public_review'] = True
-        match.match_criteria = criteria
-        match.save()
-
-        verification, created = VerificationRequest.objects.get_or_create(
-            match=match,
-            defaults={
-                'requested_by': request.user,
-                'notes': request.data.get('notes', '')
-            }
-        )
+        with transaction.atomic():
+            criteria = match.match_criteria or {}
+            criteria['needs_admin_public_review'] = True
+            match.match_criteria = criteria
+            match.save()
 
-        if not created:
-            verification.status = 'pending'
-            verification.notes = request.data.get('notes', verification.notes)
-            verification.decision_reason = ''
-            verification.save()
+            verification, created = VerificationRequest.objects.get_or_create(
+                match=match,
+                defaults={
+                    'requested_by': request.user,
+                    'notes': request.data.get('notes', '')
+                }
+            )
 
-        admin_public_users = CustomUser.objects.filter(role='admin_public')
-        Notification.objects.bulk_create([
-            Notification(
-                user=admin_user,
+            if not created:
+                verification.status = 'pending'
+                verification.notes = request.data.get('notes', verification.notes)
+                verification.decision_reason = ''
+                verification.save()
+
+            Outbox.notify_many(
+                users=CustomUser.objects.filter(role='admin_public').only('id'),
                 match=match,
                 notification_type='match_found',
                 title='Vérification requise',
                 message='Un dossier nécessite une vérification d\'authenticité.'
-            ) for admin_user in admin_public_users
-        ])
-
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_confirmed',
-            description=f'Demande de vérification admin public pour le match #{match.id}',
-            related_object=match
-        )
+            )
+
+            Outbox.record_action(
+                user=request.user,
+                action='match_confirmed',
+                description=f'Demande de vérification admin public pour le match #{match.id}',
+                related_object=match
+            )
 
         return Response({'message': 'Demande de vérification transmise'}, status=status.HTTP_200_OK)
 
@@ -508,6 +633,14 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def unread_count(self, request):
         count = self.get_queryset().filter(is_read=False).count()
         return Response({'unread_count': count})
+
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """Ticket de connexion au flux temps réel (NotificationStreamView)"""
+        return Response({
+            'ticket': issue_stream_ticket(request.user),
+            'expires_in': settings.NOTIFICATION_STREAM_TICKET_TTL,
+        })
     
     @action(
         detail=False,
@@ -539,24 +672,122 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             except Match.DoesNotExist:
                 return Response({'error': 'Match introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
-        notification = Notification.objects.create(
-            user=target_user,
-            match=match,
-            notification_type='match_found',
-            title=title,
-            message=message
-        )
+        with transaction.atomic():
+            notification = Notification.objects.create(
+                user=target_user,
+                match=match,
+                notification_type='match_found',
+                title=title,
+                message=message
+            )
 
-        Historique.enregistrerAction(
-            user=request.user,
-            action='item_handed_over',
-            description=f'Notification envoyée à {target_user.email}',
-            related_object=match or target_user
-        )
+            Outbox.record_action(
+                user=request.user,
+                action='item_handed_over',
+                description=f'Notification envoyée à {target_user.email}',
+                related_object=match or target_user
+            )
 
         return Response({'message': 'Notification envoyée', 'id': notification.id}, status=status.HTTP_201_CREATED)
 
 
+class NotificationStreamView(View):
+    """
+    Flux Server-Sent Events des nouvelles notifications de l'utilisateur.
+    Servi par l'application ASGI (findmyid/asgi.py). EventSource ne pouvant pas
+    envoyer d'en-tête Authorization, le navigateur s'authentifie avec un ticket à
+    usage unique (?ticket=, obtenu par POST notifications/stream_ticket/) ; le jeton
+    JWT n'est accepté que dans l'en-tête. Le flux est fermé après
+    NOTIFICATION_STREAM_MAX_AGE secondes ; le client se reconnecte avec un nouveau
+    ticket et last_event_id, les notifications manquées sont rejouées.
+    """
+
+    def _authenticate(self, request):
+        authenticator = JWTAuthentication()
+        header = authenticator.get_header(request)
+        raw_token = authenticator.get_raw_token(header) if header else None
+        if raw_token is None:
+            user_id = redeem_stream_ticket(request.GET.get('ticket', ''))
+            return CustomUser.objects.filter(pk=user_id).first() if user_id else None
+        try:
+            validated_token = authenticator.get_validated_token(raw_token)
+            return authenticator.get_user(validated_token)
+        except (InvalidToken, TokenError):
+            return None
+
+    @staticmethod
+    def _missed_notifications(user, last_event_id):
+        queryset = Notification.objects.filter(user=user, id__gt=last_event_id).order_by('id')
+        return [serialize_notification(n) for n in queryset[:settings.NOTIFICATION_STREAM_REPLAY_LIMIT]]
+
+    async def get(self, request):
+        user = await sync_to_async(self._authenticate)(request)
+        if user is None or not user.is_active:
+            return JsonResponse({'detail': 'Authentification requise'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            self._event_stream(user, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _event_stream(self, user, last_event_id):
+        broker = get_notification_broker()
+        subscription = await broker.subscribe(user.id)
+        heartbeat = settings.NOTIFICATION_STREAM_HEARTBEAT
+        deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_AGE
+        try:
+            yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+            # Abonnement pris avant le rattrapage : aucune notification perdue entre les deux
+            if last_event_id is not None:
+                missed = await sync_to_async(self._missed_notifications)(user, last_event_id)
+                for payload in missed:
+                    last_event_id = payload['id']
+                    yield format_sse(payload)
+            while time.monotonic() < deadline:
+                payload = await subscription.get(timeout=heartbeat)
+                if payload is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if last_event_id is not None and payload['id'] <= last_event_id:
+                    continue
+                yield format_sse(payload)
+        except asyncio.CancelledError:
+            logger.info(f"Notification stream closed by client for user {user.id}")
+            raise
+        finally:
+            await subscription.close()
+
+
+class MetricsView(View):
+    """
+    Point de collecte Prometheus (format texte), protégé par METRICS_TOKEN. Sans jeton,
+    il n'est servi qu'en DEBUG : les métriques (vues, volumes) ne sont jamais publiques.
+    """
+
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            return HttpResponse(status=404)
+        if settings.METRICS_TOKEN:
+            expected = f'Bearer {settings.METRICS_TOKEN}'
+            if not constant_time_compare(request.headers.get('Authorization', ''), expected):
+                return HttpResponse(status=401)
+        elif not settings.DEBUG:
+            return HttpResponse(status=404)
+        return HttpResponse(
+            metrics.REGISTRY.expose(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
 class VerificationRequestViewSet(viewsets.ModelViewSet):
     serializer_class = VerificationRequestSerializer
     queryset = VerificationRequest.objects.select_related(
@@ -591,37 +822,37 @@ class VerificationRequestViewSet(viewsets.ModelViewSet):
     def confirm(self, request, pk=None):
         verification = self.get_object()
         reason = request.data.get('reason', 'Authenticité confirmée')
-        verification.status = 'confirmed'
-        verification.decision_reason = reason
-        verification.save()
+        with transaction.atomic():
+            verification.status = 'confirmed'
+            verification.decision_reason = reason
+            verification.save()
 
-        match = verification.match
-        match.status = 'confirmed'
-        match.save()
+            match = verification.match
+            match.status = 'confirmed'
+            match.save()
 
-        Notification.objects.bulk_create([
-            Notification(
+            Outbox.notify(
                 user=match.lost_item.user,
                 match=match,
                 notification_type='match_confirmed',
                 title='Authenticité confirmée',
                 message='L\'administration a confirmé l\'authenticité de votre document.'
-            ),
-            Notification(
+            )
+
+            Outbox.notify(
                 user=match.found_item.user,
                 match=match,
                 notification_type='match_confirmed',
                 title='Authenticité confirmée',
                 message='Vous pouvez préparer la restitution officielle.'
             )
-        ])
 
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_confirmed',
-            description=f'Vérification confirmée pour le match #{match.id}',
-            related_object=match
-        )
+            Outbox.record_action(
+                user=request.user,
+                action='match_confirmed',
+                description=f'Vérification confirmée pour le match #{match.id}',
+                related_object=match
+            )
 
         return Response({'message': 'Vérification confirmée'}, status=status.HTTP_200_OK)
 
@@ -629,78 +860,78 @@ class VerificationRequestViewSet(viewsets.ModelViewSet):
     def reject(self, request, pk=None):
         verification = self.get_object()
         reason = request.data.get('reason', 'Authenticité refusée')
-        verification.status = 'rejected'
-        verification.decision_reason = reason
-        verification.save()
+        with transaction.atomic():
+            verification.status = 'rejected'
+            verification.decision_reason = reason
+            verification.save()
 
-        match = verification.match
-        match.status = 'rejected'
-        match.save()
+            match = verification.match
+            match.status = 'rejected'
+            match.save()
 
-        Notification.objects.bulk_create([
-            Notification(
+            Outbox.notify(
                 user=match.lost_item.user,
                 match=match,
                 notification_type='match_found',
                 title='Authenticité refusée',
                 message=f'L\'administration a refusé la correspondance : {reason}'
-            ),
-            Notification(
+            )
+
+            Outbox.notify(
                 user=match.found_item.user,
                 match=match,
                 notification_type='match_found',
                 title='Authenticité refusée',
                 message=f'L\'administration a refusé la correspondance : {reason}'
             )
-        ])
 
-        Historique.enregistrerAction(
-            user=request.user,
-            action='match_rejected',
-            description=f'Refus de vérification pour le match #{match.id} : {reason}',
-            related_object=match
-        )
+            Outbox.record_action(
+                user=request.user,
+                action='match_rejected',
+                description=f'Refus de vérification pour le match #{match.id} : {reason}',
+                related_object=match
+            )
 
         return Response({'message': 'Vérification rejetée'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='supervise-restitution')
     def supervise_restitution(self, request, pk=None):
         verification = self.get_object()
-        verification.status = 'supervised'
-        verification.decision_reason = request.data.get('notes', 'Restitution supervisée')
-        verification.save()
-
-        match = verification.match
-        match.status = 'handed_over'
-        match.save()
-        match.lost_item.status = 'found'
-        match.lost_item.save()
-        match.found_item.status = 'handed_over'
-        match.found_item.save()
-
-        Notification.objects.bulk_create([
-            Notification(
+        with transaction.atomic():
+            verification.status = 'supervised'
+            verification.decision_reason = request.data.get('notes', 'Restitution supervisée')
+            verification.save()
+
+            match = verification.match
+            match.status = 'handed_over'
+            match.save()
+            match.lost_item.status = 'found'
+            match.lost_item.save()
+            match.found_item.status = 'handed_over'
+            match.found_item.save()
+
+            Outbox.notify(
                 user=match.lost_item.user,
                 match=match,
                 notification_type='item_handed_over',
                 title='Restitution supervisée',
                 message='La restitution a été supervisée par l\'administration.'
-            ),
-            Notification(
+            )
+
+            Outbox.notify(
                 user=match.found_item.user,
                 match=match,
                 notification_type='item_handed_over',
                 title='Restitution supervisée',
                 message='La restitution a été supervisée et confirmée.'
             )
-        ])
 
-        Historique.enregistrerAction(
-            user=request.user,
-            action='item_handed_over',
-            description=f'Restitution supervisée pour le match #{match.id}',
-            related_object=match
-        )
+            Outbox.record_action(
+                user=request.user,
+                action='item_handed_over',
+                description=f'Restitution supervisée pour le match #{match.id}',
+                related_object=match
+            )
 
         return Response({'message': 'Supervision enregistrée'}, status=status.HTTP_200_OK)
 
@@ -735,18 +966,7 @@ class UserViewSet(viewsets.ModelViewSet):
         if not user.has_role_or_higher('admin_public'):
             return Response({'error': 'Non autorisé'}, status=status.HTTP_403_FORBIDDEN)
 
-        total_users = CustomUser.objects.count()
-        active_users = CustomUser.objects.filter(is_active=True).count()
-        citoyens = CustomUser.objects.filter(role='citoyen').count()
-        admin_public = CustomUser.objects.filter(role='admin_public').count()
-        admin_plateforme = CustomUser.objects.filter(role='admin_plateforme').count()
-        return Response({
-            'total_users': total_users,
-            'active_users': active_users,
-            'citoyens': citoyens,
-            'admin_public': admin_public,
-            'admin_plateforme': admin_plateforme,
-        })
+        return Response(StatisticsService.get_platform_stats())
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -767,8 +987,21 @@ class OCRAnalyseView(APIView):
     def post(self, request):
         """
         Analyse OCR d'une image de document d'identité.
-        Reçoit une image et retourne les données structurées avec niveau de confiance.
+        Reçoit une image (ou l'identifiant d'un envoi découpé terminé, upload_id)
+        et retourne les données structurées avec niveau de confiance.
         """
+        if request.data.get('upload_id'):
+            try:
+                session = ChunkedUpload.claim(request.user, request.data['upload_id'])
+            except UploadError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                # Fichier analysé sur place ; il reste utilisable pour déclarer l'objet trouvé
+                ocr_data = OCRService.process_image(session.file.path)
+                return Response({'message': 'OCR traité avec succès', 'ocr_data': ocr_data})
+            except Exception as e:
+                return Response({'error': f'Erreur lors de l\'analyse OCR: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
         if 'image' not in request.FILES:
             return Response({'error': 'Aucune image fournie'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -785,18 +1018,17 @@ class OCRAnalyseView(APIView):
 
         try:
             # Sauvegarde temporaire de l'image
-            file_name = default_storage.save(f'temp_ocr/{image_file.name}', ContentFile(image_file.read()))
+            # Copie par morceaux (UploadedFile.chunks) : le fichier n'est pas chargé en mémoire
+            file_name = default_storage.save(f'temp_ocr/{image_file.name}', image_file)
             temp_path = default_storage.path(file_name)
 
             # Traitement OCR avec le nouveau pipeline
-            ocr_result = OCRService.analyse_document(temp_path)
+            ocr_data = OCRService.process_image(temp_path)
 
             # Nettoyage du fichier temporaire
             default_storage.delete(file_name)
 
-            # Sérialisation du résultat
-            serializer = OCRResultSerializer(ocr_result)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response({'message': 'OCR traité avec succès', 'ocr_data': ocr_data})
 
         except Exception as e:
             # Nettoyage en cas d'erreur
@@ -811,8 +1043,129 @@ class HistoriqueView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        """
+        Historique de l'utilisateur connecté, entrées archivées comprises
+        (Historique.consulterHistoriqueComplet). Filtres : action, date_debut, date_fin
+        (AAAA-MM-JJ ou date et heure ISO 8601) ; user (id) réservé à l'administrateur plateforme.
+        """
         user = request.user
-        # For now, return empty list as history is not implemented yet
-        # In future, could aggregate user actions from various models
-        historique = []
+        user_id = request.query_params.get('user')
+        if user_id:
+            if not user.is_admin_plateforme():
+                return Response({'error': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
+            user = CustomUser.objects.filter(pk=user_id).first() if user_id.isdigit() else None
+            if user is None:
+                return Response({'error': 'Utilisateur inconnu'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date_debut = self.parse_bound(request.query_params.get('date_debut'), day_time.min)
+            date_fin = self.parse_bound(request.query_params.get('date_fin'), day_time.max)
+        except ValueError:
+            return Response({'error': 'date_debut / date_fin : date attendue au format AAAA-MM-JJ'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        historique = Historique.consulterHistoriqueComplet(
+            user=user, action=request.query_params.get('action'), date_debut=date_debut, date_fin=date_fin
+        )
         return Response(historique)
+
+    @staticmethod
+    def parse_bound(value, default_time):
+        """Borne de période ; une date seule couvre toute la journée"""
+        if not value:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            moment = datetime.combine(day, default_time)
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+class ExportView(APIView):
+    """
+    GET exports/<ressource>/?output=csv|ndjson&gzip=1 : export en flux pour l'administration.
+    Filtres : since, until (AAAA-MM-JJ, date de création) et ceux de la ressource (exports.EXPORTS).
+    """
+    permission_classes = [AdminPermission]
+
+    def get(self, request, resource):
+        params = request.query_params
+        try:
+            export = Export(
+                resource,
+                output=params.get('output', 'csv'),
+                compress=params.get('gzip', '').lower() in ('1', 'true', 'yes'),
+                filters=params,
+            )
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Sous ASGI, un itérateur synchrone serait lu en entier avant l'envoi
+        chunks = export.achunks() if isinstance(request._request, ASGIRequest) else export.chunks()
+        response = StreamingHttpResponse(chunks, content_type=export.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+        return response
+
+class UploadView(APIView):
+    """POST uploads/ {filename, size, content_type} : ouvre un envoi découpé (voir api/uploads.py)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            size = int(request.data.get('size', 0))
+        except (TypeError, ValueError):
+            return Response({'error': "size : nombre d'octets attendu"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = ChunkedUpload.start(
+                request.user, request.data.get('filename', ''), size, request.data.get('content_type', '')
+            )
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = {**UploadSessionSerializer(session).data, 'chunk_size': settings.UPLOAD_CHUNK_SIZE}
+        return Response(data, status=status.HTTP_201_CREATED, headers={'Upload-Offset': str(session.offset)})
+
+class UploadDetailView(APIView):
+    """
+    GET uploads/<id>/ : position atteinte (reprise) ; PATCH : morceau brut à la position
+    de l'en-tête Upload-Offset ; DELETE : abandon.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_session(self, request, pk):
+        try:
+            return UploadSession.objects.get(pk=pk, user=request.user)
+        except UploadSession.DoesNotExist:
+            return None
+
+    def respond(self, session, response_status=status.HTTP_200_OK):
+        return Response(UploadSessionSerializer(session).data, status=response_status,
+                        headers={'Upload-Offset': str(session.offset)})
+
+    def get(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({'error': 'Envoi inconnu'}, status=status.HTTP_404_NOT_FOUND)
+        return self.respond(session)
+
+    def patch(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({'error': 'Envoi inconnu'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return Response({'error': "En-tête Upload-Offset requis"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Corps lu directement sur la requête Django, sans passer par les parsers DRF
+            session = ChunkedUpload.append(session, offset, request._request)
+        except UploadOffsetConflict as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT,
+                            headers={'Upload-Offset': str(e.offset)})
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.respond(session)
+
+    def delete(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({'error': 'Envoi inconnu'}, status=status.HTTP_404_NOT_FOUND)
+        ChunkedUpload.abort(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
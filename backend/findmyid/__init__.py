@@ -1 +1,5 @@
-# FindMyID Django Project 
\ No newline at end of file
+# FindMyID Django Project
+# Application Celery chargée avec Django : les tâches partagées (@shared_task) s'y rattachent
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -3,6 +3,10 @@ ASGI config for findmyid project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification stream (/api/notifications/stream/) is an async view and
+should be served through this application (e.g. uvicorn/daphne) rather than
+WSGI, where each open stream would hold a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -34,6 +34,8 @@ AUTH_USER_MODEL = 'api.CustomUser'
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -134,6 +136,29 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='findmyid'),
+    }
+}
+
+# Durée de vie (secondes) des statistiques plateforme en cache
+STATS_CACHE_TTL = config('STATS_CACHE_TTL', default=30, cast=int)
+
+# Notifications temps réel (SSE)
+# 'memory' : pub/sub dans le processus (tests, serveur ASGI unique)
+# 'redis'  : pub/sub partagé entre workers
+NOTIFICATION_BROKER = config('NOTIFICATION_BROKER', default='memory')
+NOTIFICATION_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=15, cast=int)
+NOTIFICATION_STREAM_MAX_AGE = config('NOTIFICATION_STREAM_MAX_AGE', default=300, cast=int)
+NOTIFICATION_STREAM_RETRY_MS = 3000
+# Durée de validité d'un ticket de connexion au flux (à usage unique, voir api/realtime.py)
+NOTIFICATION_STREAM_TICKET_TTL = config('NOTIFICATION_STREAM_TICKET_TTL', default=30, cast=int)
+NOTIFICATION_STREAM_REPLAY_LIMIT = 50
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
@@ -142,6 +167,114 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Outbox : notifications et historique appliqués après validation de la transaction
+# False : dispatch dans le processus après commit (aucun broker requis)
+# True : dispatch confié à Celery (worker + beat sur REDIS_URL) ; si la publication
+# échoue, le dispatch est fait dans le processus
+OUTBOX_DISPATCH_ASYNC = config('OUTBOX_DISPATCH_ASYNC', default=False, cast=bool)
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_MAX_ATTEMPTS = 5
+
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-outbox': {
+        'task': 'api.tasks.dispatch_outbox',
+        'schedule': 10.0,
+    },
+}
+
+# Historique : écriture différée et groupée (voir api/audit.py)
+# 'sync' : insertion immédiate, 'buffered' : bulk_create en arrière-plan, 'celery' : lots envoyés à Celery
+AUDIT_WRITER_MODE = config('AUDIT_WRITER_MODE', default='buffered')
+AUDIT_BATCH_SIZE = config('AUDIT_BATCH_SIZE', default=100, cast=int)
+AUDIT_FLUSH_INTERVAL = config('AUDIT_FLUSH_INTERVAL', default=2.0, cast=float)
+AUDIT_SPOOL_DIR = config('AUDIT_SPOOL_DIR', default=os.path.join(BASE_DIR, 'var', 'audit_spool'))
+AUDIT_SPOOL_FSYNC = config('AUDIT_SPOOL_FSYNC', default=False, cast=bool)
+
+# Rétention : archivage mensuel compressé (python manage.py archive_history, voir api/archive.py)
+HISTORIQUE_RETENTION_DAYS = config('HISTORIQUE_RETENTION_DAYS', default=365, cast=int)
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=5000, cast=int)
+# Segments d'archive (données personnelles) : répertoire privé, jamais sous MEDIA_ROOT
+ARCHIVE_ROOT = config('ARCHIVE_ROOT', default=os.path.join(BASE_DIR, 'var'))
+
+# Instrumentation SQL par requête (voir api/middleware.py)
+QUERY_INSPECTOR_ENABLED = config('QUERY_INSPECTOR_ENABLED', default=True, cast=bool)
+QUERY_INSPECTOR_HEADERS = config('QUERY_INSPECTOR_HEADERS', default=DEBUG, cast=bool)
+QUERY_COUNT_THRESHOLD = config('QUERY_COUNT_THRESHOLD', default=50, cast=int)
+QUERY_TIME_THRESHOLD_MS = config('QUERY_TIME_THRESHOLD_MS', default=500, cast=float)
+QUERY_DUPLICATE_THRESHOLD = config('QUERY_DUPLICATE_THRESHOLD', default=10, cast=int)
+
+# Métriques Prometheus exposées sur /metrics (voir api/metrics.py)
+# METRICS_TOKEN : le scraper doit envoyer 'Authorization: Bearer <token>' ; sans jeton,
+# /metrics n'est servi qu'en DEBUG
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Plusieurs processus (gunicorn -w N, workers Celery) : répertoire partagé des
+# instantanés fusionnés par /metrics ; vide = valeurs du seul processus qui répond
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+
+# Index n-grammes des numéros de document (voir api/ngram.py)
+# Modifier la taille impose de reconstruire l'index : python manage.py rebuild_document_number_index
+DOCUMENT_NUMBER_NGRAM_SIZE = config('DOCUMENT_NUMBER_NGRAM_SIZE', default=3, cast=int)
+DOCUMENT_NUMBER_CANDIDATES = config('DOCUMENT_NUMBER_CANDIDATES', default=20, cast=int)
+DOCUMENT_NUMBER_MIN_SIMILARITY = config('DOCUMENT_NUMBER_MIN_SIMILARITY', default=0.5, cast=float)
+
+# Candidats MinHash / LSH (voir api/lsh.py) : seuil de similarité ~ (1 / BANDS) ^ (1 / ROWS)
+# Plus de bandes : meilleur rappel ; plus de lignes par bande : moins de candidats.
+# Modifier BANDS ou ROWS impose : python manage.py rebuild_lsh_index
+MATCHING_LSH_ENABLED = config('MATCHING_LSH_ENABLED', default=True, cast=bool)
+MATCHING_LSH_BANDS = config('MATCHING_LSH_BANDS', default=16, cast=int)
+MATCHING_LSH_ROWS = config('MATCHING_LSH_ROWS', default=4, cast=int)
+MATCHING_LSH_CANDIDATES = config('MATCHING_LSH_CANDIDATES', default=50, cast=int)
+
+# Règles de matching par type de document (api.models.MatchingRule), mises en cache
+MATCHING_RULE_CACHE_TTL = config('MATCHING_RULE_CACHE_TTL', default=300, cast=int)
+
+# Recalcul complet des correspondances (python manage.py rematch_all, voir api/backfill.py)
+REMATCH_CHUNK_SIZE = config('REMATCH_CHUNK_SIZE', default=500, cast=int)
+REMATCH_CHECKPOINT_FILE = config(
+    'REMATCH_CHECKPOINT_FILE', default=os.path.join(BASE_DIR, 'var', 'rematch_checkpoint.json')
+)
+
+# Import en masse de déclarations (POST /lost-items/import/, /found-items/import/, voir api/imports.py)
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=500, cast=int)
+IMPORT_MAX_REPORTED_ERRORS = config('IMPORT_MAX_REPORTED_ERRORS', default=1000, cast=int)
+
+# Exports en flux (GET /exports/<ressource>/, voir api/exports.py) : lignes lues par lots, envoyées par blocs
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+EXPORT_BUFFER_BYTES = config('EXPORT_BUFFER_BYTES', default=64 * 1024, cast=int)
+
+# Doublons d'images (api/duplicates.py) : distance de Hamming maximale entre dHash, <= 3 pour un rappel garanti
+DUPLICATE_IMAGE_MAX_DISTANCE = config('DUPLICATE_IMAGE_MAX_DISTANCE', default=3, cast=int)
+
+# Dérivés des images d'objets trouvés (api/derivatives.py) : côté le plus long, en pixels
+IMAGE_THUMBNAIL_SIZE = config('IMAGE_THUMBNAIL_SIZE', default=240, cast=int)
+IMAGE_MEDIUM_SIZE = config('IMAGE_MEDIUM_SIZE', default=1024, cast=int)
+IMAGE_OCR_SIZE = config('IMAGE_OCR_SIZE', default=1600, cast=int)
+
+# Envois d'images découpés et reprenables (POST /uploads/, voir api/uploads.py)
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=20 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_SIZE = config('UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int)  # taille conseillée au client
+UPLOAD_CHUNK_MAX_SIZE = config('UPLOAD_CHUNK_MAX_SIZE', default=8 * 1024 * 1024, cast=int)
+UPLOAD_SESSION_TTL = config('UPLOAD_SESSION_TTL', default=24 * 3600, cast=int)
+# Réservation d'une session pendant l'écriture d'un morceau (reprise après un arrêt brutal)
+UPLOAD_CHUNK_LOCK_TIMEOUT = config('UPLOAD_CHUNK_LOCK_TIMEOUT', default=300, cast=int)
+
+# Pipeline OCR (ocr/services.py) : confiance par champ en deçà de laquelle la passe lourde est lancée
+OCR_FIELD_CONFIDENCE = config('OCR_FIELD_CONFIDENCE', default=0.85, cast=float)
+# Mode robuste (photos difficiles) : variantes de prétraitement reconnues en parallèle (ocr/variants.py),
+# vote par champ, abandon des variantes au-delà du délai (secondes depuis le début du traitement).
+# Chaque thread charge son propre modèle PaddleOCR au démarrage du processus ; sans thread libre,
+# la passe classique est utilisée.
+OCR_ROBUST_MODE = config('OCR_ROBUST_MODE', default=False, cast=bool)
+OCR_ROBUST_DEADLINE = config('OCR_ROBUST_DEADLINE', default=8.0, cast=float)
+OCR_ROBUST_WORKERS = config('OCR_ROBUST_WORKERS', default=3, cast=int)
+OCR_ROBUST_VARIANTS = config(
+    'OCR_ROBUST_VARIANTS', default='deskewed,brightened,sharpened,contrast',
+    cast=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+)
+
 # DRF Spectacular Settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'FindMyID API',
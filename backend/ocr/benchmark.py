@@ -0,0 +1,239 @@
+"""
+Banc de performance du pipeline OCR (ocr/services.py).
+
+Mesure, sur un dossier d'images :
+- le temps de chargement des modèles (PaddleOCR à l'import, extracteur DL) ;
+- la latence par étape (classification, MRZ, prétraitement, OCR, extraction, passe lourde ou mode robuste) en percentiles,
+  après un tour de chauffe ;
+- le débit en images/s pour 1..N processus ;
+- la mémoire résidente maximale (processus principal et workers).
+
+Le rapport peut être comparé à une référence enregistrée : toute dégradation
+au-delà de la tolérance est signalée (code de sortie 1 avec --fail-on-regression).
+
+Usage :
+    python -m ocr.benchmark ../images --workers 1,2,4 --baseline ocr_benchmark_baseline.json
+"""
+import argparse
+import json
+import math
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+STAGES = ['classify', 'mrz', 'preprocess', 'ocr', 'extract', 'refine', 'robust', 'total']
+PERCENTILES = [50, 90, 95, 99]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def load_models():
+    """Temps de chargement des modèles, mesuré dans le processus courant"""
+    started = time.perf_counter()
+    from . import services
+    paddle_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    services.DLFieldExtractor()
+    dl_seconds = time.perf_counter() - started
+    return {
+        'paddleocr_seconds': round(paddle_seconds, 3),
+        'dl_extractor_seconds': round(dl_seconds, 3),
+    }
+
+
+def stage_totals():
+    """(nombre, somme des durées) par étape dans l'histogramme OCR_STAGE_DURATION du processus"""
+    from api import metrics
+    return {
+        stage: (metrics.OCR_STAGE_DURATION.count(stage=stage), metrics.OCR_STAGE_DURATION.total(stage=stage))
+        for stage in STAGES if stage != 'total'
+    }
+
+
+def run_stages(image_path, doc_type=None):
+    """
+    Exécute OCRService.process_image (le pipeline réel : MRZ, passe rapide, passe lourde
+    ou mode robuste) et retourne la durée des étapes exécutées, lue dans l'histogramme
+    OCR_STAGE_DURATION qu'il alimente (écart avant / après l'appel)
+    """
+    from .services import OCRService
+    before = stage_totals()
+    started = time.perf_counter()
+    OCRService.process_image(image_path, doc_type=doc_type)
+    total = time.perf_counter() - started
+    timings = {
+        stage: seconds - before[stage][1]
+        for stage, (count, seconds) in stage_totals().items() if count > before[stage][0]
+    }
+    timings['total'] = total
+    return timings
+
+
+def _init_worker(warmup_image):
+    # Chargement des modèles et chauffe hors de la fenêtre de mesure
+    from . import services
+    if services.ocr_setting('OCR_ROBUST_MODE'):
+        services.warm_variant_pool()
+    if warmup_image:
+        run_stages(warmup_image)
+
+
+def _worker_task(image_path):
+    run_stages(image_path)
+    return peak_rss_mb()
+
+
+class OCRBenchmark:
+    def __init__(self, images, warmup=1, repeat=1, workers=(1,)):
+        self.images = [str(p) for p in images]
+        self.warmup = warmup
+        self.repeat = repeat
+        self.workers = list(workers)
+
+    def run(self):
+        report = {'images': len(self.images), 'repeat': self.repeat}
+        report['model_load'] = load_models()
+
+        for image in self.images[:self.warmup]:
+            run_stages(image)
+
+        samples = {stage: [] for stage in STAGES}
+        for _ in range(self.repeat):
+            for image in self.images:
+                for stage, seconds in run_stages(image).items():
+                    samples[stage].append(seconds)
+        report['stages'] = {
+            stage: {f'p{pct}_ms': round(percentile(values, pct) * 1000, 2) for pct in PERCENTILES}
+            for stage, values in samples.items()
+        }
+
+        report['throughput'] = {}
+        worker_rss = 0.0
+        for count in self.workers:
+            images_per_second, rss = self.measure_throughput(count)
+            report['throughput'][str(count)] = images_per_second
+            worker_rss = max(worker_rss, rss)
+        report['peak_rss_mb'] = {'main': peak_rss_mb(), 'worker': worker_rss}
+        return report
+
+    def measure_throughput(self, workers):
+        batch = self.images * self.repeat
+        warmup_image = self.images[0] if self.warmup else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(warmup_image,)) as pool:
+            # Attendre que chaque worker ait chargé ses modèles avant de chronométrer
+            list(pool.map(_worker_task, self.images[:1] * workers))
+            started = time.perf_counter()
+            rss = list(pool.map(_worker_task, batch))
+            elapsed = time.perf_counter() - started
+        return round(len(batch) / elapsed, 2) if elapsed else 0.0, max(rss, default=0.0)
+
+
+def flatten(report):
+    """Métriques comparables : nom -> (valeur, True si plus grand est meilleur)"""
+    metrics = {}
+    for stage, values in report.get('stages', {}).items():
+        for name, value in values.items():
+            metrics[f'stages.{stage}.{name}'] = (value, False)
+    for workers, value in report.get('throughput', {}).items():
+        metrics[f'throughput.{workers}'] = (value, True)
+    for name, value in report.get('model_load', {}).items():
+        metrics[f'model_load.{name}'] = (value, False)
+    for name, value in report.get('peak_rss_mb', {}).items():
+        metrics[f'peak_rss_mb.{name}'] = (value, False)
+    return metrics
+
+
+def compare_to_baseline(report, baseline, tolerance=0.2, min_delta_ms=5.0):
+    """
+    Liste des métriques dégradées de plus de `tolerance` (fraction) par rapport à la référence.
+    Les écarts de latence inférieurs à `min_delta_ms` sont ignorés (bruit de mesure).
+    """
+    current = flatten(report)
+    regressions = []
+    for name, (reference, higher_is_better) in flatten(baseline).items():
+        if name not in current or not reference:
+            continue
+        value = current[name][0]
+        if name.endswith('_ms') and abs(value - reference) < min_delta_ms:
+            continue
+        change = (value - reference) / reference
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append({
+                'metric': name,
+                'baseline': reference,
+                'current': value,
+                'change_%': round(change * 100, 1),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de performance du pipeline OCR.")
+    parser.add_argument('folder', type=Path, help="Dossier contenant les images")
+    parser.add_argument('--warmup', type=int, default=1, help="Nombre d'images de chauffe")
+    parser.add_argument('--repeat', type=int, default=1, help="Nombre de passages sur le corpus")
+    parser.add_argument('--workers', default='1,2,4', help="Nombres de processus à mesurer")
+    parser.add_argument('--output', type=Path, default=Path('ocr_benchmark_report.json'))
+    parser.add_argument('--baseline', type=Path, help="Rapport de référence à comparer")
+    parser.add_argument('--save-baseline', action='store_true', help="Écrit le rapport comme nouvelle référence")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Dégradation tolérée (0.2 = 20 %%)")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help="Écart de latence minimal pris en compte, en ms")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    if not args.folder.exists():
+        raise SystemExit(f"Le dossier {args.folder} n'existe pas.")
+    images = sorted(p for p in args.folder.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not images:
+        raise SystemExit(f"Aucune image dans {args.folder}.")
+
+    workers = [int(w) for w in args.workers.split(',') if w.strip()]
+    report = OCRBenchmark(images, warmup=args.warmup, repeat=args.repeat, workers=workers).run()
+
+    print(f"Chargement des modèles : {report['model_load']}")
+    for stage, values in report['stages'].items():
+        print(f"{stage:>10} : " + ", ".join(f"{k} {v}" for k, v in values.items()))
+    for count, value in report['throughput'].items():
+        print(f"{count} worker(s) : {value} images/s")
+    print(f"RSS max : {report['peak_rss_mb']}")
+
+    regressions = []
+    if args.baseline and args.baseline.exists() and not args.save_baseline:
+        with args.baseline.open(encoding='utf-8') as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance, args.min_delta_ms)
+        report['regressions'] = regressions
+        for r in regressions:
+            print(f"RÉGRESSION {r['metric']} : {r['baseline']} -> {r['current']} ({r['change_%']:+} %)")
+        if not regressions:
+            print("Aucune régression par rapport à la référence.")
+
+    with args.output.open('w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"Rapport généré : {args.output}")
+    if args.save_baseline and args.baseline:
+        with args.baseline.open('w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"Référence enregistrée : {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
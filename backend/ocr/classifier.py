@@ -0,0 +1,101 @@
+"""
+Classification rapide du type de document, avant l'OCR complet.
+
+Caractéristiques calculées sur une réduction de l'image (quelques millisecondes) :
+- rapport largeur / hauteur (format carte ID-1 85,6 x 54 mm ≈ 1,59, page passeport ID-3 ≈ 1,42) ;
+- histogramme des teintes saturées (carte Vitale verte, permis de conduire rose...),
+  part de pixels saturés et luminosité moyenne ;
+- nombre de lignes d'une zone de lecture automatique (MRZ) en bas du document :
+  3 lignes pour les cartes d'identité CEDEAO (TD1), 2 pour les passeports (TD3).
+
+Le type retenu choisit le pipeline (prétraitement lourd ou non, règles d'extraction).
+En cas de doute, le type par défaut (CNI sénégalaise) est conservé ; les mots-clés lus
+par l'OCR peuvent ensuite corriger une classification peu sûre (refine_document_type).
+"""
+from collections import namedtuple
+
+import cv2
+
+from .mrz import mrz_line_boxes
+
+DEFAULT_DOCUMENT_TYPE = 'cni_senegalaise'
+# Au-delà, les mots-clés lus par l'OCR ne remettent pas en cause le type détecté
+CONFIDENT = 0.8
+ANALYSIS_WIDTH = 600
+CARD_ASPECT = (1.45, 1.75)
+
+# Teintes OpenCV (0-179) : tranches pour l'histogramme des pixels saturés
+HUE_BANDS = {
+    'red': ((0, 10), (170, 180)),
+    'yellow': ((10, 35),),
+    'green': ((35, 85),),
+    'blue': ((85, 130),),
+    'pink': ((130, 170),),
+}
+
+KEYWORDS = {
+    'passeport': ('PASSEPORT', 'PASSPORT'),
+    'permis_conduire': ('PERMIS DE CONDUIRE', 'DRIVING LICEN'),
+    'carte_vitale': ('CARTE VITALE', 'ASSURANCE MALADIE'),
+    'carte_etudiant': ('CARTE ETUDIANT', "CARTE D'ETUDIANT", 'STUDENT', 'UNIVERSITE'),
+    'carte_bancaire': ('VISA', 'MASTERCARD', 'VALID THRU', 'DEBIT', 'CREDIT'),
+    'cni_senegalaise': ("CARTE NATIONALE D'IDENTITE", "CARTE D'IDENTITE", 'CEDEAO', 'ECOWAS'),
+}
+
+Features = namedtuple('Features', ['aspect', 'colorfulness', 'brightness', 'hues', 'mrz_lines'])
+Classification = namedtuple('Classification', ['doc_type', 'confidence', 'features'])
+
+
+def extract_features(img):
+    height, width = img.shape[:2]
+    aspect = max(width, height) / max(1, min(width, height))
+    if height > width:
+        img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+        height, width = width, height
+    small = cv2.resize(img, (ANALYSIS_WIDTH, max(1, round(ANALYSIS_WIDTH * height / width))),
+                       interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hue, saturation, value = hsv[:, :, 0], hsv[:, :, 1], hsv[:, :, 2]
+    saturated = (saturation > 60) & (value > 50)
+    total = int(saturated.sum())
+    hues = {}
+    for name, ranges in HUE_BANDS.items():
+        count = sum(int((saturated & (hue >= low) & (hue < high)).sum()) for low, high in ranges)
+        hues[name] = round(count / total, 3) if total else 0.0
+    return Features(
+        aspect=round(aspect, 3),
+        colorfulness=round(total / saturated.size, 3),
+        brightness=round(float(value.mean()) / 255, 3),
+        hues=hues,
+        mrz_lines=len(mrz_line_boxes(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))),
+    )
+
+
+def classify(img):
+    """Type de document d'une image BGR, avec un indice de confiance et les caractéristiques"""
+    features = extract_features(img)
+    card = CARD_ASPECT[0] <= features.aspect <= CARD_ASPECT[1]
+    if features.mrz_lines >= 3:
+        return Classification('cni_senegalaise', 0.9, features)
+    if features.mrz_lines == 2:
+        return Classification('passeport' if features.aspect < CARD_ASPECT[0] else 'cni_senegalaise', 0.85, features)
+    if card and features.colorfulness > 0.2:
+        if features.hues['green'] > 0.4:
+            return Classification('carte_vitale', 0.6, features)
+        if features.hues['pink'] > 0.4:
+            return Classification('permis_conduire', 0.6, features)
+        if features.colorfulness > 0.5 and features.brightness < 0.5:
+            # Fond sombre et très coloré : typique des cartes bancaires
+            return Classification('carte_bancaire', 0.55, features)
+    return Classification(DEFAULT_DOCUMENT_TYPE, 0.3, features)
+
+
+def refine_document_type(classification, text):
+    """Corrige une classification peu sûre d'après les mots-clés lus par l'OCR"""
+    if classification.confidence >= CONFIDENT:
+        return classification.doc_type
+    upper = text.upper().replace('É', 'E').replace('È', 'E')
+    for doc_type, keywords in KEYWORDS.items():
+        if any(keyword in upper for keyword in keywords):
+            return doc_type
+    return classification.doc_type
@@ -4,6 +4,8 @@ import re
 from datetime import datetime
 from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
 import torch
+import time
+from api import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,7 @@ class DLFieldExtractor:
         self.model_path = model_path or "Jean-Baptiste/camembert-ner"  # Modèle NER français
         self.device = 0 if torch.cuda.is_available() else -1
         self.pipeline = None
+        started = time.perf_counter()
 
         try:
             if os.path.exists(self.model_path):
@@ -45,6 +48,8 @@ class DLFieldExtractor:
         except Exception as e:
             logger.warning(f"Impossible de charger le modèle DL: {e}. Repli sur extraction par règles.")
             self.pipeline = None
+        metrics.OCR_MODEL_LOADS.inc(model='dl_extractor')
+        metrics.OCR_MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='dl_extractor')
 
     def extract_fields(self, ocr_texts, doc_type):
         """
@@ -25,7 +25,7 @@ def evaluate_folder(folder: Path, output: Path | None = None):
             'nom': payload.get('nom', ''),
             'prenom': payload.get('prenom', ''),
             'date_naissance': payload.get('date_naissance', ''),
-            'num_document': payload.get('num_document', ''),
+            'num_document': payload.get('numero_document', ''),
             'sexe': payload.get('sexe', ''),
             'nationalite': payload.get('nationalite', ''),
             'date_expiration': payload.get('date_expiration', ''),
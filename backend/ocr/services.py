@@ -4,63 +4,207 @@ import numpy as np
 import json
 import argparse
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from difflib import SequenceMatcher
+from functools import lru_cache
 from paddleocr import PaddleOCR
 from sklearn.ensemble import RandomForestClassifier
 import joblib  # pour sauvegarder le modèle de classification
 import logging
 from .dl_extractor import DLFieldExtractor
+from .classifier import classify, refine_document_type
+from .mrz import join_rows, locate_mrz, parse_mrz
+from .variants import VARIANTS, vote
+from api import metrics
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ---------------- CONFIGURATION ----------------
+# Réglages OCR_* utilisés hors Django (python -m ocr.benchmark, test_ocr_*.py) : mêmes
+# valeurs par défaut que findmyid/settings.py
+OCR_SETTING_DEFAULTS = {
+    "OCR_FIELD_CONFIDENCE": 0.85,
+    "OCR_ROBUST_MODE": False,
+    "OCR_ROBUST_DEADLINE": 8.0,
+    "OCR_ROBUST_WORKERS": 3,
+    "OCR_ROBUST_VARIANTS": ["deskewed", "brightened", "sharpened", "contrast"],
+}
+
+
+def ocr_setting(name):
+    """Réglage Django `name`, ou sa valeur par défaut si Django n'est pas configuré"""
+    try:
+        return getattr(settings, name, OCR_SETTING_DEFAULTS[name])
+    except ImproperlyConfigured:
+        return OCR_SETTING_DEFAULTS[name]
+
 DOCUMENT_FIELDS = {
-    "cni_senegalaise": ["nom", "prenom", "date_naissance", "numero_document", "sexe", "nationalite", "lieu_naissance", "date_expiration", "photo_detectee"]
+    "cni_senegalaise": ["nom", "prenom", "date_naissance", "numero_document", "sexe", "nationalite", "lieu_naissance", "date_expiration", "photo_detectee"],
+    "passeport": ["nom", "prenom", "date_naissance", "numero_document", "sexe", "nationalite", "lieu_naissance", "date_expiration"],
+    "permis_conduire": ["nom", "prenom", "date_naissance", "numero_document", "lieu_naissance", "date_expiration"],
+    "carte_etudiant": ["nom", "prenom", "date_naissance", "numero_document", "date_expiration"],
+    "carte_vitale": ["nom", "prenom"],
+    "carte_bancaire": ["nom", "prenom"],
+    "autre": ["nom", "prenom", "date_naissance", "numero_document"],
+}
+# Documents pouvant porter une MRZ (passeports, cartes d'identité CEDEAO)
+MRZ_DOCUMENTS = {"cni_senegalaise", "passeport"}
+# Documents sans identité exploitable : prétraitement léger, ni extracteur DL ni règles CNI
+NON_IDENTITY_DOCUMENTS = {"carte_vitale", "carte_bancaire"}
+# Taille maximale (côté le plus long) de l'image transmise à l'OCR par le pipeline léger
+LIGHT_PREPROCESS_MAX_SIDE = 1600
+# Mots imprimés sur les cartes non identitaires, à ne pas prendre pour le nom du titulaire
+HOLDER_STOPWORDS = {
+    "CARTE", "VITALE", "ASSURANCE", "MALADIE", "VISA", "MASTERCARD", "VALID", "THRU", "DEBIT", "CREDIT",
+    "BANQUE", "BANK", "CLASSIC", "GOLD", "PLATINUM", "ELECTRON", "EXPIRE", "FIN", "DE", "LA", "DU",
+}
+# Motif attendu de chaque champ une fois normalisé par les règles d'extraction
+NAME_PATTERN = r"[A-Za-zÀ-ÿ' -]{2,}"
+DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+FIELD_PATTERNS = {
+    "nom": NAME_PATTERN,
+    "prenom": NAME_PATTERN,
+    "lieu_naissance": NAME_PATTERN,
+    "nationalite": NAME_PATTERN,
+    "date_naissance": DATE_PATTERN,
+    "date_expiration": DATE_PATTERN,
+    "numero_document": r"[A-Z0-9]{6,14}",
+    "sexe": r"[MF]",
 }
+# Champs garantis par les chiffres de contrôle d'une MRZ validée
+MRZ_CHECKED_FIELDS = {"numero_document", "date_naissance", "date_expiration"}
+# Marge autour d'une ligne re-reconnue, en fraction de sa hauteur
+LINE_CROP_MARGIN = 0.3
 
+_load_started = time.perf_counter()
 OCR = PaddleOCR(lang='fr', use_angle_cls=True)  # PaddleOCR initialisé avec modèles par défaut pour français (PP-OCRv4 en 3.x, optimisé pour texte imprimé comme IDs)
+metrics.OCR_MODEL_LOADS.inc(model='paddleocr')
+metrics.OCR_MODEL_LOAD_SECONDS.set(time.perf_counter() - _load_started, model='paddleocr')
+
+# Mode robuste : threads de reconnaissance des variantes, chacun avec son propre PaddleOCR
+_variant_pool = None
+_variant_pool_lock = threading.Lock()
+_variant_engines = threading.local()
+_variant_workers = 0
+# Threads libres : moteur chargé et aucune variante en cours
+_variant_free = 0
+_variant_free_changed = threading.Condition()
 
 class OCRService:
+    # Clé de type de document -> nom du DocumentType (voir init_db.py)
+    DOCUMENT_LABELS = {
+        "cni_senegalaise": "Carte d'identité",
+        "passeport": "Passeport",
+        "permis_conduire": "Permis de conduire",
+        "carte_etudiant": "Carte d'étudiant",
+        "carte_vitale": "Carte vitale",
+        "carte_bancaire": "Carte bancaire",
+        "autre": "Autre",
+    }
+
     @staticmethod
-    def process_image(image_path, expected=None, doc_type=None):
+    def process_image(image_path, expected=None, doc_type=None, robust=None):
         """
         Traite une image de document et extrait les champs via OCR.
         Retourne un dictionnaire avec les résultats.
+        Mode robuste (`robust`, OCR_ROBUST_MODE par défaut) : la passe lourde est remplacée
+        par plusieurs variantes de prétraitement reconnues en parallèle et départagées
+        par un vote par champ, dans la limite de OCR_ROBUST_DEADLINE secondes.
         """
+        started = time.monotonic()
+        robust = ocr_setting("OCR_ROBUST_MODE") if robust is None else robust
         logger.info(f"Processing image: {image_path}")
         if not os.path.exists(image_path):
             logger.error("Image not found")
             return {"error": "Image non trouvée", "success": False}
-
-        img = preprocess_image(image_path)
-        logger.info("Image preprocessed")
-
-        # Classification automatique ou forcée
-        doc_type = doc_type or classify_document(img)
+        raw = cv2.imread(image_path)
+        if raw is None:
+            logger.error("Image illisible")
+            return {"error": "Image illisible", "success": False}
+
+        # Classification automatique ou forcée, sur l'image brute : avant l'OCR complet
+        classification = None
+        with metrics.OCR_STAGE_DURATION.time(stage='classify'):
+            if doc_type is None:
+                classification = classify(raw)
+                doc_type = classification.doc_type
         logger.info(f"Document type: {doc_type}")
-        if doc_type is None:
+        if doc_type not in DOCUMENT_FIELDS:
             logger.error("Type de document inconnu")
             return {"error": "Type de document inconnu", "success": False}
 
-        # OCR et extraction
-        ocr_results = ocr_extract(img)
-        logger.info(f"OCR results: {len(ocr_results)} lines extracted")
-        for box, text in ocr_results[:5]:  # Log first 5
-            logger.info(f"OCR line: {text}")
-        extracted = extract_fields_by_type(ocr_results, doc_type)
-        logger.info(f"Extracted fields: {extracted}")
+        # MRZ : seule la bande MRZ est lue ; si ses chiffres de contrôle sont valides,
+        # l'OCR pleine page et les règles d'extraction sont évités
+        mrz = None
+        if doc_type in MRZ_DOCUMENTS and (classification is None or classification.features.mrz_lines >= 2):
+            with metrics.OCR_STAGE_DURATION.time(stage='mrz'):
+                mrz, lines = read_mrz(raw)
+        if mrz:
+            if classification is not None:
+                doc_type = mrz["type"]
+            extracted = mrz_fields(mrz, doc_type)
+            passes = ["mrz"]
+            logger.info(f"MRZ {mrz['format']} validated, full OCR skipped")
+        else:
+            # Passe rapide : image réduite sans filtrage ; la passe lourde n'intervient
+            # que pour les champs dont la confiance reste sous OCR_FIELD_CONFIDENCE
+            with metrics.OCR_STAGE_DURATION.time(stage='preprocess'):
+                img = preprocess_light(raw)
+            logger.info("Image preprocessed")
+
+            # OCR et extraction
+            with metrics.OCR_STAGE_DURATION.time(stage='ocr'):
+                lines = ocr_extract_scored(img)
+            logger.info(f"OCR results: {len(lines)} lines extracted")
+            for box, text, score in lines[:5]:  # Log first 5
+                logger.info(f"OCR line: {text} ({score:.2f})")
+            if classification is not None:
+                doc_type = refine_document_type(classification, " ".join(text for _, text, _ in lines))
+            extract_started = time.monotonic()
+            with metrics.OCR_STAGE_DURATION.time(stage='extract'):
+                extracted, mrz = extract_fields(lines, doc_type)
+            extract_seconds = time.monotonic() - extract_started
+            passes = ["fast"]
+        confidences = field_confidences(extracted, lines, MRZ_CHECKED_FIELDS if mrz else ())
+        if passes == ["fast"] and doc_type not in NON_IDENTITY_DOCUMENTS \
+                and min(confidences.values(), default=1.0) < ocr_setting("OCR_FIELD_CONFIDENCE"):
+            variants = None
+            if robust:
+                with metrics.OCR_STAGE_DURATION.time(stage='robust'):
+                    variants = recognize_variants(img, extracted, confidences, doc_type,
+                                                  started + ocr_setting("OCR_ROBUST_DEADLINE"), extract_seconds)
+            if variants is not None:
+                passes.append("robust")
+            else:
+                # Mode classique, ou aucun thread de variantes libre
+                with metrics.OCR_STAGE_DURATION.time(stage='refine'):
+                    passes.append(refine_fields(raw, img, lines, extracted, confidences, doc_type))
+        metrics.OCR_PASSES.inc(exit=passes[-1])
+        logger.info(f"Extracted fields: {extracted} (passes: {passes})")
 
-        # Calculate confidence (simple average of non-empty fields)
-        confidence = sum(1 for v in extracted.values() if v) / len(extracted) if extracted else 0.0
+        # Moyenne des confiances par champ (score de reconnaissance x validité du motif)
+        confidence = round(sum(confidences.values()) / len(confidences), 3) if confidences else 0.0
 
         structured_payload = extracted
         result = {
             "doc_type": doc_type,
             "structured_payload": structured_payload,
             "confidence": confidence,
+            "field_confidence": confidences,
+            "passes": passes,
             "success": True
         }
+        if mrz:
+            result["mrz"] = mrz["format"]
+        if "robust" in passes:
+            result["variants"] = variants
+        if classification is not None:
+            result["classification"] = {"confidence": classification.confidence, **classification.features._asdict()}
 
         if expected:
             status, similarity = compare_fields(extracted, expected, doc_type)
@@ -75,14 +219,23 @@ class OCRService:
         return result
 
 def preprocess_image(image_path):
-    """Prétraitement OpenCV pour tout type de document - gardé en couleur pour améliorer la détection OCR"""
-    img = cv2.imread(image_path)
+    """Prétraitement complet d'un fichier image (voir preprocess)"""
+    return preprocess(cv2.imread(image_path))
+
+def enhance(img):
+    """Débruitage et contraste local, sans changer la géométrie - gardé en couleur pour la détection OCR"""
+    img = img.copy()
     # Garder l'image en couleur pour PaddleOCR (meilleure détection de texte)
     img = cv2.bilateralFilter(img, 9, 75, 75)
     # Appliquer CLAHE sur chaque canal de couleur
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
     for i in range(3):
         img[:, :, i] = clahe.apply(img[:, :, i])
+    return img
+
+def preprocess(img):
+    """Prétraitement OpenCV pour tout type de document - gardé en couleur pour améliorer la détection OCR"""
+    img = enhance(img)
     # Correction de rotation basée sur les contours
     gray_for_rotation = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     coords = np.column_stack(np.where(gray_for_rotation > 0))
@@ -97,18 +250,250 @@ def preprocess_image(image_path):
         img = cv2.warpAffine(img, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
     return img
 
+def preprocess_light(img):
+    """Passe rapide, la première pour tous les types de document : simple réduction, sans filtrage ni redressement"""
+    height, width = img.shape[:2]
+    scale = LIGHT_PREPROCESS_MAX_SIDE / max(height, width)
+    if scale < 1:
+        img = cv2.resize(img, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    return img
+
 def classify_document(img):
     """
-    Classification automatique du type de document, focalisée sur CNI sénégalaise.
+    Classification automatique du type de document à partir de caractéristiques
+    d'image peu coûteuses (voir ocr/classifier.py) ; CNI sénégalaise en cas de doute.
+    """
+    return classify(img).doc_type
+
+def read_mrz(img):
+    """
+    (champs, lignes OCR) de la MRZ du document ; champs à None si elle n'est pas localisée
+    ou que ses chiffres de contrôle sont invalides. L'OCR ne porte que sur la bande MRZ
+    (voir ocr/mrz.py).
     """
-    # Pour l'instant, forcer cni_senegalaise car focus Sénégal
-    # À l'avenir, détecter via texte OCR
-    return "cni_senegalaise"
+    band = locate_mrz(img)
+    if band is None:
+        metrics.OCR_MRZ_READS.inc(outcome='absent')
+        return None, []
+    lines = ocr_extract_scored(band)
+    mrz = parse_mrz(join_rows([(bbox, text) for bbox, text, _ in lines]))
+    metrics.OCR_MRZ_READS.inc(outcome='valid' if mrz else 'invalid')
+    return mrz, lines
+
+def mrz_fields(mrz, doc_type):
+    """Champs attendus pour le type de document, complétés à vide hors MRZ (lieu de naissance...)"""
+    empty = post_process_ocr("")
+    return {field: mrz.get(field, empty.get(field, "")) for field in DOCUMENT_FIELDS[doc_type]}
 
 def ocr_extract(img):
     """Renvoie une liste de tuples : (bbox, texte)"""
+    return [(bbox, text) for bbox, text, _ in ocr_extract_scored(img)]
+
+def source_lines(value, lines):
+    """Indices des lignes OCR contenant tous les mots / nombres de la valeur d'un champ"""
+    tokens = re.findall(r"[A-Z0-9]+", normalize_text(str(value)))
+    if not tokens:
+        return []
+    return [i for i, (_, text, _) in enumerate(lines) if all(token in normalize_text(text) for token in tokens)]
+
+def field_confidences(fields, lines, checked=()):
+    """
+    Confiance de chaque champ texte (0 à 1) : 0 si vide ou hors motif (FIELD_PATTERNS),
+    1 s'il est garanti par une MRZ validée (`checked`), sinon meilleur score de
+    reconnaissance des lignes qui le portent ; une valeur déduite (nationalité lue
+    « SENEGAL »...) prend le score moyen de la page.
+    """
+    confidences = {}
+    for field, value in fields.items():
+        if not isinstance(value, str):
+            continue  # photo_detectee
+        pattern = FIELD_PATTERNS.get(field)
+        if not value or (pattern and not re.fullmatch(pattern, value)):
+            confidences[field] = 0.0
+        elif field in checked:
+            confidences[field] = 1.0
+        else:
+            scores = [lines[i][2] for i in source_lines(value, lines)]
+            if not scores:
+                scores = [sum(score for *_, score in lines) / len(lines)] if lines else [0.0]
+            confidences[field] = round(max(scores), 3)
+    return confidences
+
+def extract_fields(lines, doc_type):
+    """Extraction par type sur des lignes OCR notées ; une MRZ validée lue avec la page prime. Retourne (champs, MRZ)"""
+    ocr_results = [(bbox, text) for bbox, text, _ in lines]
+    extracted = extract_fields_by_type(ocr_results, doc_type)
+    mrz = parse_mrz(join_rows(ocr_results)) if doc_type in MRZ_DOCUMENTS else None
+    if mrz:
+        extracted.update({field: value for field, value in mrz_fields(mrz, doc_type).items() if value})
+    return extracted, mrz
+
+def crop_line(img, bbox, scale):
+    """Ligne `bbox` (repère de l'image réduite) découpée avec une marge dans l'image d'origine"""
+    x1, y1, x2, y2 = (round(v * scale) for v in bbox)
+    margin = max(4, round((y2 - y1) * LINE_CROP_MARGIN))
+    height, width = img.shape[:2]
+    return img[max(0, y1 - margin):min(height, y2 + margin), max(0, x1 - margin):min(width, x2 + margin)]
+
+def refine_fields(raw, light, lines, extracted, confidences, doc_type):
+    """
+    Passe lourde pour les champs sous OCR_FIELD_CONFIDENCE. Si chacun est rattaché à des
+    lignes de la passe rapide, seules ces lignes sont re-reconnues, découpées dans l'image
+    d'origine et prétraitées ("lines") ; sinon la page entière repasse par le
+    prétraitement complet ("page"). Chaque champ garde la valeur la plus sûre ;
+    `extracted` et `confidences` sont mis à jour. Retourne le nom de la passe.
+    """
+    low = [field for field, value in confidences.items() if value < ocr_setting("OCR_FIELD_CONFIDENCE")]
+    located = {field: source_lines(extracted[field], lines) for field in low}
+    if all(located.values()):
+        step = "lines"
+        scale = raw.shape[1] / light.shape[1]
+        retried = list(lines)
+        for i in sorted({i for indexes in located.values() for i in indexes}):
+            bbox, _, score = lines[i]
+            pieces = sorted(ocr_extract_scored(enhance(crop_line(raw, bbox, scale))), key=lambda piece: piece[0][0])
+            if pieces and min(piece[2] for piece in pieces) > score:
+                retried[i] = (bbox, " ".join(piece[1] for piece in pieces), min(piece[2] for piece in pieces))
+    else:
+        step = "page"
+        retried = ocr_extract_scored(preprocess(raw))
+    candidate, mrz = extract_fields(retried, doc_type)
+    candidate_confidences = field_confidences(candidate, retried, MRZ_CHECKED_FIELDS if mrz else ())
+    for field in low:
+        if candidate_confidences.get(field, 0.0) > confidences[field]:
+            extracted[field] = candidate[field]
+            confidences[field] = candidate_confidences[field]
+    logger.info(f"Refined fields {low} ({step}): {confidences}")
+    return step
+
+def variant_engine():
+    """PaddleOCR du thread de reconnaissance courant : les prédicteurs Paddle ne sont pas partagés entre threads"""
+    engine = getattr(_variant_engines, "ocr", None)
+    if engine is None:
+        load_started = time.perf_counter()
+        engine = _variant_engines.ocr = PaddleOCR(lang='fr', use_angle_cls=True)
+        metrics.OCR_MODEL_LOADS.inc(model='paddleocr')
+        metrics.OCR_MODEL_LOAD_SECONDS.set(time.perf_counter() - load_started, model='paddleocr')
+    return engine
+
+def variant_pool():
+    """
+    Pool de OCR_ROBUST_WORKERS threads, créé au premier usage et conservé. Chaque thread
+    charge son moteur dès la création du pool, avant de recevoir une variante : le
+    chargement ne pèse pas sur le délai d'une requête.
+    """
+    global _variant_pool, _variant_workers
+    with _variant_pool_lock:
+        if _variant_pool is None:
+            _variant_workers = ocr_setting("OCR_ROBUST_WORKERS")
+            _variant_pool = ThreadPoolExecutor(max_workers=_variant_workers, thread_name_prefix='ocr-variant',
+                                               initializer=_load_variant_engine)
+            # Une tâche bloquante par thread : un thread ne peut en prendre deux, le pool démarre
+            # donc tous ses threads (qui chargent leur moteur) tout de suite
+            started = threading.Barrier(_variant_workers)
+            for _ in range(_variant_workers):
+                _variant_pool.submit(_start_variant_worker, started)
+    return _variant_pool
+
+def warm_variant_pool(timeout=None):
+    """Crée le pool et attend que tous ses threads soient prêts ; retourne False après `timeout` secondes"""
+    variant_pool()
+    with _variant_free_changed:
+        return _variant_free_changed.wait_for(lambda: _variant_free >= _variant_workers, timeout)
+
+def _load_variant_engine():
+    try:
+        variant_engine()
+    except Exception as e:
+        logger.error(f"Variant engine failed to load: {e}")
+
+def _start_variant_worker(started):
+    """
+    Première tâche de chaque thread : attend les autres threads, puis déclare celui-ci libre.
+    Un thread sans moteur n'est jamais compté comme libre (le mode robuste se rabat alors
+    sur la passe classique).
+    """
+    started.wait(300)
+    if getattr(_variant_engines, "ocr", None) is not None:
+        _release_variant_worker()
+
+def _acquire_variant_worker():
+    global _variant_free
+    with _variant_free_changed:
+        if _variant_free == 0:
+            return False
+        _variant_free -= 1
+        return True
+
+def _release_variant_worker():
+    global _variant_free
+    with _variant_free_changed:
+        _variant_free += 1
+        _variant_free_changed.notify_all()
+
+def recognize_variant(name, img):
+    return ocr_extract_scored(VARIANTS[name](img), engine=variant_engine())
+
+def _run_variant(name, img):
+    try:
+        return recognize_variant(name, img)
+    finally:
+        _release_variant_worker()
+
+def recognize_variants(light, extracted, confidences, doc_type, deadline, extract_seconds=0.0):
+    """
+    Mode robuste : les variantes OCR_ROBUST_VARIANTS de l'image réduite sont reconnues en
+    parallèle, puis extraites ; la passe rapide et chaque variante votent par champ
+    (voir ocr/variants.py). La reconnaissance est attendue jusqu'à `deadline`
+    (time.monotonic()) moins le temps d'extraire chaque variante, estimé par celui de la
+    passe rapide (`extract_seconds`) ; les variantes non terminées sont abandonnées.
+    Une variante n'est soumise que si un thread est libre : une variante en retard garde
+    son thread jusqu'à la fin, les suivantes ne s'accumulent pas derrière elle.
+    `extracted` et `confidences` reçoivent le résultat du vote. Retourne les variantes
+    prises en compte, ou None si aucune n'a pu être soumise.
+    """
+    names = [name for name in ocr_setting("OCR_ROBUST_VARIANTS") if name in VARIANTS]
+    pool = variant_pool()
+    futures = []
+    for name in names:
+        if not _acquire_variant_worker():
+            metrics.OCR_VARIANTS.inc(outcome='skipped')
+            continue
+        futures.append((name, pool.submit(_run_variant, name, light)))
+    if not futures:
+        logger.warning("No free variant worker, falling back to the classic refine pass")
+        return None
+    wait_until = deadline - extract_seconds * len(names)
+    _, pending = wait([future for _, future in futures], timeout=max(0.0, wait_until - time.monotonic()))
+    candidates, used = [(dict(extracted), dict(confidences))], []
+    for name, future in futures:
+        if future in pending:
+            metrics.OCR_VARIANTS.inc(outcome='late')
+            continue
+        try:
+            lines = future.result()
+        except Exception as e:
+            logger.warning(f"Variant {name} failed: {e}")
+            metrics.OCR_VARIANTS.inc(outcome='error')
+            continue
+        candidate, mrz = extract_fields(lines, doc_type)
+        candidates.append((candidate, field_confidences(candidate, lines, MRZ_CHECKED_FIELDS if mrz else ())))
+        used.append(name)
+        metrics.OCR_VARIANTS.inc(outcome='used')
+    voted, voted_confidences = vote(candidates)
+    extracted.update(voted)
+    confidences.update(voted_confidences)
+    logger.info(f"Robust vote over {['fast', *used]}: {confidences}")
+    return used
+
+# Mode robuste actif par défaut : moteurs des variantes chargés dès l'import, pas à la première requête
+if ocr_setting("OCR_ROBUST_MODE"):
+    variant_pool()
+
+def ocr_extract_scored(img, engine=None):
+    """Renvoie une liste de tuples : (bbox, texte, score de reconnaissance)"""
     logger.info("Running PaddleOCR...")
-    result = OCR.ocr(img)
+    result = (engine or OCR).ocr(img)
     logger.info(f"PaddleOCR raw result type: {type(result)}")
     logger.info(f"PaddleOCR raw result length: {len(result) if result else 0}")
     if result and len(result) > 0:
@@ -128,7 +513,8 @@ def ocr_extract(img):
                 bbox = rec_boxes[i]
                 if len(bbox) >= 4:
                     x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
-                    ocr_results.append(((x1, y1, x2, y2), text))
+                    score = float(rec_scores[i]) if i < len(rec_scores) else 0.0
+                    ocr_results.append(((x1, y1, x2, y2), text, score))
                     logger.info(f"Extracted text: '{text}' (bbox: {x1},{y1},{x2},{y2})")
                 else:
                     logger.warning(f"Invalid bbox format for text '{text}': {bbox}")
@@ -286,13 +672,33 @@ def post_process_ocr(raw_text: str) -> dict:
         "photo_detectee": photo_detectee
     }
 
+def extract_holder_fields(raw_text: str) -> dict:
+    """
+    Titulaire d'une carte non identitaire (Vitale, bancaire) : premiers mots en
+    majuscules hors mentions imprimées, prénom puis nom. Aucun numéro n'est extrait.
+    """
+    words = [word for word in re.findall(r"\b[A-Z][A-Z'-]+\b", normalize_text(raw_text))
+             if word not in HOLDER_STOPWORDS]
+    if len(words) >= 2:
+        return {"prenom": capitalize_name(words[0]), "nom": capitalize_name(words[1])}
+    return {"prenom": "", "nom": capitalize_name(words[0]) if words else ""}
+
+@lru_cache(maxsize=1)
+def dl_extractor():
+    """Extracteur DL chargé une seule fois par processus (le modèle est coûteux à charger)"""
+    return DLFieldExtractor()
+
 def extract_fields_by_type(ocr_results, doc_type):
-    """Extraction via post-traitement pour CNI sénégalaise."""
+    """Extraction selon le type : titulaire seul pour les cartes non identitaires, règles et DL sinon."""
     all_text = " ".join([text for _, text in ocr_results])
     logger.info(f"All extracted text: {all_text}")
+    fields = DOCUMENT_FIELDS.get(doc_type, DOCUMENT_FIELDS["autre"])
+    if doc_type in NON_IDENTITY_DOCUMENTS:
+        holder = extract_holder_fields(all_text)
+        return {field: holder.get(field, "") for field in fields}
 
     # Essayer l'extraction DL si disponible
-    extractor = DLFieldExtractor()
+    extractor = dl_extractor()
     if extractor.is_available():
         dl_fields = extractor.extract_fields(ocr_results, doc_type)
         # Merger DL si possible, mais prioriser post_process
@@ -302,6 +708,8 @@ def extract_fields_by_type(ocr_results, doc_type):
 
     # Post-traitement principal
     structured_fields = post_process_ocr(all_text)
+    if doc_type != "cni_senegalaise":
+        structured_fields = {field: structured_fields.get(field, "") for field in fields}
 
     logger.info(f"Final extracted fields: {structured_fields}")
     return structured_fields
@@ -0,0 +1,99 @@
+"""
+Variantes de prétraitement du mode robuste (photos sombres, floues, bruitées ou
+penchées : les dégradations générées par test_ocr_accuracy.py) et vote par champ.
+
+Chaque variante est une fonction image BGR -> image BGR, appliquée à l'image déjà
+réduite par la passe rapide. OCRService les reconnaît en parallèle (voir
+recognize_variants dans ocr/services.py) ; pour chaque champ, la valeur retenue est
+celle dont la somme des confiances sur l'ensemble des passes est la plus forte.
+"""
+import math
+
+import cv2
+import numpy as np
+
+# Luminosité moyenne visée par l'éclaircissement (0 à 1)
+TARGET_BRIGHTNESS = 0.5
+
+
+def contrast(img):
+    """Contraste local (CLAHE) sur la luminance seule : les couleurs ne sont pas faussées"""
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    lab[:, :, 0] = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8)).apply(lab[:, :, 0])
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+
+def brightened(img):
+    """Correction gamma ramenant une photo sombre vers TARGET_BRIGHTNESS, puis contraste local"""
+    mean = float(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY).mean()) / 255
+    if 0 < mean < TARGET_BRIGHTNESS:
+        gamma = min(1.0, max(0.3, math.log(TARGET_BRIGHTNESS) / math.log(mean)))
+        table = (np.linspace(0, 1, 256) ** gamma * 255).astype('uint8')
+        img = cv2.LUT(img, table)
+    return contrast(img)
+
+
+def sharpened(img):
+    """Masque flou (unsharp mask) contre le flou de bougé ou de mise au point"""
+    blurred = cv2.GaussianBlur(img, (0, 0), 3)
+    return cv2.addWeighted(img, 1.8, blurred, -0.8, 0)
+
+
+def denoised(img):
+    """Lissage qui préserve les bords des caractères (bruit de capteur, compression)"""
+    return cv2.bilateralFilter(img, 9, 75, 75)
+
+
+def deskewed(img):
+    """Redressement selon l'angle du rectangle minimal englobant les pixels de texte"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(mask)
+    if coords is None:
+        return img
+    angle = cv2.minAreaRect(coords)[-1]
+    # OpenCV >= 4.5 : angle dans [0, 90[ ; ramené à [-45, 45]
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5:
+        return img
+    height, width = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+VARIANTS = {
+    'contrast': contrast,
+    'brightened': brightened,
+    'sharpened': sharpened,
+    'denoised': denoised,
+    'deskewed': deskewed,
+}
+
+
+def vote(candidates):
+    """
+    Vote par champ. `candidates` : [(champs, confiances)] d'une passe chacun.
+    Retourne (champs, confiances) : pour chaque champ, la valeur (comparée sans casse
+    ni espaces) dont la somme des confiances est la plus forte, avec la meilleure
+    confiance obtenue pour cette valeur ; les champs non notés (photo_detectee)
+    gardent la valeur de la première passe qui les fournit.
+    """
+    fields, confidences = {}, {}
+    for extracted, _ in candidates:
+        for field, value in extracted.items():
+            fields.setdefault(field, value)
+    for field in list(fields):
+        ballots = {}
+        for extracted, scores in candidates:
+            if field not in scores:
+                continue
+            value = extracted.get(field, '')
+            key = ' '.join(str(value).upper().split())
+            total, best, original = ballots.get(key, (0.0, 0.0, value))
+            ballots[key] = (total + scores[field], max(best, scores[field]), original)
+        if ballots:
+            _, best, value = max(ballots.values(), key=lambda ballot: (ballot[0], ballot[1]))
+            fields[field] = value
+            confidences[field] = best
+    return fields, confidences
@@ -77,33 +77,16 @@ const Admin: React.FC = () => {
       setLoading(true);
       console.log('Fetching stats data...');
 
-      // Fetch data from existing endpoints using apiService
-      console.log('Fetching users...');
-      const usersResponse = await apiService.getUsers();
-      console.log('Users response:', usersResponse);
-
-      console.log('Fetching lost items...');
-      const lostResponse = await apiService.getLostItems();
-      console.log('Lost items response:', lostResponse);
-
-      console.log('Fetching found items...');
-      const foundResponse = await apiService.getFoundItems();
-      console.log('Found items response:', foundResponse);
-
-      console.log('Fetching matches...');
-      const matchesResponse = await apiService.getMatches();
-      console.log('Matches response:', matchesResponse);
-
-      console.log('Fetching current user...');
-      const currentUserResponse = await apiService.getCurrentUser();
-      console.log('Current user response:', currentUserResponse);
+      // Agrégats calculés côté serveur (une requête par table, mis en cache)
+      const statsResponse = await apiService.getPlatformStats();
+      const data = statsResponse.data;
 
       setStats({
-        total_users: usersResponse.data.count || usersResponse.data.results?.length || 0,
-        active_users: usersResponse.data.results?.filter((u: any) => u.is_active).length || 0,
-        total_lost_items: lostResponse.data.count || lostResponse.data.results?.length || 0,
-        total_found_items: foundResponse.data.count || foundResponse.data.results?.length || 0,
-        total_matches: matchesResponse.data.count || matchesResponse.data.results?.length || 0,
+        total_users: data.total_users,
+        active_users: data.active_users,
+        total_lost_items: data.total_lost_items,
+        total_found_items: data.total_found_items,
+        total_matches: data.total_matches,
         pending_reports: 0, // Would come from a reports endpoint
       });
 
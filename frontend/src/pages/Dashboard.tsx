@@ -30,6 +30,11 @@ const Dashboard: React.FC = () => {
 
   useEffect(() => {
     fetchDashboardStats();
+
+    const source = apiService.subscribeToNotifications(() => {
+      setStats(prev => ({ ...prev, notifications: prev.notifications + 1 }));
+    });
+    return () => source?.close();
   }, []);
 
   const fetchDashboardStats = async () => {
@@ -14,6 +14,16 @@ const Notifications: React.FC = () => {
 
   useEffect(() => {
     fetchNotifications();
+
+    // Les nouvelles notifications arrivent par le flux SSE, sans polling
+    const source = apiService.subscribeToNotifications((incoming) => {
+      setNotifications(prev =>
+        prev.some(notif => notif.id === incoming.id)
+          ? prev
+          : [{ ...incoming, match: null }, ...prev]
+      );
+    });
+    return () => source?.close();
   }, []);
 
   const fetchNotifications = async () => {
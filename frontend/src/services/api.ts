@@ -1,6 +1,8 @@
 import axios, { AxiosInstance, AxiosResponse } from 'axios';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
+// Délai avant de rouvrir le flux de notifications (NOTIFICATION_STREAM_RETRY_MS côté serveur)
+const NOTIFICATION_STREAM_RETRY_MS = 3000;
 
 
 
@@ -153,6 +155,59 @@ class ApiService {
     return this.api.post('/notifications/mark_all_as_read/');
   }
 
+  // Flux temps réel des nouvelles notifications (Server-Sent Events). Chaque connexion
+  // utilise un ticket à usage unique obtenu avec le jeton JWT (rafraîchi si besoin par
+  // l'intercepteur) : le jeton n'apparaît jamais dans l'URL. À la fin du flux ou sur
+  // erreur, la connexion est rouverte avec un nouveau ticket et les notifications
+  // manquées sont rejouées depuis last_event_id.
+  subscribeToNotifications(onNotification: (notification: any) => void): { close: () => void } | null {
+    if (!localStorage.getItem('access_token') || typeof EventSource === 'undefined') {
+      return null;
+    }
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let lastEventId = '';
+    let closed = false;
+
+    const reconnect = () => {
+      source?.close();
+      if (!closed) {
+        retry = setTimeout(connect, NOTIFICATION_STREAM_RETRY_MS);
+      }
+    };
+    const connect = async () => {
+      try {
+        const response = await this.api.post('/notifications/stream_ticket/');
+        if (closed) {
+          return;
+        }
+        const params = new URLSearchParams({ ticket: response.data.ticket });
+        if (lastEventId) {
+          params.append('last_event_id', lastEventId);
+        }
+        source = new EventSource(`${API_BASE_URL}/notifications/stream/?${params.toString()}`);
+        source.addEventListener('notification', (event) => {
+          const message = event as MessageEvent;
+          lastEventId = message.lastEventId || lastEventId;
+          onNotification(JSON.parse(message.data));
+        });
+        // La reconnexion native réutiliserait le ticket déjà consommé
+        source.onerror = reconnect;
+      } catch (error) {
+        reconnect();
+      }
+    };
+
+    connect();
+    return {
+      close: () => {
+        closed = true;
+        clearTimeout(retry);
+        source?.close();
+      },
+    };
+  }
+
   async sendNotification(payload: { user_id: number; title: string; message: string; match_id?: number }): Promise<AxiosResponse> {
     return this.api.post('/notifications/send/', payload);
   }
@@ -202,6 +257,10 @@ class ApiService {
     return this.api.get('/users/');
   }
 
+  async getPlatformStats(): Promise<AxiosResponse> {
+    return this.api.get('/users/stats/');
+  }
+
   async updateUserStatus(userId: number, isActive: boolean): Promise<AxiosResponse> {
     return this.api.patch(`/users/${userId}/`, { is_active: isActive });
   }
@@ -51,6 +51,8 @@ export interface FoundItem {
   document_type: DocumentType;
   document_type_id: number; // write-only
   image: string; // URL
+  image_thumbnail?: string | null; // URL, read-only
+  image_medium?: string | null; // URL, read-only
   first_name?: string; // read-only, from OCR
   last_name?: string; // read-only, from OCR
   date_of_birth?: string; // read-only, from OCR